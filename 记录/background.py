@@ -0,0 +1,89 @@
+import queue
+import threading
+from typing import Callable, Optional
+
+
+class TaskCancelled(Exception):
+    """任务被取消时在工作线程中抛出"""
+
+
+class BackgroundTask:
+    """
+    在工作线程中执行耗时任务，结果通过 root.after 轮询交回 Tk 主线程。
+    work(task) 在工作线程中运行，不能操作界面；它可以调用 task.report() 汇报进度和部分结果，
+    并通过 task.check_cancelled() 在取消后尽早退出。所有回调都在主线程中执行。
+    """
+
+    POLL_MS = 50
+
+    def __init__(self, root, work: Callable, on_done: Callable,
+                 on_progress: Optional[Callable] = None,
+                 on_error: Optional[Callable] = None,
+                 on_cancelled: Optional[Callable] = None):
+        self.root = root
+        self.work = work
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self._queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.finished = False
+
+    def start(self) -> "BackgroundTask":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.root.after(self.POLL_MS, self._poll)
+        return self
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    # --- 工作线程中调用 ---
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+
+    def report(self, fraction: float, partial=None):
+        """汇报进度（0~1）和可选的部分结果，同时检查是否已取消"""
+        self.check_cancelled()
+        self._queue.put(("progress", fraction, partial))
+
+    def _run(self):
+        try:
+            result = self.work(self)
+        except TaskCancelled:
+            self._queue.put(("cancelled",))
+        except Exception as e:
+            self._queue.put(("error", e))
+        else:
+            self._queue.put(("done", result))
+
+    # --- 主线程中轮询 ---
+    def _poll(self):
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == "progress":
+                # 已取消的任务不再更新界面
+                if self.on_progress and not self.cancelled:
+                    self.on_progress(message[1], message[2])
+                continue
+            self.finished = True
+            if kind == "error":
+                if self.on_error:
+                    self.on_error(message[1])
+            elif kind == "done" and not self.cancelled:
+                self.on_done(message[1])
+            elif self.on_cancelled:
+                self.on_cancelled()
+            return
+        self.root.after(self.POLL_MS, self._poll)
@@ -0,0 +1,362 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from typing import Callable, List
+
+from rollup_cache import CACHE_SUFFIX
+from workout_csv import write_csv
+from workout_schema import now_epoch
+from workout_storage import JOURNAL_SUFFIX, JournalStore, write_snapshot
+from workout_tracker import WorkoutTracker
+import workout_analyzer
+
+# 常见动作；要求的动作数更多时以 "动作N" 补足
+ACTION_NAMES = ["深蹲", "卧推", "硬拉", "推举", "杠铃划船", "引体向上", "双杠臂屈伸", "弯举",
+                "腿举", "弓步蹲", "罗马尼亚硬拉", "面拉", "侧平举", "上斜卧推", "腿弯举", "提踵"]
+# 徒手动作重量记为 0
+BODYWEIGHT_ACTIONS = {"引体向上", "双杠臂屈伸"}
+NOTES = ["", "", "", "", "", "", "状态不错", "腰有点紧", "最后一组力竭", "换了新握法"]
+DEFAULT_SIZES = "1k,100k,1M"
+SIZE_UNITS = {"k": 1000, "m": 1000000}
+# 与上次结果相比变慢超过该比例时视为性能回退
+DEFAULT_THRESHOLD = 0.2
+SECONDS_PER_DAY = 86400
+# 无头渲染时的画布大小（像素），与分析程序的默认窗口相近
+CHART_SIZE = (800, 500)
+
+
+def parse_size(text: str) -> int:
+    """"1k" / "100k" / "1M" / "5000" -> 记录条数"""
+    text = text.strip().lower()
+    unit = SIZE_UNITS.get(text[-1:], 1)
+    return int(float(text[:-1] if unit != 1 else text) * unit)
+
+
+def generate_records(count: int, actions: int = 12, years: float = 3, seed: int = 0) -> List[dict]:
+    """
+    生成按时间排序的合成训练历史（当前版本的记录）：
+    每周约 4 次训练，每次练 4~6 个动作，重量随时间逐步增长并带有波动。
+    """
+    rng = random.Random(seed)
+    names = (ACTION_NAMES + [f"动作{i}" for i in range(len(ACTION_NAMES) + 1, actions + 1)])[:actions]
+    base_weight = {name: 0.0 if name in BODYWEIGHT_ACTIONS else rng.choice([20, 40, 60, 80, 100])
+                   for name in names}
+    days = max(1, int(years * 365))
+    training_days = sorted(rng.sample(range(days), max(1, min(days, days * 4 // 7))))
+    per_day = count / len(training_days)
+    start = (now_epoch() // SECONDS_PER_DAY - days) * SECONDS_PER_DAY
+
+    records = []
+    for position, day in enumerate(training_days):
+        todo = int(per_day * (position + 1)) - len(records)
+        if todo <= 0:
+            continue
+        session = rng.sample(names, min(len(names), rng.randint(4, 6)))
+        progress = day / days
+        # 傍晚开始训练，每条记录间隔一两分钟
+        moment = start + day * SECONDS_PER_DAY + 18 * 3600
+        for i in range(todo):
+            name = session[i % len(session)]
+            rpe = rng.randint(6, 10)
+            weight = base_weight[name] * (1 + 0.5 * progress) * rng.uniform(0.9, 1.05)
+            records.append({
+                "name": name,
+                "weight": round(weight / 2.5) * 2.5,
+                "sets": rng.randint(3, 5),
+                "reps": rng.randint(3, 12),
+                "rpe": rpe,
+                "rir": float(10 - rpe),
+                "notes": rng.choice(NOTES),
+                "record_time": moment,
+                "id": len(records) + 1,
+            })
+            moment += rng.randint(60, 180)
+    return records
+
+
+def write_history(path: str, count: int, actions: int = 12, years: float = 3, seed: int = 0) -> str:
+    """生成合成历史并写成 workout_data.json 格式；同名的日志和汇总缓存一并删除"""
+    records = generate_records(count, actions, years, seed)
+    with open(path, "w", encoding="utf-8") as f:
+        write_snapshot(f, records)
+    for suffix in (JOURNAL_SUFFIX, CACHE_SUFFIX):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return path
+
+
+class _NullTask:
+    """代替 BackgroundTask 传给工作线程函数，丢弃进度"""
+
+    def report(self, fraction, partial=None):
+        pass
+
+
+class _HeadlessTracker(WorkoutTracker):
+    """不创建窗口的记录程序：只初始化数据路径用到的属性，加载/保存走与界面相同的方法"""
+
+    def __init__(self, store: JournalStore):
+        self.store = store
+        self.shared_store = False
+        self._set_items([])
+
+    def load(self):
+        self._set_items(self._read_items(_NullTask()))
+
+
+class _Choice:
+    """代替 tk.StringVar"""
+
+    def __init__(self, value: str):
+        self.value = value
+
+    def get(self) -> str:
+        return self.value
+
+    def set(self, value: str):
+        self.value = value
+
+
+class _HeadlessAnalyzer(workout_analyzer.WorkoutAnalyzer):
+    """不创建窗口的分析程序：图表画在 Agg 画布上，统计和绘图走与界面相同的方法"""
+
+    def __init__(self, width: int = CHART_SIZE[0], height: int = CHART_SIZE[1]):
+        self.width, self.height = width, height
+        self.timer = None
+        self._init_state()
+        self.chart_type_var = _Choice("total_sets")
+        self.action_selector_var = _Choice("")
+        self.trend_mode_var = _Choice("auto")
+
+    def load(self, data_file: str):
+        self.store, self.rollups, totals = self._read_data(_NullTask(), data_file)
+        self._records_loaded = self.rollups is None
+        return totals
+
+    def load_raw(self):
+        self.store.reload()
+        self._records_loaded = True
+
+    def _ensure_canvas(self):
+        if self.canvas is not None:
+            return
+        workout_analyzer._load_plotting()
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        self.figure = workout_analyzer.Figure(figsize=(self.width / 100, self.height / 100))
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.canvas.mpl_connect('draw_event', self._on_chart_drawn)
+
+    def _base_font_size(self) -> float:
+        return min(max(self.width / 100, 4), max(self.height / 100, 3)) * 4
+
+    def draw(self, chart_type: str, trend_mode: str = "auto", cached: bool = False):
+        """
+        切换图表并完成一次完整渲染（Agg 的 draw_idle 会立即绘制）。
+        默认先清空图表位图缓存，否则第一次之后测到的都只是贴缓存的位图；
+        cached=True 时测量命中缓存（切换回最近看过的图表）的耗时
+        """
+        self.chart_type_var.set(chart_type)
+        self.trend_mode_var.set(trend_mode)
+        if not cached:
+            self._chart_cache.clear()
+            self._chart_kind = None
+        self._update_chart()
+
+
+def _tk_root():
+    """有显示器时返回隐藏的 Tk 根窗口，否则返回 None（表格填充需要真实的 Treeview）"""
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    return root
+
+
+def measure(func: Callable, setup: Callable = lambda: (), repeat: int = 3) -> dict:
+    """
+    计时 repeat 次取最小值，再单独运行一次用 tracemalloc 统计峰值内存（追踪本身会拖慢运行，不计入时间）。
+    setup 的返回值作为 func 的参数，setup 不计时。
+    """
+    runs = []
+    for _ in range(repeat):
+        args = setup()
+        gc.collect()
+        start = time.perf_counter()
+        func(*args)
+        runs.append(time.perf_counter() - start)
+    args = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"wall_s": min(runs), "runs_s": runs, "peak_mb": peak / (1 << 20)}
+
+
+def bench_size(data_file: str, repeat: int = 3, log=None) -> List[dict]:
+    """对一份数据文件运行全部基准，返回结果列表"""
+    results = []
+
+    def case(name: str, func: Callable, setup: Callable = lambda: ()):
+        result = {"case": name, **measure(func, setup, repeat)}
+        results.append(result)
+        if log:
+            log(f"  {name:<24}{result['wall_s'] * 1000:>10.1f} ms{result['peak_mb']:>10.1f} MB")
+
+    def skip(name: str, reason: str):
+        results.append({"case": name, "skipped": reason})
+        if log:
+            log(f"  {name:<24}跳过：{reason}")
+
+    def fresh_tracker():
+        return (_HeadlessTracker(JournalStore(data_file)),)
+
+    # 记录程序：后台加载（_load_data 在工作线程中执行的 _read_items）与保存
+    case("tracker_load", lambda tracker: tracker.load(), fresh_tracker)
+    tracker = _HeadlessTracker(JournalStore(data_file))
+    tracker.load()
+    case("tracker_save", lambda: tracker._save_snapshot(wait=True))
+    tracker.store.close()
+
+    # 导出 CSV：与界面相同，直接写出 WorkoutItem
+    csv_path = data_file + ".csv"
+    items = list(tracker.workout_items)
+    case("csv_export", lambda: write_csv(csv_path, items, len(items)))
+    os.remove(csv_path)
+    del tracker, items
+
+    # 分析程序：汇总缓存重建与命中、统计、表格、两种趋势模式的图表
+    def cold_cache():
+        if os.path.exists(data_file + CACHE_SUFFIX):
+            os.remove(data_file + CACHE_SUFFIX)
+        return (_HeadlessAnalyzer(),)
+
+    case("analyzer_load_cold", lambda analyzer: analyzer.load(data_file), cold_cache)
+    case("analyzer_load_cached", lambda analyzer: analyzer.load(data_file), lambda: (_HeadlessAnalyzer(),))
+
+    analyzer = _HeadlessAnalyzer()
+    totals = analyzer.load(data_file)
+    case("analyzer_action_stats", lambda: analyzer._calculate_action_stats(totals))
+
+    root = _tk_root()
+    if root is None:
+        skip("analyzer_action_table", "没有可用的显示器，Treeview 无法创建")
+    else:
+        from tkinter import ttk
+
+        def fresh_table():
+            analyzer.tree = ttk.Treeview(root, columns=("name", "sets", "reps", "last"), show="headings")
+            analyzer._table_rows = {}
+            return ()
+
+        case("analyzer_action_table", analyzer._populate_action_table, fresh_table)
+        root.destroy()
+
+    # 趋势图选记录最多的动作
+    busiest = max(analyzer.action_stats, key=lambda name: analyzer.action_stats[name]['total_sets'], default="")
+    analyzer.action_selector_var.set(busiest)
+    case("chart_total_sets", lambda: analyzer.draw("total_sets"))
+    case("chart_total_sets_cached", lambda: analyzer.draw("total_sets", cached=True),
+         lambda: analyzer.draw("total_sets") or ())
+    case("chart_reps_trend_auto", lambda: analyzer.draw("reps_trend", "auto"))
+    case("analyzer_load_raw", analyzer.load_raw)
+    case("chart_reps_trend_raw", lambda: analyzer.draw("reps_trend", "raw"))
+    analyzer.store.close()
+    return results
+
+
+def run(sizes: List[int], workdir: str, actions: int = 12, years: float = 3, repeat: int = 3,
+        seed: int = 0, log=None) -> dict:
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "params": {"actions": actions, "years": years, "repeat": repeat, "seed": seed},
+        "results": [],
+    }
+    for count in sizes:
+        data_file = os.path.join(workdir, f"workout_data_{count}.json")
+        if log:
+            log(f"生成 {count} 条记录…")
+        start = time.perf_counter()
+        write_history(data_file, count, actions, years, seed)
+        if log:
+            log(f"  已生成（{time.perf_counter() - start:.1f} s，{os.path.getsize(data_file) / (1 << 20):.1f} MB）")
+        for result in bench_size(data_file, repeat, log):
+            report["results"].append({"records": count, **result})
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """与上次的结果比较，返回变慢超过阈值的条目说明"""
+    previous = {(item["records"], item["case"]): item for item in baseline.get("results", [])
+                if "wall_s" in item}
+    regressions = []
+    for item in report["results"]:
+        old = previous.get((item["records"], item["case"]))
+        if old is None or "wall_s" not in item or old["wall_s"] <= 0:
+            continue
+        change = item["wall_s"] / old["wall_s"] - 1
+        if change > threshold:
+            regressions.append(f"{item['case']} @ {item['records']}: "
+                               f"{old['wall_s'] * 1000:.1f} ms -> {item['wall_s'] * 1000:.1f} ms（+{change:.0%}）")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="锻炼数据基准测试：生成合成历史并测量加载、保存、统计、绘图和导出")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"记录条数，逗号分隔（默认 {DEFAULT_SIZES}）")
+    parser.add_argument("--actions", type=int, default=12, help="动作数")
+    parser.add_argument("--years", type=float, default=3, help="历史跨度（年）")
+    parser.add_argument("--repeat", type=int, default=3, help="每项计时次数，取最小值")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="结果文件（JSON）")
+    parser.add_argument("--workdir", help="合成数据存放目录，默认使用临时目录并在结束后删除")
+    parser.add_argument("--compare", metavar="FILE", help="与之前的结果文件比较，变慢超过阈值时以状态码 1 退出")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="判定性能回退的变慢比例")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    # 缺少中文字体时 matplotlib 每次绘制都会警告，既刷屏又影响计时
+    warnings.simplefilter("ignore", UserWarning)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="workout_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    log = lambda message: print(message, file=sys.stderr)
+    try:
+        report = run(sizes, workdir, args.actions, args.years, args.repeat, args.seed, log)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"性能回退：{line}", file=sys.stderr)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
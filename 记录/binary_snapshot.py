@@ -0,0 +1,122 @@
+import mmap
+import os
+import struct
+import zlib
+from typing import BinaryIO, Dict, List, Tuple
+
+import numpy as np
+
+from workout_columns import ColumnarRecords, StringTable
+from workout_schema import SCHEMA_VERSION, check_version
+from workout_storage import BINARY_MAGIC as MAGIC
+
+FORMAT_VERSION = 1
+# 文件头：魔数、格式版本、数据版本、记录数、正文字节数、正文 CRC32
+_HEADER = struct.Struct("<8sHHQQI")
+HEADER_SIZE = 64
+_ALIGN = 8
+
+# 定长列（小端），按此顺序依次存放，每列按 8 字节对齐。
+# 重量和 RIR 用 float64，与 JSON 互相转换时不丢精度
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("id", "<i8"),
+    ("record_time", "<i8"),
+    ("weight", "<f8"),
+    ("rir", "<f8"),
+    ("sets", "<i4"),
+    ("reps", "<i4"),
+    ("name_code", "<i4"),
+    ("note_code", "<i4"),
+    ("rpe", "<i1"),
+)
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGN
+
+
+def _encode_strings(values: List[str]) -> bytes:
+    """字符串表：条数、各条的结束偏移（uint32），然后是 UTF-8 内容"""
+    blobs = [value.encode("utf-8") for value in values]
+    ends = np.cumsum([len(blob) for blob in blobs], dtype=np.uint64).astype("<u4")
+    data = struct.pack("<Q", len(blobs)) + ends.tobytes() + b"".join(blobs)
+    return data + b"\0" * _padding(len(data))
+
+
+def _decode_strings(buffer, offset: int) -> Tuple[List[str], int]:
+    (n,) = struct.unpack_from("<Q", buffer, offset)
+    offset += 8
+    ends = np.frombuffer(buffer, dtype="<u4", count=n, offset=offset).tolist()
+    offset += 4 * n
+    text = bytes(buffer[offset:offset + (ends[-1] if ends else 0)])
+    values, start = [], 0
+    for end in ends:
+        values.append(text[start:end].decode("utf-8"))
+        start = end
+    size = (ends[-1] if ends else 0)
+    return values, offset + size + _padding(8 + 4 * n + size)
+
+
+def write_binary(f: BinaryIO, columns: ColumnarRecords):
+    """把列式记录写成二进制快照（f 为以二进制方式打开的文件）"""
+    parts = []
+    for field, dtype in COLUMNS:
+        data = np.ascontiguousarray(getattr(columns, field), dtype=dtype).tobytes()
+        parts.append(data + b"\0" * _padding(len(data)))
+    parts.append(_encode_strings(columns.names.values))
+    parts.append(_encode_strings(columns.notes.values))
+    checksum, size = 0, 0
+    for part in parts:
+        checksum = zlib.crc32(part, checksum)
+        size += len(part)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, SCHEMA_VERSION, len(columns), size, checksum)
+    f.write(header + b"\0" * (HEADER_SIZE - len(header)))
+    for part in parts:
+        f.write(part)
+
+
+def write_records(f: BinaryIO, records: List[dict]):
+    """dict 列表直接按本格式的列类型写出（不经过 float32 的 ColumnarRecords，重量不丢精度）"""
+    names, notes = StringTable(), StringTable()
+    arrays = {field: np.array([record[field] for record in records], dtype=dtype)
+              for field, dtype in COLUMNS if field not in ("name_code", "note_code")}
+    arrays["name_code"] = np.array([names.encode(record["name"]) for record in records], dtype="<i4")
+    arrays["note_code"] = np.array([notes.encode(record["notes"]) for record in records], dtype="<i4")
+    write_binary(f, ColumnarRecords.from_arrays(arrays, names.values, notes.values))
+
+
+def read_header(buffer) -> Dict[str, int]:
+    magic, format_version, schema_version, count, size, checksum = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("不是二进制快照文件")
+    if format_version > FORMAT_VERSION:
+        raise ValueError(f"二进制快照格式版本 {format_version} 比程序支持的版本 {FORMAT_VERSION} 新，请升级程序")
+    check_version(schema_version)
+    return {"schema_version": schema_version, "count": count, "size": size, "checksum": checksum}
+
+
+def open_binary(path: str, verify: bool = True, use_mmap: bool = True) -> ColumnarRecords:
+    """
+    打开二进制快照，数值列直接是文件缓冲区上的只读数组，不为每条记录创建 Python 对象。
+    use_mmap=False 时整体读入内存；Windows 上映射中的文件不能被替换，默认不映射，
+    以免记录程序压缩日志时替换快照失败。
+    """
+    with open(path, "rb") as f:
+        if use_mmap and os.name != "nt" and os.fstat(f.fileno()).st_size > 0:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+    header = read_header(buffer)
+    body = memoryview(buffer)[HEADER_SIZE:HEADER_SIZE + header["size"]]
+    if len(body) != header["size"]:
+        raise ValueError(f"二进制快照不完整：{path}")
+    if verify and zlib.crc32(body) != header["checksum"]:
+        raise ValueError(f"二进制快照校验失败：{path}")
+    count = header["count"]
+    arrays, offset = {}, HEADER_SIZE
+    for field, dtype in COLUMNS:
+        arrays[field] = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+        offset += arrays[field].nbytes + _padding(arrays[field].nbytes)
+    names, offset = _decode_strings(buffer, offset)
+    notes, offset = _decode_strings(buffer, offset)
+    return ColumnarRecords.from_arrays(arrays, names, notes)
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+# 默认最多占用的内存；800x500 像素的图表位图约 1.6MB
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ChartCache:
+    """
+    绘制好的图表位图的 LRU 缓存，按字节数限制总内存，超出时淘汰最久未使用的。
+    键由调用方决定，需包含数据版本，数据变化后旧的键自然不再命中；
+    discard 用于在数据变化时立即释放受影响的条目。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        # 键 -> (位图, 字节数)，按使用时间从旧到新排列
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable):
+        """取出并标记为最近使用；没有时返回 None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def peek(self, key: Hashable):
+        """取出但不改变淘汰顺序"""
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def put(self, key: Hashable, value, nbytes: int):
+        if nbytes > self.max_bytes:
+            return  # 单张就超出上限时不缓存
+        self._remove(key)
+        self._entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.nbytes -= size
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """删除满足条件的条目，返回删除的条数"""
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _remove(self, key: Hashable) -> Optional[tuple]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+        return entry
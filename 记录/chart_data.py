@@ -0,0 +1,93 @@
+from typing import Dict
+
+import numpy as np
+
+from workout_columns import SECONDS_PER_DAY
+
+# 原始模式下趋势图最多绘制的点数
+MAX_RAW_POINTS = 500
+# 汇总粒度：可见时间跨度不超过阈值（天）时使用对应粒度
+BUCKET_THRESHOLDS = [(120, "day"), (730, "week")]
+BUCKET_LABELS = {"day": "按日汇总", "week": "按周汇总", "month": "按月汇总"}
+
+
+def choose_bucket(span_seconds: int) -> str:
+    """根据可见时间跨度选择汇总粒度"""
+    span_days = span_seconds / SECONDS_PER_DAY
+    for max_days, bucket in BUCKET_THRESHOLDS:
+        if span_days <= max_days:
+            return bucket
+    return "month"
+
+
+def bucket_starts(times: np.ndarray, bucket: str) -> np.ndarray:
+    """把 int64 秒映射为所在日/周（周一开始）/月的起始时间（int64 秒）"""
+    days = times // SECONDS_PER_DAY
+    if bucket == "day":
+        return days * SECONDS_PER_DAY
+    if bucket == "week":
+        # 1970-01-01 是周四，+3 后按 7 取整即对齐到周一
+        return ((days + 3) // 7 * 7 - 3) * SECONDS_PER_DAY
+    months = times.astype("datetime64[s]").astype("datetime64[M]")
+    return months.astype("datetime64[s]").astype(np.int64)
+
+
+def daily_from_series(series: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """把一个动作按时间排序的原始序列汇总为按日数据（与汇总缓存中的格式一致）"""
+    days = series['record_time'] // SECONDS_PER_DAY
+    if len(days) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return {'day': empty, 'max_reps': empty, 'total_sets': empty, 'rpe_sum': empty, 'count': empty}
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    return {
+        'day': days[starts] * SECONDS_PER_DAY,
+        'max_reps': np.maximum.reduceat(series['reps'], starts),
+        'total_sets': np.add.reduceat(series['sets'].astype(np.int64), starts),
+        'rpe_sum': np.add.reduceat(series['rpe'].astype(np.int64), starts),
+        'count': np.diff(np.r_[starts, len(days)]),
+    }
+
+
+def rollup(daily: Dict[str, np.ndarray], bucket: str) -> Dict[str, np.ndarray]:
+    """
+    把按日数据合并到更粗的时间桶：
+    每桶的最大单组次数、组数合计、平均 RPE。
+    """
+    keys = bucket_starts(daily['day'], bucket)
+    if len(keys) == 0:
+        return {'record_time': keys, 'max_reps': keys, 'total_sets': keys, 'mean_rpe': keys}
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return {
+        'record_time': keys[starts],
+        'max_reps': np.maximum.reduceat(daily['max_reps'], starts),
+        'total_sets': np.add.reduceat(daily['total_sets'], starts),
+        'mean_rpe': np.add.reduceat(daily['rpe_sum'], starts) / np.add.reduceat(daily['count'], starts),
+    }
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int = MAX_RAW_POINTS) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的下标。
+    每个桶里选与前一个保留点、下一桶均值点围成三角形面积最大的点，能保留曲线的峰谷形状。
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
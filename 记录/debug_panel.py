@@ -0,0 +1,132 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from collections import defaultdict
+
+from instrumentation import TRACER
+
+# 打开/关闭调试面板的快捷键（面板默认隐藏）
+DEBUG_PANEL_KEY = "<F12>"
+REFRESH_MS = 500
+RECENT_LIMIT = 200
+
+
+class DebugPanel:
+    """
+    隐藏的性能调试面板：显示最近的计时区间、按名称汇总的耗时以及计数器，
+    可导出 Chrome trace-event JSON。打开面板时自动开始记录。
+    """
+
+    def __init__(self, master: tk.Misc):
+        self.window = tk.Toplevel(master)
+        self.window.title("性能调试")
+        self.window.geometry("720x480")
+        self._version = None
+        self._refresh_job = None
+        # 关闭面板时恢复打开前的状态（以环境变量启动时保持记录）
+        self._was_enabled = TRACER.enabled
+        TRACER.enabled = True
+
+        controls = ttk.Frame(self.window, padding=5)
+        controls.pack(fill=tk.X)
+        self.enabled_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(controls, text="记录计时", variable=self.enabled_var,
+                        command=self._on_toggle).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="清空", command=self._on_clear).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="导出 Chrome trace…", command=self._on_export).pack(side=tk.LEFT, padx=5)
+
+        panes = ttk.PanedWindow(self.window, orient=tk.VERTICAL)
+        panes.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.summary = self._create_table(panes, ("名称", "次数", "合计(ms)", "平均(ms)", "最大(ms)"))
+        self.recent = self._create_table(panes, ("名称", "耗时(ms)", "开始(ms)", "线程", "参数"))
+        self.counters = self._create_table(panes, ("计数器", "值"))
+
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._refresh()
+
+    @staticmethod
+    def _create_table(panes: ttk.PanedWindow, columns) -> ttk.Treeview:
+        frame = ttk.Frame(panes)
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=6)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=100, anchor=tk.CENTER)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        panes.add(frame, weight=1)
+        return tree
+
+    def _refresh(self):
+        # 没有新的记录时不重建表格
+        if TRACER.version != self._version:
+            self._version = TRACER.version
+            self._fill_summary()
+            self._fill_recent()
+            self._fill(self.counters, sorted(TRACER.counters.items()))
+        self._refresh_job = self.window.after(REFRESH_MS, self._refresh)
+
+    def _fill_summary(self):
+        totals = defaultdict(lambda: [0, 0.0, 0.0])
+        for name, _, duration, _, _ in list(TRACER.spans):
+            entry = totals[name]
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] = max(entry[2], duration)
+        rows = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+        self._fill(self.summary, [(name, n, f"{total * 1000:.1f}", f"{total / n * 1000:.2f}", f"{longest * 1000:.1f}")
+                                  for name, (n, total, longest) in rows])
+
+    def _fill_recent(self):
+        names = TRACER.thread_names
+        self._fill(self.recent, [
+            (name, f"{duration * 1000:.2f}", f"{(start - TRACER.origin) * 1000:.1f}",
+             names.get(tid, tid), ", ".join(f"{key}={value}" for key, value in (args or {}).items()))
+            for name, start, duration, tid, args in TRACER.recent(RECENT_LIMIT)])
+
+    @staticmethod
+    def _fill(tree: ttk.Treeview, rows):
+        tree.delete(*tree.get_children())
+        for row in rows:
+            tree.insert("", tk.END, values=row)
+
+    def _on_toggle(self):
+        TRACER.enabled = self.enabled_var.get()
+
+    def _on_clear(self):
+        TRACER.clear()
+
+    def _on_export(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.window, title="导出 Chrome trace", defaultextension=".json",
+            filetypes=[("Trace JSON", "*.json"), ("所有文件", "*.*")], initialfile="workout_trace.json")
+        if not path:
+            return
+        try:
+            count = TRACER.export_chrome_trace(path)
+        except OSError as e:
+            messagebox.showerror("导出失败", f"无法写入文件：{e}", parent=self.window)
+            return
+        messagebox.showinfo("导出成功", f"已导出 {count} 个区间，可在 chrome://tracing 或 Perfetto 中打开。",
+                            parent=self.window)
+
+    def close(self):
+        if self._refresh_job is not None:
+            self.window.after_cancel(self._refresh_job)
+        TRACER.enabled = self._was_enabled
+        self.window.destroy()
+
+
+def bind_debug_panel(root: tk.Misc):
+    """在窗口上绑定 F12 打开/关闭调试面板"""
+    panel = None
+
+    def toggle(event=None):
+        nonlocal panel
+        if panel is not None and panel.window.winfo_exists():
+            panel.close()
+            panel = None
+        else:
+            panel = DebugPanel(root)
+
+    root.bind(DEBUG_PANEL_KEY, toggle, add="+")
@@ -0,0 +1,135 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+# 设置该环境变量（如 WORKOUT_TRACE=1）时启动即开始记录
+TRACE_ENV = "WORKOUT_TRACE"
+# 只保留最近的这么多个区间，内存占用有上限
+MAX_SPANS = 5000
+
+
+class Tracer:
+    """
+    计时区间与计数器。
+    关闭时 span() 只做一次属性判断并返回共享的空上下文，几乎没有开销；
+    开启后每个区间记录 (名称, 开始, 耗时, 线程, 参数)，可导出为 Chrome trace-event JSON。
+    """
+
+    def __init__(self, enabled: bool = False, max_spans: int = MAX_SPANS):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.spans = deque(maxlen=max_spans)
+        self.counters: Dict[str, int] = {}
+        self.thread_names: Dict[int, str] = {}
+        # 每次记录后递增，调试面板据此判断是否需要刷新
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, end: float, args: Optional[dict] = None):
+        thread = threading.current_thread()
+        self.thread_names.setdefault(thread.ident, thread.name)
+        self.spans.append((name, start, end - start, thread.ident, args))
+        self.version += 1
+
+    def count(self, name: str, amount: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            self.version += 1
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+            self.origin = time.perf_counter()
+            self.version += 1
+
+    def recent(self, limit: int = 200) -> List[tuple]:
+        """最近的区间，新的在前"""
+        spans = list(self.spans)
+        return spans[:-limit - 1:-1]
+
+    def to_chrome_trace(self) -> dict:
+        """Chrome trace-event 格式（chrome://tracing 或 Perfetto 可直接打开），时间单位为微秒"""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in list(self.thread_names.items())]
+        end = self.origin
+        for name, start, duration, tid, args in list(self.spans):
+            events.append({"name": name, "ph": "X", "pid": pid, "tid": tid,
+                           "ts": (start - self.origin) * 1e6, "dur": duration * 1e6, "args": args or {}})
+            end = max(end, start + duration)
+        # 计数器只有最终值，放在最后一个区间结束的时刻
+        for name, value in list(self.counters.items()):
+            events.append({"name": name, "ph": "C", "pid": pid, "tid": 0,
+                           "ts": (end - self.origin) * 1e6, "args": {name: value}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str) -> int:
+        """写出 trace 文件，返回区间个数"""
+        trace = self.to_chrome_trace()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, ensure_ascii=False)
+        return sum(1 for event in trace["traceEvents"] if event["ph"] == "X")
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: Optional[dict]):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        TRACER.add_span(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+TRACER = Tracer(enabled=bool(os.environ.get(TRACE_ENV)))
+
+
+def span(name: str, **args):
+    """with span("parse", records=n): ...；关闭时返回空上下文"""
+    if not TRACER.enabled:
+        return _NULL_SPAN
+    return _Span(name, args or None)
+
+
+def count(name: str, amount: int = 1):
+    TRACER.count(name, amount)
+
+
+def traced(name: str):
+    """把整个函数/方法记为一个区间的装饰器"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                TRACER.add_span(name, start, time.perf_counter())
+        return wrapper
+    return decorate
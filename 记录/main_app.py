@@ -1,11 +1,16 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+import argparse
 import subprocess
 import sys
 import os
 
+from background import BackgroundTask
+from workout_tracker import WorkoutTracker, create_store
+from workout_analyzer import WorkoutAnalyzer
+
 class MainApplication:
-    def __init__(self, root):
+    def __init__(self, root, separate_process=False):
         self.root = root
         self.root.title("健身记录与分析系统")
         self.root.geometry("400x200")
@@ -13,7 +18,17 @@ class MainApplication:
         # 获取当前脚本所在的目录，确保能正确找到其他.py文件
         self.current_dir = os.path.dirname(os.path.abspath(__file__))
 
+        # 默认在本进程中以 Toplevel 打开两个窗口，并共享同一份内存数据；
+        # separate_process=True 时沿用旧方式，各自启动独立的解释器
+        self.separate_process = separate_process
+        self.store = None if separate_process else create_store()
+        self.tracker_window = None
+        self.analyzer_window = None
+
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        if self.store is not None:
+            self._load_store()
 
     def create_widgets(self):
         main_frame = ttk.Frame(self.root, padding="30")
@@ -35,24 +50,61 @@ class MainApplication:
         analyzer_button = ttk.Button(button_frame, text="打开数据分析", command=self.open_analyzer, style="Main.TButton")
         analyzer_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
 
+    def _load_store(self):
+        """在后台加载共享数据，完成后通知已打开的窗口"""
+        BackgroundTask(
+            self.root, lambda task: self.store.load(progress=lambda fraction: task.report(fraction)),
+            on_done=lambda records: self.store.notify("reload"),
+            on_error=lambda e: messagebox.showwarning("加载警告", f"无法加载保存的记录：{str(e)}"),
+        ).start()
+
+    def _show_existing(self, window) -> bool:
+        """窗口已经打开时直接切到前台"""
+        if window is not None and window.winfo_exists():
+            window.deiconify()
+            window.lift()
+            return True
+        return False
+
     def open_tracker(self):
-        """启动锻炼记录程序"""
-        tracker_path = os.path.join(self.current_dir, "workout_tracker.py")
-        if os.path.exists(tracker_path):
-            # 使用当前的Python解释器来运行脚本
-            subprocess.Popen([sys.executable, tracker_path])
-        else:
-            messagebox.showerror("错误", f"未找到锻炼记录程序: {tracker_path}")
+        """打开锻炼记录窗口"""
+        if self.store is None:
+            self._spawn("workout_tracker.py", "锻炼记录程序")
+            return
+        if not self._show_existing(self.tracker_window):
+            self.tracker_window = tk.Toplevel(self.root)
+            WorkoutTracker(self.tracker_window, store=self.store)
 
     def open_analyzer(self):
-        """启动数据分析程序"""
-        analyzer_path = os.path.join(self.current_dir, "workout_analyzer.py")
-        if os.path.exists(analyzer_path):
-            subprocess.Popen([sys.executable, analyzer_path])
+        """打开数据分析窗口"""
+        if self.store is None:
+            self._spawn("workout_analyzer.py", "数据分析程序")
+            return
+        if not self._show_existing(self.analyzer_window):
+            self.analyzer_window = tk.Toplevel(self.root)
+            WorkoutAnalyzer(self.analyzer_window, store=self.store)
+
+    def _spawn(self, script, label):
+        """独立进程方式启动"""
+        script_path = os.path.join(self.current_dir, script)
+        if os.path.exists(script_path):
+            # 使用当前的Python解释器来运行脚本
+            subprocess.Popen([sys.executable, script_path])
         else:
-            messagebox.showerror("错误", f"未找到数据分析程序: {analyzer_path}")
+            messagebox.showerror("错误", f"未找到{label}: {script_path}")
+
+    def on_close(self):
+        self.root.destroy()
+        if self.store is not None:
+            # 等待后台压缩完成，保证日志已合并
+            self.store.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="健身记录与分析系统")
+    parser.add_argument("--separate-process", action="store_true",
+                        help="记录与分析各自在独立进程中运行（旧方式）")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = MainApplication(root)
-    root.mainloop()
\ No newline at end of file
+    app = MainApplication(root, separate_process=args.separate_process)
+    root.mainloop()
@@ -0,0 +1,552 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Set
+
+from instrumentation import count, traced
+from workout_schema import MISSING_TIME, format_epoch, now_epoch
+from workout_stats import ActionStatsAggregator
+from workout_storage import (COMPACT_THRESHOLD, JournalStore, WorkoutStore, _stat_signature, atomic_write_json,
+                             data_signature, load_records, write_snapshot_atomic)
+
+# 分区目录中保存各分区摘要的清单文件
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# 按记录时间的年月分区，文件名如 2024-03.json（各自带 .journal 日志）；没有时间的记录放在 undated.json
+PARTITION_FORMAT = "%Y-%m"
+PARTITION_SUFFIX = ".json"
+UNDATED = "undated"
+_PARTITION_FILE = re.compile(r"^(\d{4}-\d{2}|undated)\.json(?:\.journal)?$")
+# 个人记录索引保存在分区目录中
+PR_FILE_NAME = "personal_records.prs"
+
+
+def partition_key(record_time: int) -> str:
+    if record_time == MISSING_TIME:
+        return UNDATED
+    return format_epoch(record_time, PARTITION_FORMAT)
+
+
+def _partition_order(key: str):
+    # 没有时间的记录排在最前面，与按记录时间排序一致
+    return key != UNDATED, key
+
+
+def is_partitioned(path: str) -> bool:
+    return os.path.isdir(path)
+
+
+def contains_partitions(path: str) -> bool:
+    """目录中是否有分区数据（清单或按月的数据文件），批量分析遍历目录时用来识别分区目录"""
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return False
+    return MANIFEST_NAME in names or any(_PARTITION_FILE.match(name) for name in names)
+
+
+def partition_signature(path: str) -> list:
+    """目录中全部文件的大小和修改时间，用于廉价地判断分区数据是否变化"""
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return []
+    return [[name, _stat_signature(os.path.join(path, name))] for name in names]
+
+
+def _summary(ids: List[int], times: List[int], totals: Dict[str, dict], sources) -> dict:
+    """
+    分区摘要：记录条数、最后一条和最大的 id、时间范围、按动作的累计统计，
+    以及汇总时分区文件的状态（对不上时摘要作废）。
+    """
+    return {
+        "count": len(ids),
+        "last_id": ids[-1] if ids else None,
+        "max_id": max(ids, default=0),
+        "first_time": min(times, default=MISSING_TIME),
+        "last_time": max(times, default=MISSING_TIME),
+        "totals": {name: dict(stats) for name, stats in totals.items()},
+        "sources": sources,
+    }
+
+
+def _summarize_store(store: JournalStore, sources) -> dict:
+    if store.columns is not None:
+        ids, times = store.columns.id.tolist(), store.columns.record_time.tolist()
+    else:
+        ids = [record["id"] for record in store.records]
+        times = [record["record_time"] for record in store.records]
+    return _summary(ids, times, store.action_stats(), sources)
+
+
+def _overlaps(summary: dict, flt) -> bool:
+    return ((flt.start is None or summary["last_time"] >= flt.start)
+            and (flt.end is None or summary["first_time"] < flt.end))
+
+
+def _within(summary: dict, flt) -> bool:
+    return ((flt.start is None or summary["first_time"] >= flt.start)
+            and (flt.end is None or summary["last_time"] < flt.end))
+
+
+def _concat_series(series_list: List[dict]) -> dict:
+    """各分区的序列按月份顺序拼接，拼接后仍按时间排序"""
+    if len(series_list) == 1:
+        return series_list[0]
+    from workout_columns import series_from_records
+    if not series_list:
+        return series_from_records([])
+    import numpy as np
+    return {field: np.concatenate([series[field] for series in series_list]) for field in series_list[0]}
+
+
+def _merge_stats(aggregator: ActionStatsAggregator, totals: Dict[str, dict], actions=None):
+    for name, stats in totals.items():
+        if actions is None or name in actions:
+            aggregator.merge(name, stats['total_sets'], stats['max_reps_per_set'], stats['last_time'])
+
+
+class PartitionedStore(WorkoutStore):
+    """
+    按月分区的存储：目录中每个月一个数据文件（快照 + 日志，即一个 JournalStore），
+    以及记录各分区摘要（条数、时间范围、按动作统计）的清单文件。
+
+    记录程序只加载当前月份的分区，新增记录按记录时间写入所属月份；
+    全部历史的累计统计直接由清单中的摘要合并，趋势图或日期筛选需要原始记录时
+    才加载涉及的分区，内存和加载时间只与查看的范围有关。
+    摘要带有分区文件的大小和修改时间，对不上的分区（如被记录程序追加过）重新读取后汇总。
+    """
+
+    def __init__(self, path: str, read_only: bool = False, compact_threshold: int = COMPACT_THRESHOLD):
+        self.path = path
+        self.read_only = read_only
+        self.compact_threshold = compact_threshold
+        self._set_records([])
+        # 分区 -> 摘要（来自清单，或读取分区后重新汇总）
+        self.summaries: Dict[str, dict] = {}
+        # 已加载的分区；记录程序写入的分区为可写的 JournalStore，只用于查询的按列式只读加载
+        self.parts: Dict[str, JournalStore] = {}
+        # 可写分区中每条记录所在的分区，按 id 删除和修改时使用
+        self._partition_of: Dict[int, str] = {}
+        # 全部记录都并入 by_id 的可写分区（当前月份）；写入其他月份时只并入写入的记录
+        self._merged: Set[str] = set()
+        # 有修改、保存清单时要重新汇总的分区
+        self._dirty: Set[str] = set()
+        # 分析窗口在后台线程中加载分区，界面线程同时在查询
+        self._lock = threading.RLock()
+
+    def partition_path(self, key: str) -> str:
+        return os.path.join(self.path, key + PARTITION_SUFFIX)
+
+    def partition_keys(self) -> List[str]:
+        """目录中的全部分区，按时间顺序"""
+        keys = set(self.parts)
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            names = []
+        for name in names:
+            match = _PARTITION_FILE.match(name)
+            if match:
+                keys.add(match.group(1))
+        return sorted(keys, key=_partition_order)
+
+    # --- 清单 ---
+    def _read_manifest(self) -> Dict[str, dict]:
+        try:
+            with open(os.path.join(self.path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data["partitions"]
+
+    def _summary_valid(self, key: str) -> bool:
+        summary = self.summaries.get(key)
+        return summary is not None and summary["sources"] == data_signature(self.partition_path(key))
+
+    def _save_manifest(self):
+        """重新汇总有修改的可写分区后写出清单（只读打开时不写）"""
+        if self.read_only:
+            return
+        with self._lock:
+            for key, part in self.parts.items():
+                if not part.read_only and (key in self._dirty or key not in self.summaries):
+                    self.summaries[key] = _summarize_store(part, data_signature(part.path))
+            self._dirty.clear()
+            data = {"version": MANIFEST_VERSION, "partitions": dict(self.summaries)}
+        try:
+            atomic_write_json(os.path.join(self.path, MANIFEST_NAME), data, indent=None)
+        except OSError:
+            pass  # 清单写不进去不影响使用，下次打开时重新汇总对不上的分区
+
+    # --- 加载 ---
+    def _read_part(self, key: str) -> JournalStore:
+        """按列式只读加载一个分区并刷新其摘要（文件状态在读取之前记下）"""
+        sources = data_signature(self.partition_path(key))
+        part = JournalStore(self.partition_path(key), read_only=True)
+        part.load()
+        count("partitions_loaded")
+        summary = _summarize_store(part, sources)
+        with self._lock:
+            self.summaries[key] = summary
+        return part
+
+    def _writable_part(self, key: str, merge: bool = False) -> JournalStore:
+        """
+        要写入的分区；尚未加载（或只读加载）时加载为可写分区。
+        merge=True 时其全部记录并入 by_id（记录程序显示的当前月份）；
+        导入或修改时间写到其他月份时不并入，by_id 中只有写入的那几条
+        """
+        part = self.parts.get(key)
+        if part is None or part.read_only:
+            os.makedirs(self.path, exist_ok=True)
+            part = JournalStore(self.partition_path(key), compact_threshold=self.compact_threshold)
+            part.load()
+            count("partitions_loaded")
+            self.parts[key] = part
+        if merge and key not in self._merged:
+            for record in part.records:
+                self.by_id[record["id"]] = record
+                self._partition_of[record["id"]] = key
+            self._records = None
+            self._merged.add(key)
+        return part
+
+    @traced("partitions_open")
+    def load(self, progress=None) -> List[dict]:
+        """
+        读取清单并核对各分区的摘要，对不上的分区重新读取汇总；
+        可写打开时再加载当前月份的分区，返回其中的记录。
+        """
+        with self._lock:
+            self.close_parts()
+            self._set_records([])
+            self._partition_of = {}
+            self._merged = set()
+            self.summaries = self._read_manifest()
+            keys = self.partition_keys()
+            self.summaries = {key: self.summaries[key] for key in keys if key in self.summaries}
+            current = None if self.read_only else partition_key(now_epoch())
+            stale = [key for key in keys if key != current and not self._summary_valid(key)]
+            for i, key in enumerate(stale):
+                part = self._read_part(key)
+                if self.read_only:
+                    # 有变化的通常是最近的分区，留在内存中供查询
+                    self.parts[key] = part
+                if progress is not None:
+                    progress((i + 1) / (len(stale) + 1))
+            if current is not None:
+                self._writable_part(current, merge=True)
+            self.next_id = max([summary["max_id"] for summary in self.summaries.values()]
+                               + [max(self.by_id, default=0)]) + 1
+            if stale and not self.read_only:
+                self._save_manifest()
+            self.loaded = True
+            if progress is not None:
+                progress(1.0)
+            return self.records
+
+    def reload(self, progress=None):
+        """只读打开时重新核对全部分区，之前加载的分区一并释放"""
+        self.load(progress)
+
+    def refresh(self) -> Optional[Set[str]]:
+        """
+        自动刷新时调用：只重新读取文件有变化的分区（原来已加载的重新加载，未加载的只更新摘要），
+        返回这些分区中涉及的动作；没有变化时返回空集合。
+        """
+        names = set()
+        with self._lock:
+            keys = self.partition_keys()
+            for key in list(self.summaries):
+                if key not in keys:
+                    names.update(self.summaries.pop(key)["totals"])
+            for key in keys:
+                if self._summary_valid(key):
+                    continue
+                if key in self.summaries:
+                    names.update(self.summaries[key]["totals"])
+                part = self._read_part(key)
+                if key in self.parts:
+                    self.parts[key] = part
+                names.update(self.summaries[key]["totals"])
+            if names:
+                self._prs = None
+        return names
+
+    def load_partitions(self, keys: List[str], progress=None):
+        """只读加载若干分区（在后台线程中调用）"""
+        for i, key in enumerate(keys):
+            with self._lock:
+                if key in self.parts:
+                    continue
+            part = self._read_part(key)
+            with self._lock:
+                self.parts.setdefault(key, part)
+            if progress is not None:
+                progress((i + 1) / len(keys))
+
+    def close_parts(self):
+        for part in self.parts.values():
+            part.close()
+        self.parts = {}
+
+    # --- 按查询确定要用到的分区 ---
+    def _needed(self, name: Optional[str], flt, series: bool):
+        """
+        返回 (需要原始记录的分区, 可直接用摘要回答的分区)。
+        name 为 None 时针对全部动作；series=True 表示要取记录序列，摘要不够用。
+        """
+        records, summaries = [], []
+        for key in self.partition_keys():
+            summary = self.summaries.get(key)
+            if key in self.parts or summary is None:
+                # 已在内存中的分区直接查询（可写分区的摘要要到保存清单时才更新）；
+                # 新出现、还没有摘要的分区只能读取
+                records.append(key)
+                continue
+            if summary["count"] == 0:
+                continue
+            totals = summary["totals"]
+            if name is not None and name not in totals:
+                continue
+            if flt is not None and (not _overlaps(summary, flt)
+                                    or flt.actions is not None and flt.actions.isdisjoint(totals)):
+                continue
+            if not series and (flt is None or _within(summary, flt) and flt.covers_all_rpe()):
+                summaries.append(key)
+            else:
+                records.append(key)
+        return records, summaries
+
+    def missing_partitions(self, name: Optional[str] = None, flt=None, series: bool = True) -> List[str]:
+        """回答查询还需要加载的分区（name 为 None 表示全部动作）"""
+        with self._lock:
+            records, _ = self._needed(name, flt, series)
+            return [key for key in records if key not in self.parts]
+
+    def _part(self, key: str) -> JournalStore:
+        part = self.parts.get(key)
+        if part is None:
+            # 调用方通常已在后台加载好，这里只是兜底
+            part = self.parts[key] = self._read_part(key)
+        return part
+
+    # --- 查询 ---
+    def action_stats(self) -> Dict[str, dict]:
+        """已加载的分区现算，其余直接合并清单中的摘要"""
+        aggregator = ActionStatsAggregator()
+        with self._lock:
+            for key in self.partition_keys():
+                part = self.parts.get(key)
+                if part is not None:
+                    _merge_stats(aggregator, part.action_stats())
+                elif key in self.summaries:
+                    _merge_stats(aggregator, self.summaries[key]["totals"])
+                else:
+                    self.parts[key] = self._read_part(key)
+                    _merge_stats(aggregator, self.parts[key].action_stats())
+        return aggregator.stats
+
+    def action_entries(self, name: str) -> List[dict]:
+        with self._lock:
+            keys, _ = self._needed(name, None, True)
+            return [entry for key in keys for entry in self._part(key).action_entries(name)]
+
+    def action_series(self, name: str):
+        with self._lock:
+            keys, _ = self._needed(name, None, True)
+            return _concat_series([self._part(key).action_series(name) for key in keys])
+
+    def query_index(self):
+        """逐个为已加载的分区建立查询索引"""
+        with self._lock:
+            for part in self.parts.values():
+                part.query_index()
+
+    def filtered_stats(self, flt) -> Dict[str, dict]:
+        """完全落在日期区间内且不限 RPE 的分区直接用摘要，其余分区在各自的索引上查询"""
+        aggregator = ActionStatsAggregator()
+        with self._lock:
+            records, summaries = self._needed(None, flt, False)
+            for key in summaries:
+                _merge_stats(aggregator, self.summaries[key]["totals"], flt.actions)
+            for key in records:
+                _merge_stats(aggregator, self._part(key).filtered_stats(flt))
+        return aggregator.stats
+
+    def filtered_series(self, name: str, flt):
+        with self._lock:
+            keys, _ = self._needed(name, flt, True)
+            return _concat_series([self._part(key).filtered_series(name, flt) for key in keys])
+
+    # --- 写入（只涉及可写分区） ---
+    def append_many(self, records: List[dict]):
+        """按记录时间写入所属月份的分区，每个分区整批追加一次；id 在全部分区中统一分配"""
+        with self._lock:
+            groups: Dict[str, List[dict]] = {}
+            for record in records:
+                if record.get("id") is None:
+                    record["id"] = self.next_id
+                self.next_id = max(self.next_id, record["id"] + 1)
+                groups.setdefault(partition_key(record["record_time"]), []).append(record)
+            for key, group in groups.items():
+                self._writable_part(key).append_many(group)
+                for record in group:
+                    self._partition_of[record["id"]] = key
+                self._dirty.add(key)
+            self._index_added(records)
+        for record in records:
+            self.notify("add", record)
+
+    def append(self, record: dict):
+        self.append_many([record])
+
+    def delete_many(self, ids: List[int]):
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            groups: Dict[str, List[int]] = {}
+            for record_id in ids:
+                groups.setdefault(self._partition_of.pop(record_id), []).append(record_id)
+            for key, group in groups.items():
+                self.parts[key].delete_many(group)
+                self._dirty.add(key)
+            self._index_deleted(ids)
+        self.notify("delete", ids)
+
+    def update(self, record: dict):
+        """修改后记录时间换了月份时，从原分区删除并追加到新分区"""
+        with self._lock:
+            record_id = record["id"]
+            old_key = self._partition_of[record_id]
+            new_key = partition_key(record["record_time"])
+            if new_key == old_key:
+                self.parts[old_key].update(record)
+            else:
+                moved = dict(self.by_id[record_id], **record)
+                self.parts[old_key].delete_many([record_id])
+                self._writable_part(new_key).append_many([moved])
+                self._partition_of[record_id] = new_key
+            self._dirty.update((old_key, new_key))
+            self._index_updated(record)
+        self.notify("edit", record)
+
+    def clear(self):
+        """清空记录程序中显示的记录（当前月份，以及本次写入其他月份的记录），其他历史不受影响"""
+        with self._lock:
+            groups: Dict[str, List[int]] = {}
+            for record_id, key in self._partition_of.items():
+                groups.setdefault(key, []).append(record_id)
+            for key in self._merged:
+                self.parts[key].clear()
+                self._dirty.add(key)
+            for key, ids in groups.items():
+                if key not in self._merged:
+                    self.parts[key].delete_many(ids)
+                    self._dirty.add(key)
+            self._partition_of.clear()
+            self._index_cleared()
+        self.notify("clear")
+
+    def compact(self, wait: bool = False):
+        with self._lock:
+            parts = [part for part in self.parts.values() if not part.read_only]
+        for part in parts:
+            part.compact(wait=wait)
+        if wait:
+            self._save_manifest()
+
+    def close(self):
+        """等待各分区的压缩结束，写出清单和个人记录索引"""
+        for part in list(self.parts.values()):
+            part.close()
+        self._save_manifest()
+        self._save_personal_records()
+
+    # --- 个人记录 ---
+    def _personal_records_path(self) -> str:
+        return os.path.join(self.path, PR_FILE_NAME)
+
+    def total_count(self) -> int:
+        """全部分区的记录条数（不加载分区）"""
+        return self._storage_tail()[0]
+
+    def _storage_tail(self):
+        """全部分区的记录总数和按存储顺序（分区顺序、分区内文件顺序）的最后一条 id"""
+        total, last_id = 0, None
+        with self._lock:
+            for key in self.partition_keys():
+                part = self.parts.get(key)
+                if part is not None:
+                    part_count, part_last = part._storage_tail()
+                elif key in self.summaries:
+                    part_count, part_last = self.summaries[key]["count"], self.summaries[key]["last_id"]
+                else:
+                    continue
+                total += part_count
+                if part_last is not None:
+                    last_id = part_last
+        return total, last_id
+
+    def personal_records_ready(self) -> bool:
+        """索引已在内存中，或分区目录中保存的索引与当前数据对得上（不用读取任何分区）"""
+        if self._prs is None:
+            from personal_records import PersonalRecords
+            prs = PersonalRecords.load(self._personal_records_path())
+            if prs is not None and (prs.record_count, prs.last_id) == self._storage_tail():
+                self._prs = prs
+        return self._prs is not None
+
+    def personal_records(self):
+        """保存的索引对不上时，按存储顺序逐个分区重建（未加载的分区读完即释放）"""
+        if not self.personal_records_ready():
+            from personal_records import PersonalRecords
+            prs = PersonalRecords()
+            for key in self.partition_keys():
+                part = self.parts.get(key)
+                if part is None:
+                    records = load_records(self.partition_path(key))
+                elif part.columns is not None:
+                    records = part.columns.to_records()
+                else:
+                    records = part.records
+                prs.fold(records)
+            self._prs = prs
+        return self._prs
+
+
+def load_partitioned(path: str, progress=None) -> List[dict]:
+    """按时间顺序读出全部分区的记录（导出、导入 SQLite 时使用）"""
+    store = PartitionedStore(path, read_only=True)
+    keys = store.partition_keys()
+    records = []
+    for i, key in enumerate(keys):
+        records.extend(load_records(store.partition_path(key)))
+        if progress is not None:
+            progress((i + 1) / len(keys))
+    return records
+
+
+def split_into_partitions(source: str, directory: str) -> int:
+    """把单个数据文件（含日志）按月拆分到分区目录并写出清单，返回记录条数"""
+    store = PartitionedStore(directory)
+    if store.partition_keys():
+        raise ValueError(f"目录中已有分区数据：{directory}")
+    records = load_records(source)
+    groups: Dict[str, List[dict]] = {}
+    for record in records:
+        groups.setdefault(partition_key(record["record_time"]), []).append(record)
+    os.makedirs(directory, exist_ok=True)
+    for key, group in groups.items():
+        path = store.partition_path(key)
+        write_snapshot_atomic(path, group)
+        totals = ActionStatsAggregator().update(group)
+        store.summaries[key] = _summary([record["id"] for record in group],
+                                        [record["record_time"] for record in group], totals, data_signature(path))
+    store._save_manifest()
+    return len(records)
@@ -0,0 +1,200 @@
+import json
+import os
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from workout_storage import atomic_write_json
+
+# 索引文件 = 数据文件名 + 后缀，例如 workout_data.json.prs
+PR_SUFFIX = ".prs"
+PR_VERSION = 1
+
+# 个人记录的种类
+WEIGHT_AT_REPS = "weight_at_reps"  # 某个次数下的最大重量
+REPS_AT_WEIGHT = "reps_at_weight"  # 某个重量下的最多次数
+BEST_E1RM = "e1rm"                 # 最佳估算 1RM（Epley 公式，与 training_load.epley 一致）
+
+# 一次破纪录：previous 为 None 表示该项第一次有成绩（只作为起点，不算破纪录）
+PREvent = namedtuple("PREvent", "name kind key value previous record_id time")
+
+
+def epley_1rm(weight: float, reps: int) -> float:
+    return weight * (1 + reps / 30.0)
+
+
+def weight_key(weight: float) -> str:
+    return f"{weight:g}"
+
+
+def describe(event: PREvent) -> str:
+    """破纪录的简短描述，用于状态栏"""
+    if event.kind == WEIGHT_AT_REPS:
+        text = f"{event.name} {event.key} 次最大重量 {event.value:g}kg"
+        unit = "kg"
+    elif event.kind == REPS_AT_WEIGHT:
+        text = f"{event.name} {event.key}kg 最多 {event.value} 次"
+        unit = " 次"
+    else:
+        text = f"{event.name} 估算1RM {event.value:.1f}kg"
+        unit = "kg"
+    if event.previous is not None:
+        previous = f"{event.previous:.1f}" if event.kind == BEST_E1RM else f"{event.previous:g}"
+        text += f"（原 {previous}{unit}）"
+    return text
+
+
+def edit_affects_records(old: dict, new: dict) -> bool:
+    """修改是否涉及个人记录用到的字段（动作、重量、次数）"""
+    return (old["name"] != new["name"] or float(old["weight"]) != float(new["weight"])
+            or int(old["reps"]) != int(new["reps"]))
+
+
+class PersonalRecords:
+    """
+    增量的个人记录索引，按动作保存：
+    每个次数下的最大重量、每个重量下的最多次数、最佳估算 1RM，以及按记录顺序的破纪录历史。
+    新增记录时只做几次字典查找（O(1)）；删除的记录出现在历史中、或修改了动作/重量/次数时需要整体重建。
+    索引保存在数据文件旁边，记下已合并的记录条数和最后一条的 id，启动时据此判断能否沿用。
+    """
+
+    def __init__(self):
+        # 动作 -> {"weight_at_reps": {次数: [重量, id, 时间]}, "reps_at_weight": {重量: [次数, id, 时间]},
+        #          "e1rm": [估算1RM, id, 时间] 或 None, "history": [[时间, 种类, 键, 值, 原值, id], ...]}
+        self.actions: Dict[str, dict] = {}
+        self.record_count = 0
+        self.last_id: Optional[int] = None
+        # 最近一次 add 产生的事件，供记录程序在新增后立即提示
+        self.last_events: List[PREvent] = []
+        # 出现在历史中的记录 id（当前最好成绩一定也在历史中）
+        self._history_ids = set()
+
+    # --- 构建与维护 ---
+    @classmethod
+    def open(cls, cache_path: str, ids: Sequence[int], records_from) -> "PersonalRecords":
+        """
+        读取索引文件；ids 为按存储顺序的全部记录 id，records_from(start) 返回从第 start 条起的记录。
+        索引与数据对得上时只合并之后新增的记录，否则由全部记录重建。
+        """
+        index = cls.load(cache_path)
+        if index is None or not index.covers(ids):
+            index = cls()
+        index.fold(records_from(index.record_count))
+        return index
+
+    def covers(self, ids: Sequence[int]) -> bool:
+        """已合并的记录是否仍是数据的前缀"""
+        n = self.record_count
+        return n <= len(ids) and (n == 0 or int(ids[n - 1]) == self.last_id)
+
+    def fold(self, records: Iterable[dict]):
+        self.last_events = []
+        for record in records:
+            self.add(record)
+
+    def add(self, record: dict) -> List[PREvent]:
+        """合并一条新记录，返回它刷新的各项记录"""
+        name = record["name"]
+        entry = self.actions.get(name)
+        if entry is None:
+            entry = self.actions[name] = {"weight_at_reps": {}, "reps_at_weight": {}, "e1rm": None, "history": []}
+        weight, reps = float(record["weight"]), int(record["reps"])
+        record_id, record_time = record["id"], record["record_time"]
+        events = []
+        if weight > 0:
+            # 徒手动作只比较次数
+            self._improve(entry["weight_at_reps"], name, WEIGHT_AT_REPS, str(reps), weight, record_id,
+                          record_time, events)
+            best = entry["e1rm"]
+            e1rm = epley_1rm(weight, reps)
+            if best is None or e1rm > best[0]:
+                entry["e1rm"] = [e1rm, record_id, record_time]
+                events.append(PREvent(name, BEST_E1RM, "", e1rm, best[0] if best else None, record_id, record_time))
+        self._improve(entry["reps_at_weight"], name, REPS_AT_WEIGHT, weight_key(weight), reps, record_id,
+                      record_time, events)
+        for event in events:
+            entry["history"].append([event.time, event.kind, event.key, event.value, event.previous, record_id])
+        if events:
+            self._history_ids.add(record_id)
+        self.record_count += 1
+        self.last_id = record_id
+        self.last_events = events
+        return events
+
+    @staticmethod
+    def _improve(table: dict, name: str, kind: str, key: str, value, record_id: int, record_time: int,
+                 events: List[PREvent]):
+        best = table.get(key)
+        if best is None or value > best[0]:
+            table[key] = [value, record_id, record_time]
+            events.append(PREvent(name, kind, key, value, best[0] if best else None, record_id, record_time))
+
+    def removed(self, ids: Iterable[int], record_count: int, last_id: Optional[int]) -> bool:
+        """
+        记录被删除后调用；返回 False 表示删除的记录出现在历史中，索引需要重建。
+        record_count/last_id 为删除后的数据状态。
+        """
+        if not self._history_ids.isdisjoint(ids):
+            return False
+        self.record_count, self.last_id = record_count, last_id
+        return True
+
+    def edited(self, old: dict, new: dict) -> bool:
+        """
+        记录被修改后调用（old/new 为修改前后的记录）；返回 False 表示需要重建。
+        只改了备注、RPE 等不影响个人记录的字段时沿用索引。动作、重量或次数变了就要重建：
+        新的值是否破纪录取决于这条记录之前的最好成绩，只和当前最好成绩比较会把纪录记到错误的记录上
+        """
+        return old["id"] not in self._history_ids and not edit_affects_records(old, new)
+
+    # --- 查询 ---
+    def best(self, name: str) -> Optional[dict]:
+        return self.actions.get(name)
+
+    def history(self, name: str, kind: Optional[str] = None) -> List[PREvent]:
+        """某个动作的破纪录历史（按记录顺序），可只取一种"""
+        entry = self.actions.get(name)
+        if entry is None:
+            return []
+        return [PREvent(name, event_kind, key, value, previous, record_id, time)
+                for time, event_kind, key, value, previous, record_id in entry["history"]
+                if kind is None or event_kind == kind]
+
+    # --- 读写索引文件 ---
+    @classmethod
+    def load(cls, path: str) -> Optional["PersonalRecords"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != PR_VERSION:
+            return None
+        index = cls()
+        index.actions = data["actions"]
+        index.record_count = data["record_count"]
+        index.last_id = data["last_id"]
+        index._history_ids = {event[5] for entry in index.actions.values() for event in entry["history"]}
+        return index
+
+    @staticmethod
+    def discard(path: str):
+        """
+        删除索引文件：删改使索引需要重建时调用。修改记录不改变条数和最后一条的 id，
+        旧索引仍能通过 covers 的校验，留着会在下次打开时被沿用
+        """
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def save(self, path: str):
+        data = {
+            "version": PR_VERSION,
+            "record_count": self.record_count,
+            "last_id": self.last_id,
+            "actions": self.actions,
+        }
+        try:
+            atomic_write_json(path, data, indent=None)
+        except OSError:
+            pass  # 索引写不进去不影响使用，下次启动时重新合并
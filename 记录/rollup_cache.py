@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from instrumentation import traced
+from workout_stats import ActionStatsAggregator
+from workout_storage import (JOURNAL_SUFFIX, atomic_write_json, load_records,
+                             read_journal_tail)
+
+# 缓存文件 = 数据文件名 + 后缀，例如 workout_data.json.rollup
+CACHE_SUFFIX = ".rollup"
+CACHE_VERSION = 2  # 版本 2：last_time 为整数秒
+DAILY_FIELDS = ['day', 'max_reps', 'total_sets', 'rpe_sum', 'count']
+# 重建时每合并这么多条记录汇报一次部分结果
+FOLD_CHUNK = 50000
+# 进度中解析所占的比例，其余为汇总
+PARSE_SHARE = 0.8
+
+
+def _sha256(path: str, limit: Optional[int] = None) -> str:
+    """计算文件（或其前 limit 字节）的 SHA-256"""
+    digest = hashlib.sha256()
+    remaining = limit
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def _file_state(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _sha256(path)}
+
+
+def _same_file(path: str, cached: Optional[dict]) -> bool:
+    """大小和修改时间都没变直接认为未变；只有修改时间变了才计算哈希确认"""
+    if cached is None or not os.path.exists(path):
+        return cached is None and not os.path.exists(path)
+    st = os.stat(path)
+    if st.st_size != cached["size"]:
+        return False
+    if st.st_mtime_ns == cached["mtime_ns"]:
+        return True
+    return _sha256(path) == cached["sha256"]
+
+
+class RollupIndex:
+    """
+    持久化的预汇总索引，保存在数据文件旁边的缓存文件中：
+    每个动作的累计统计，以及每个动作每天的汇总（最大次数、组数合计、RPE 合计、记录数）。
+    缓存用数据文件的大小、修改时间和内容哈希校验；日志只在末尾追加了新记录时增量扩展，否则重建。
+    """
+
+    def __init__(self, data_path: str):
+        self.data_path = data_path
+        self.journal_path = data_path + JOURNAL_SUFFIX
+        self.cache_path = data_path + CACHE_SUFFIX
+        self.aggregator = ActionStatsAggregator()
+        # 动作 -> {当天 0 点的 int64 秒: [max_reps, total_sets, rpe_sum, count]}
+        self.daily: Dict[str, Dict[int, list]] = {}
+        self.record_count = 0
+        self.last_record: Optional[dict] = None
+        self.sources: dict = {}
+        self.status = ""  # "hit" / "extended" / "rebuilt"，便于排查
+        self._progress = None
+
+    @property
+    def totals(self) -> Dict[str, dict]:
+        return self.aggregator.stats
+
+    @classmethod
+    @traced("rollup_open")
+    def open(cls, data_path: str, progress=None) -> "RollupIndex":
+        """
+        加载缓存；过期时增量扩展或重建，并写回缓存文件。
+        progress(比例, 部分统计) 回调用于在后台加载时汇报进度。
+        """
+        index = cls(data_path)
+        index._progress = progress
+        cached = index._read_cache()
+        if cached is not None and index._try_reuse(cached):
+            return index
+        index.rebuild()
+        return index
+
+    def _report(self, fraction: float, partial=None):
+        if self._progress is not None:
+            self._progress(fraction, partial)
+
+    def _load_records(self) -> List[dict]:
+        return load_records(self.data_path, lambda fraction: self._report(fraction * PARSE_SHARE))
+
+    def daily_series(self, name: str) -> Dict[str, "np.ndarray"]:
+        """某个动作按日期排序的按日汇总数组（格式同 chart_data.daily_from_series）"""
+        import numpy as np
+        rows = sorted(self.daily.get(name, {}).items())
+        table = np.array([[day] + values for day, values in rows], dtype=np.int64).reshape(-1, len(DAILY_FIELDS))
+        return {field: table[:, i] for i, field in enumerate(DAILY_FIELDS)}
+
+    # --- 构建与扩展 ---
+    def _current_sources(self) -> dict:
+        """在读取数据之前记录文件状态，读取期间文件若有变化则不写缓存"""
+        return {"snapshot": _file_state(self.data_path), "journal": _file_state(self.journal_path)}
+
+    def rebuild(self, records: Optional[List[dict]] = None, sources: Optional[dict] = None):
+        if records is None:
+            sources = self._current_sources()
+            records = self._load_records()
+        self.aggregator.reset()
+        self.daily = {}
+        self.record_count = 0
+        self.last_record = None
+        # 分块合并，每块之后把目前为止的统计作为部分结果汇报出去
+        for start in range(0, len(records), FOLD_CHUNK):
+            self._fold(records[start:start + FOLD_CHUNK])
+            fraction = PARSE_SHARE + (1 - PARSE_SHARE) * min(start + FOLD_CHUNK, len(records)) / len(records)
+            self._report(fraction, {name: dict(stats) for name, stats in self.totals.items()})
+        self.status = "rebuilt"
+        self._save(sources)
+
+    @traced("aggregate")
+    def _fold(self, records: List[dict]):
+        """把新记录合并到累计统计和按日汇总中"""
+        if not records:
+            return
+        # 在这里才导入 NumPy：缓存命中时分析程序启动不必加载它
+        from workout_columns import ColumnarRecords
+        columns = ColumnarRecords.from_records(records)
+        for name, part in columns.group_stats().items():
+            self.aggregator.merge(name, part['total_sets'], part['max_reps_per_set'], part['last_time'])
+        for name, part in columns.group_daily().items():
+            days = self.daily.setdefault(name, {})
+            for day, max_reps, total_sets, rpe_sum, count in zip(*(part[f].tolist() for f in DAILY_FIELDS)):
+                entry = days.get(day)
+                if entry is None:
+                    days[day] = [max_reps, total_sets, rpe_sum, count]
+                else:
+                    entry[0] = max(entry[0], max_reps)
+                    entry[1] += total_sets
+                    entry[2] += rpe_sum
+                    entry[3] += count
+        self.record_count += len(records)
+        self.last_record = records[-1]
+
+    def tail(self) -> Optional[List[dict]]:
+        """
+        跟踪数据文件的变化（分析程序自动刷新时定时调用，文件未变时只有几次 stat）：
+        未变化返回空列表；日志只在末尾追加了新记录时只读取追加的字节，合并进汇总后返回这些记录；
+        快照被重写、日志被压缩或含有删除/修改时返回 None，由调用方整体重新加载。
+        """
+        snapshot, journal = self.sources.get("snapshot"), self.sources.get("journal")
+        if not self._still_same(self.data_path, snapshot):
+            return None
+        if journal is None or not os.path.exists(self.journal_path):
+            return [] if journal is None and not os.path.exists(self.journal_path) else None
+        size = os.path.getsize(self.journal_path)
+        if size == journal["size"]:
+            return [] if self._still_same(self.journal_path, journal) else None
+        if size < journal["size"] or _sha256(self.journal_path, journal["size"]) != journal["sha256"]:
+            return None
+        ops, offset = read_journal_tail(self.journal_path, journal["size"])
+        if not all(entry.get("op") == "add" for entry in ops):
+            return None
+        records = [entry["record"] for entry in ops]
+        self._fold(records)
+        # 只在内存中记下消费到的位置，缓存文件留到下次启动时增量扩展
+        self.sources = {
+            "snapshot": snapshot,
+            "journal": {"size": offset, "mtime_ns": os.stat(self.journal_path).st_mtime_ns,
+                        "sha256": _sha256(self.journal_path, offset)},
+        }
+        return records
+
+    @staticmethod
+    def _still_same(path: str, state: Optional[dict]) -> bool:
+        """同 _same_file；内容未变而修改时间变了时更新记下的修改时间，下次轮询不必再算哈希"""
+        if not _same_file(path, state):
+            return False
+        if state is not None:
+            state["mtime_ns"] = os.stat(path).st_mtime_ns
+        return True
+
+    def _try_reuse(self, cached: dict) -> bool:
+        if cached.get("version") != CACHE_VERSION:
+            return False
+        self.aggregator.stats = cached["totals"]
+        self.daily = {name: {row[0]: row[1:] for row in rows} for name, rows in cached["daily"].items()}
+        self.record_count = cached["record_count"]
+        self.last_record = cached["last_record"]
+        self.sources = cached["sources"]
+
+        snapshot_same = _same_file(self.data_path, self.sources.get("snapshot"))
+        journal = self.sources.get("journal")
+        if snapshot_same and _same_file(self.journal_path, journal):
+            self.status = "hit"
+            return True
+
+        # 快照没变、日志只是在末尾追加：只读取新增的日志行
+        if snapshot_same and journal is not None and os.path.exists(self.journal_path) \
+                and os.path.getsize(self.journal_path) > journal["size"] \
+                and _sha256(self.journal_path, journal["size"]) == journal["sha256"]:
+            ops, offset = read_journal_tail(self.journal_path, journal["size"])
+            if all(entry.get("op") == "add" for entry in ops):
+                self._fold([entry["record"] for entry in ops])
+                self.status = "extended"
+                # 日志只记录已消费到的位置，末尾写了一半的行下次再读
+                self._save({
+                    "snapshot": self.sources["snapshot"],
+                    "journal": {"size": offset, "mtime_ns": os.stat(self.journal_path).st_mtime_ns,
+                                "sha256": _sha256(self.journal_path, offset)},
+                })
+                return True
+
+        # 快照被重写或日志中有删除/修改：已汇总的记录可能在原位被改过（只比较最后一条发现不了），
+        # 用已解析的记录整体重新汇总。逐条核对前缀与重新汇总的代价相当，不值得再区分
+        sources = self._current_sources()
+        self.rebuild(self._load_records(), sources)
+        return True
+
+    # --- 读写缓存文件 ---
+    def _read_cache(self) -> Optional[dict]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, sources: dict):
+        self.sources = sources
+        # 读取期间数据文件又被修改，缓存对应的状态已不确定，留到下次启动再写
+        for path, state in ((self.data_path, sources["snapshot"]), (self.journal_path, sources["journal"])):
+            if state is not None and (not os.path.exists(path) or os.stat(path).st_mtime_ns != state["mtime_ns"]):
+                return
+        data = {
+            "version": CACHE_VERSION,
+            "sources": self.sources,
+            "record_count": self.record_count,
+            "last_record": self.last_record,
+            "totals": self.totals,
+            "daily": {name: [[day] + values for day, values in sorted(days.items())]
+                      for name, days in self.daily.items()},
+        }
+        try:
+            atomic_write_json(self.cache_path, data, indent=None)
+        except OSError:
+            pass  # 缓存写不进去不影响使用，下次启动重新计算
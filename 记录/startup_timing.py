@@ -0,0 +1,56 @@
+import sys
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+
+class StartupTimer:
+    """
+    冷启动耗时统计：把启动拆成导入、加载、统计、首次绘制等阶段，
+    结束后输出报告，并可与启动预算比较。
+    """
+
+    def __init__(self, origin: float, budget_ms: Optional[float] = None):
+        self.origin = origin        # 计时起点（perf_counter 值）
+        self.budget_ms = budget_ms
+        self.phases: List[Tuple[str, float, float]] = []
+        self.milestones: List[Tuple[str, float]] = []
+
+    def add(self, name: str, start: float, end: float):
+        self.phases.append((name, start, end))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter())
+
+    def mark(self, name: str):
+        """记录从起点到此刻的时间点，如首次显示表格"""
+        self.milestones.append((name, time.perf_counter()))
+
+    def elapsed_ms(self, name: str) -> Optional[float]:
+        for milestone, at in self.milestones:
+            if milestone == name:
+                return (at - self.origin) * 1000
+        return None
+
+    def over_budget(self) -> bool:
+        first_paint = self.elapsed_ms("first_paint")
+        return self.budget_ms is not None and first_paint is not None and first_paint > self.budget_ms
+
+    def report(self) -> str:
+        lines = ["启动耗时报告（毫秒，自分析模块开始导入起）"]
+        for name, start, end in self.phases:
+            lines.append(f"  {name:<12}{(end - start) * 1000:>10.1f}")
+        for name, at in self.milestones:
+            lines.append(f"  @{name:<11}{(at - self.origin) * 1000:>10.1f}")
+        if self.budget_ms is not None:
+            verdict = "超出预算" if self.over_budget() else "符合预算"
+            lines.append(f"  首次显示预算 {self.budget_ms:.0f} ms：{verdict}")
+        return "\n".join(lines)
+
+    def print_report(self, stream=None):
+        print(self.report(), file=stream or sys.stdout)
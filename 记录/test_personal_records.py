@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from personal_records import WEIGHT_AT_REPS, PersonalRecords
+from workout_storage import JournalStore
+
+
+def _record(weight, reps, record_time, notes=""):
+    return {"name": "深蹲", "weight": weight, "sets": 3, "reps": reps, "rpe": 8, "rir": 2.0,
+            "notes": notes, "record_time": record_time}
+
+
+def _history(prs, kind=WEIGHT_AT_REPS):
+    return [(event.key, event.value, event.previous, event.record_id) for event in prs.history("深蹲", kind)]
+
+
+class EditedRecordTest(unittest.TestCase):
+    """修改记录后增量维护的索引要与整体重建的结果一致"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "workout_data.json")
+        self.store = JournalStore(self.path)
+        self.store.load()
+        # id 1-4：100x5、100x5、110x5、120x5，110kg 的纪录属于 id 3
+        self.store.append_many([_record(weight, 5, 1700000000 + i)
+                                for i, weight in enumerate((100.0, 100.0, 110.0, 120.0))])
+        self.store.personal_records()
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def rebuilt(self):
+        prs = PersonalRecords()
+        prs.fold(self.store.records)
+        return prs
+
+    def test_edit_that_beats_earlier_best_moves_the_record(self):
+        self.store.update(dict(self.store.by_id[2], weight=110.0))
+        history = _history(self.store.personal_records())
+        self.assertEqual(history, _history(self.rebuilt()))
+        self.assertEqual([record_id for _, value, _, record_id in history if value == 110.0], [2])
+
+    def test_edit_survives_reopen(self):
+        self.store.update(dict(self.store.by_id[2], weight=110.0))
+        self.store.close()
+        self.store = JournalStore(self.path)
+        self.store.load()
+        self.assertEqual(_history(self.store.personal_records()), _history(self.rebuilt()))
+
+    def test_edit_without_record_fields_keeps_index(self):
+        prs = self.store.personal_records()
+        self.store.update(dict(self.store.by_id[2], notes="换了鞋"))
+        self.assertIs(self.store.personal_records(), prs)
+
+
+if __name__ == "__main__":
+    unittest.main()
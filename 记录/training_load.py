@@ -0,0 +1,108 @@
+from typing import Dict
+
+import numpy as np
+
+from workout_columns import SECONDS_PER_DAY
+
+# 急性/慢性负荷的滚动窗口（天）
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+# 一般认为急慢性负荷比在此区间内受伤风险较低
+ACWR_SWEET_SPOT = (0.8, 1.3)
+
+# RPE 10（力竭）时完成 1~12 次对应的 1RM 百分比（RTS RPE 表）；
+# RPE 每低 1 相当于还能多做 1 次，按 "次数 + RIR" 查表
+RPE_TABLE_PERCENT = np.array([100.0, 95.5, 92.2, 89.2, 86.3, 83.7, 81.1, 78.6, 76.2, 73.9, 70.7, 68.0])
+# RPE 低于该值时自评误差太大，不用于估算
+RPE_TABLE_MIN_RPE = 6
+
+E1RM_LABELS = {"epley": "Epley", "brzycki": "Brzycki", "rpe": "RPE 表"}
+
+
+def epley(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    return weight * (1 + reps / 30.0)
+
+
+def brzycki(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    """次数接近 37 时公式发散，超出 1~36 次的记为 NaN"""
+    reps = reps.astype(np.float64)
+    valid = (reps >= 1) & (reps < 37)
+    return np.where(valid, weight * 36.0 / np.where(valid, 37.0 - reps, 1.0), np.nan)
+
+
+def rpe_table(weight: np.ndarray, reps: np.ndarray, rpe: np.ndarray) -> np.ndarray:
+    """按 RPE 表估算；查不到的组（RPE 过低或 次数 + RIR 超过 12）记为 NaN"""
+    to_failure = reps.astype(np.int64) + (10 - rpe.astype(np.int64))
+    valid = (rpe >= RPE_TABLE_MIN_RPE) & (to_failure >= 1) & (to_failure <= len(RPE_TABLE_PERCENT))
+    percent = RPE_TABLE_PERCENT[np.clip(to_failure, 1, len(RPE_TABLE_PERCENT)) - 1]
+    return np.where(valid, weight / (percent / 100.0), np.nan)
+
+
+def estimate_1rm(series: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """每一组的估算 1RM（三种方法）；徒手（重量为 0）的组记为 NaN"""
+    weight = series['weight'].astype(np.float64)
+    reps = series['reps']
+    loaded = weight > 0
+    return {
+        "epley": np.where(loaded, epley(weight, reps), np.nan),
+        "brzycki": np.where(loaded, brzycki(weight, reps), np.nan),
+        "rpe": np.where(loaded, rpe_table(weight, reps, series['rpe']), np.nan),
+    }
+
+
+def volume_load(series: Dict[str, np.ndarray]) -> np.ndarray:
+    """训练量 = 重量 × 组数 × 次数"""
+    return series['weight'].astype(np.float64) * series['sets'] * series['reps']
+
+
+def session_load(series: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    按训练日（session）汇总一个动作按时间排序的序列：
+    day（当天 0 点的 int64 秒）、volume_load（当天合计）、各方法当天最好的估算 1RM。
+    """
+    days = series['record_time'] // SECONDS_PER_DAY
+    if len(days) == 0:
+        empty = np.empty(0)
+        return {'day': empty.astype(np.int64), 'volume_load': empty, **{name: empty for name in E1RM_LABELS}}
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    sessions = {
+        'day': days[starts] * SECONDS_PER_DAY,
+        'volume_load': np.add.reduceat(volume_load(series), starts),
+    }
+    for name, values in estimate_1rm(series).items():
+        # fmax 忽略 NaN；整天都估算不了时结果仍为 NaN
+        sessions[name] = np.fmax.reduceat(values, starts)
+    return sessions
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """以每个位置结尾、长度 window 的滑动和（前缀和相减，O(n)）；开头不足一个窗口时按已有部分计算"""
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    lower = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+    return cumulative[1:] - cumulative[lower]
+
+
+def acute_chronic(day: np.ndarray, load: np.ndarray,
+                  acute_days: int = ACUTE_DAYS, chronic_days: int = CHRONIC_DAYS) -> Dict[str, np.ndarray]:
+    """
+    急性:慢性负荷比（滚动平均法）。
+    先把按训练日的负荷铺到连续的日历天上（休息日为 0），再用滑动和求 7 天和 28 天日均负荷。
+    历史不足一个慢性窗口的日期比值记为 NaN。
+    """
+    if len(day) == 0:
+        empty = np.empty(0)
+        return {'day': day, 'load': empty, 'acute': empty, 'chronic': empty, 'ratio': empty}
+    offsets = (day - day[0]) // SECONDS_PER_DAY
+    daily = np.bincount(offsets, weights=load, minlength=int(offsets[-1]) + 1)
+    acute = rolling_sum(daily, acute_days) / acute_days
+    chronic = rolling_sum(daily, chronic_days) / chronic_days
+    ratio = np.full(len(daily), np.nan)
+    ready = (np.arange(len(daily)) >= chronic_days - 1) & (chronic > 0)
+    ratio[ready] = acute[ready] / chronic[ready]
+    return {
+        'day': day[0] + np.arange(len(daily), dtype=np.int64) * SECONDS_PER_DAY,
+        'load': daily,
+        'acute': acute,
+        'chronic': chronic,
+        'ratio': ratio,
+    }
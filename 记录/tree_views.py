@@ -0,0 +1,155 @@
+from tkinter import ttk
+from typing import Callable, Hashable, List, Sequence
+
+# 默认行高与表头高度（像素），无法从主题读取时使用
+DEFAULT_ROW_HEIGHT = 20
+HEADING_HEIGHT = 25
+
+
+class TreeviewList:
+    """
+    普通列表：每条数据对应 Treeview 中的一行，行的 iid 就是记录的 id。
+    增删改时按 id 直接定位受影响的行，不再整表重建。
+    """
+
+    def __init__(self, tree: ttk.Treeview, scrollbar: ttk.Scrollbar, row_count: Callable[[], int],
+                 row_values: Callable[[int], Sequence], row_id: Callable[[int], Hashable]):
+        self.tree = tree
+        self.row_count = row_count
+        self.row_values = row_values
+        self.row_id = row_id
+        scrollbar.configure(command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+
+    def reset(self):
+        """整表重建，仅在加载数据时使用"""
+        self.tree.delete(*self.tree.get_children())
+        for index in range(self.row_count()):
+            self._insert(index)
+
+    def rows_appended(self, count: int = 1):
+        total = self.row_count()
+        for index in range(total - count, total):
+            self._insert(index)
+
+    def rows_deleted(self, ids: List[Hashable]):
+        self.tree.delete(*(str(row_id) for row_id in ids))
+
+    def row_updated(self, row_id: Hashable, values: Sequence):
+        self.tree.item(str(row_id), values=values)
+
+    def selected_ids(self) -> List[str]:
+        """选中行的 id（字符串形式的 iid）"""
+        return list(self.tree.selection())
+
+    def _insert(self, index: int):
+        self.tree.insert("", "end", iid=str(self.row_id(index)), values=self.row_values(index))
+
+
+class VirtualTreeview:
+    """
+    虚拟列表：Treeview 只保存视口内可见的若干行，滚动时复用这些行并填入新数据。
+    数据条数再多，每次刷新的代价也只与可见行数有关。
+    """
+
+    def __init__(self, tree: ttk.Treeview, scrollbar: ttk.Scrollbar, row_count: Callable[[], int],
+                 row_values: Callable[[int], Sequence], row_id: Callable[[int], Hashable]):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_count = row_count
+        self.row_values = row_values
+        self.row_id = row_id
+        self.first = 0          # 视口第一行对应的数据下标
+        self.visible_rows = 1
+        self.selected = set()   # 选中记录的 id，滚动和删除其他行后仍保留
+        self._visible_ids = []  # 视口内各行对应的记录 id
+
+        row_height = ttk.Style(tree).lookup("Treeview", "rowheight")
+        self.row_height = int(row_height) if row_height else DEFAULT_ROW_HEIGHT
+
+        scrollbar.configure(command=self._on_scrollbar)
+        tree.bind("<Configure>", self._on_configure)
+        tree.bind("<MouseWheel>", self._on_mousewheel)
+        tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        tree.bind("<Button-5>", lambda e: self.scroll(3))
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+
+    # --- 对外接口 ---
+    def reset(self):
+        self.first = 0
+        self.selected.clear()
+        self._render()
+
+    def rows_appended(self, count: int = 1):
+        self._render()
+
+    def rows_deleted(self, ids: List[Hashable]):
+        self.selected.difference_update(str(row_id) for row_id in ids)
+        self._render()
+
+    def row_updated(self, row_id: Hashable, values: Sequence):
+        # 只需刷新视口内的行
+        self._render()
+
+    def selected_ids(self) -> List[str]:
+        """选中记录的 id（字符串形式，与 TreeviewList 一致）"""
+        return list(self.selected)
+
+    def scroll(self, delta: int):
+        self.first += delta
+        self._render()
+
+    # --- 内部实现 ---
+    def _max_first(self) -> int:
+        return max(0, self.row_count() - self.visible_rows)
+
+    def _render(self):
+        total = self.row_count()
+        self.first = min(max(self.first, 0), self._max_first())
+        count = min(self.visible_rows, total - self.first)
+
+        children = list(self.tree.get_children())
+        if len(children) > count:
+            self.tree.delete(*children[count:])
+            children = children[:count]
+        while len(children) < count:
+            children.append(self.tree.insert("", "end"))
+        self._visible_ids = [str(self.row_id(self.first + offset)) for offset in range(count)]
+        for offset, item_id in enumerate(children):
+            self.tree.item(item_id, values=self.row_values(self.first + offset))
+        self.tree.selection_set([item_id for item_id, row_id in zip(children, self._visible_ids)
+                                 if row_id in self.selected])
+
+        if total:
+            self.scrollbar.set(self.first / total, (self.first + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_configure(self, event):
+        visible_rows = max(1, (event.height - HEADING_HEIGHT) // self.row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self._render()
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.first = int(float(args[0]) * self.row_count())
+        elif action == "scroll":
+            amount, unit = int(args[0]), args[1]
+            self.first += amount * (self.visible_rows if unit == "pages" else 1)
+        self._render()
+
+    def _on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_select(self, event):
+        # 只替换视口内的选择状态，视口外已选中的行保持不变
+        self.selected.difference_update(self._visible_ids)
+        self.selected.update(self._visible_ids[self.tree.index(item_id)] for item_id in self.tree.selection())
+
+
+def make_list_view(virtual: bool, tree: ttk.Treeview, scrollbar: ttk.Scrollbar, row_count: Callable[[], int],
+                   row_values: Callable[[int], Sequence], row_id: Callable[[int], Hashable]):
+    view_class = VirtualTreeview if virtual else TreeviewList
+    return view_class(tree, scrollbar, row_count, row_values, row_id)
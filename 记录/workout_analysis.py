@@ -0,0 +1,261 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from workout_schema import format_epoch
+from workout_storage import SQLITE_SUFFIXES, SQLiteStore, data_exists
+from partitioned_store import PartitionedStore, contains_partitions, is_partitioned
+
+# 批量分析时在目录中查找的数据文件名；按月分区的目录（见 partitioned_store）整个作为一个数据源
+DEFAULT_PATTERNS = ("workout_data.json", "workout_data.db")
+# 记录程序默认的分区目录名
+DEFAULT_PARTITION_DIR = "workout_data"
+CSV_FIELDS = ["athlete", "action", "total_sets", "max_reps_per_set", "last_trained"]
+AGGREGATE_ATHLETE = "（全部）"
+
+
+def summarize_actions(totals: Dict[str, dict]) -> Dict[str, dict]:
+    """按动作的累计统计 -> 展示用的统计（重点：单次最大次数），与界面表格的列一致"""
+    return {
+        name: {
+            'total_sets': stats['total_sets'],
+            'max_reps_per_set': stats['max_reps_per_set'],
+            'last_trained': format_epoch(stats['last_time'], "%Y-%m-%d"),
+        }
+        for name, stats in totals.items()
+    }
+
+
+def read_totals(path: str, progress=None):
+    """打开数据文件，返回 (记录条数, 按动作的累计统计)；JSON 数据读取旁路汇总缓存"""
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        store = SQLiteStore(path, read_only=True)
+        try:
+            count = store.conn.execute("SELECT COUNT(*) FROM workout").fetchone()[0]
+            return count, store.action_stats()
+        finally:
+            store.close()
+    if is_partitioned(path):
+        # 分区目录直接合并清单中的各分区摘要，只有摘要对不上的分区才读取
+        store = PartitionedStore(path, read_only=True)
+        try:
+            store.load(progress)
+            return store.total_count(), store.action_stats()
+        finally:
+            store.close_parts()
+    # 在这里才导入 NumPy，避免拖慢只需要 summarize_actions 的调用方
+    from rollup_cache import RollupIndex
+    rollups = RollupIndex.open(path, progress=progress)
+    return rollups.record_count, rollups.totals
+
+
+def _name_parts(path: str) -> List[str]:
+    """运动员名的候选组成部分，由近到远：默认文件名时从所在目录开始，否则从文件名开始，再逐级向上"""
+    directory, base = os.path.split(os.path.abspath(path))
+    default = base in DEFAULT_PATTERNS or base == DEFAULT_PARTITION_DIR and os.path.isdir(path)
+    parts = [] if default else [os.path.splitext(base)[0]]
+    while True:
+        directory, name = os.path.split(directory)
+        if not name:
+            break
+        parts.append(name)
+    return parts or [os.path.splitext(base)[0]]
+
+
+def athlete_name(path: str) -> str:
+    """默认文件名时用所在目录名作为运动员名，否则用文件名"""
+    return _name_parts(path)[0]
+
+
+def athlete_names(paths: List[str]) -> List[str]:
+    """
+    批量分析时每个文件的运动员名。名字重复时（如 roster/a/2024 与 roster/b/2024 下的默认文件）
+    逐级加上上层目录名直到能区分（"a/2024"、"b/2024"），仍重复的（同一文件给了两次）加上序号，
+    保证图表文件不会互相覆盖。
+    """
+    parts = [_name_parts(path) for path in paths]
+    depths = [1] * len(paths)
+
+    def name(i):
+        return "/".join(reversed(parts[i][:depths[i]]))
+
+    while True:
+        groups: Dict[str, List[int]] = {}
+        for i in range(len(paths)):
+            groups.setdefault(chart_file_name(name(i)).casefold(), []).append(i)
+        # 同一文件给了多次时再往上加目录也区分不开
+        deeper = [i for group in groups.values() if len({tuple(parts[i]) for i in group}) > 1
+                  for i in group if depths[i] < len(parts[i])]
+        if not deeper:
+            break
+        for i in deeper:
+            depths[i] += 1
+    names, seen = [], {}
+    for i in range(len(paths)):
+        key = chart_file_name(name(i)).casefold()
+        seen[key] = seen.get(key, 0) + 1
+        names.append(name(i) if seen[key] == 1 else f"{name(i)} ({seen[key]})")
+    return names
+
+
+def chart_file_name(athlete: str) -> str:
+    return athlete.replace("/", "_")
+
+
+def analyze_file(path: str, chart_dir: Optional[str] = None, athlete: Optional[str] = None) -> dict:
+    """
+    分析单个数据文件（在工作进程中运行）；athlete 默认由路径得出。
+    出错时不抛出异常，而是在结果中记录 error，避免一个坏文件中断整批任务。
+    """
+    athlete = athlete or athlete_name(path)
+    result = {"athlete": athlete, "path": path, "record_count": 0, "actions": {}}
+    try:
+        if not data_exists(path):
+            raise FileNotFoundError(f"未找到数据文件：{path}")
+        result["record_count"], totals = read_totals(path)
+        result["actions"] = summarize_actions(totals)
+        if chart_dir is not None:
+            result["chart"] = render_total_sets_png(
+                result["actions"], os.path.join(chart_dir, f"{chart_file_name(athlete)}.png"),
+                f"{result['athlete']} 各锻炼动作总训练组数")
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def aggregate(results: List[dict]) -> Dict[str, dict]:
+    """合并所有运动员的统计：每个动作的练习人数、总组数、最大单组次数、最近训练日期"""
+    combined: Dict[str, dict] = {}
+    for result in results:
+        for name, stats in result["actions"].items():
+            entry = combined.get(name)
+            if entry is None:
+                combined[name] = dict(stats, athletes=1)
+                continue
+            entry['athletes'] += 1
+            entry['total_sets'] += stats['total_sets']
+            entry['max_reps_per_set'] = max(entry['max_reps_per_set'], stats['max_reps_per_set'])
+            entry['last_trained'] = max(entry['last_trained'], stats['last_trained'])
+    return combined
+
+
+def render_total_sets_png(actions: Dict[str, dict], path: str, title: str) -> str:
+    """用 Agg 后端把各动作总组数柱状图保存为 PNG（不需要显示器）"""
+    import matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
+    matplotlib.rcParams['axes.unicode_minus'] = False    # 用来正常显示负号
+
+    figure = Figure(figsize=(8, 5))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    if actions:
+        names = list(actions)
+        bars = ax.bar(names, [actions[name]['total_sets'] for name in names], color='lightgreen')
+        ax.bar_label(bars)
+        ax.tick_params(axis='x', rotation=45)
+    else:
+        ax.text(0.5, 0.5, '无数据可显示', ha='center', va='center', transform=ax.transAxes)
+    ax.set_title(title)
+    ax.set_ylabel('总组数')
+    ax.set_xlabel('锻炼动作')
+    figure.tight_layout()
+    figure.savefig(path, dpi=100)
+    return path
+
+
+def find_data_files(paths: List[str], patterns=DEFAULT_PATTERNS) -> List[str]:
+    """展开参数：文件原样保留，目录中递归查找默认文件名的数据文件"""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for directory, _, names in sorted(os.walk(path)):
+            if contains_partitions(directory):
+                files.append(directory)
+                continue
+            files.extend(os.path.join(directory, name) for name in sorted(names) if name in patterns)
+    return files
+
+
+def analyze_files(paths: List[str], workers: Optional[int] = None, chart_dir: Optional[str] = None,
+                  progress=None) -> List[dict]:
+    """把文件分发到进程池中并行分析，结果按输入顺序返回；workers=1 时在本进程中执行"""
+    if chart_dir is not None:
+        os.makedirs(chart_dir, exist_ok=True)
+    names = athlete_names(paths)
+    if workers == 1 or len(paths) <= 1:
+        results = []
+        for path, athlete in zip(paths, names):
+            results.append(analyze_file(path, chart_dir, athlete))
+            if progress:
+                progress(len(results), len(paths))
+        return results
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 每个任务只返回小的统计字典，分块提交以减少进程间往返
+        chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+        for result in executor.map(analyze_file, paths, [chart_dir] * len(paths), names,
+                                   chunksize=chunksize):
+            results.append(result)
+            if progress:
+                progress(len(results), len(paths))
+    return results
+
+
+def write_json(results: List[dict], stream):
+    json.dump({"athletes": results, "aggregate": aggregate(results)}, stream, ensure_ascii=False, indent=2)
+    stream.write("\n")
+
+
+def write_csv(results: List[dict], stream):
+    """每行一个 (运动员, 动作)，最后附上所有运动员合并后的行"""
+    writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for result in results:
+        for name, stats in result["actions"].items():
+            writer.writerow(dict(stats, athlete=result["athlete"], action=name))
+    for name, stats in aggregate(results).items():
+        writer.writerow(dict(stats, athlete=AGGREGATE_ATHLETE, action=name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量分析多个运动员的锻炼数据（无需图形界面）")
+    parser.add_argument("paths", nargs="+", help="数据文件，或包含 workout_data.json/.db 的目录")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("-o", "--output", help="输出文件，默认输出到标准输出")
+    parser.add_argument("--charts", metavar="DIR", help="把每个运动员的总组数图保存为 PNG")
+    parser.add_argument("-j", "--workers", type=int, help="工作进程数，默认等于 CPU 核数")
+    args = parser.parse_args()
+
+    paths = find_data_files(args.paths)
+    if not paths:
+        parser.error("没有找到数据文件")
+    results = analyze_files(paths, workers=args.workers, chart_dir=args.charts,
+                            progress=lambda done, total: print(f"\r已分析 {done}/{total}", end="", file=sys.stderr))
+    print(file=sys.stderr)
+
+    write = write_json if args.format == "json" else write_csv
+    if args.output:
+        newline = "" if args.format == "csv" else None
+        with open(args.output, "w", encoding="utf-8-sig" if args.format == "csv" else "utf-8",
+                  newline=newline) as f:
+            write(results, f)
+    else:
+        write(results, sys.stdout)
+
+    failed = [result for result in results if "error" in result]
+    for result in failed:
+        print(f"{result['path']}: {result['error']}", file=sys.stderr)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
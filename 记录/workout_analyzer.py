@@ -1,77 +1,289 @@
+import time
+_IMPORT_STARTED = time.perf_counter()  # 冷启动计时起点
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import json
+import argparse
 import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from datetime import datetime
-from collections import defaultdict
+import sys
+from workout_analysis import summarize_actions
+from workout_schema import RPE_MAX, RPE_MIN, SECONDS_PER_DAY, time_to_epoch
+from personal_records import BEST_E1RM, PR_SUFFIX, WEIGHT_AT_REPS, PersonalRecords
+from workout_storage import SQLiteStore, data_exists, data_signature, is_binary_snapshot, open_store
+from partitioned_store import MANIFEST_NAME, PartitionedStore
+from background import BackgroundTask
+from chart_cache import ChartCache
+from startup_timing import StartupTimer
+from debug_panel import bind_debug_panel
+from instrumentation import TRACER, count, span, traced
+_IMPORT_FINISHED = time.perf_counter()
 
 # 在 workout_analyzer.py 文件顶部附近
 DATA_FILE = "workout_data.json" # <-- 确保这里是正确的文件名
-# --- 全局设置 ---
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
-plt.rcParams['axes.unicode_minus'] = False    # 用来正常显示负号
+
+# matplotlib 导入要几百毫秒，推迟到第一次绘制图表时再加载，统计表格可以先显示出来
+# 图表数据的降采样和训练负荷计算要用 NumPy，同样推迟到这时（汇总缓存命中时启动完全不用 NumPy）
+Figure = FigureCanvasTkAgg = date2num = None
+np = chart_data = training_load = None
+
+
+def _load_plotting():
+    global Figure, FigureCanvasTkAgg, date2num, np, chart_data, training_load
+    if Figure is not None:
+        return
+    import numpy as np
+    import chart_data
+    import training_load
+    import matplotlib
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.dates import date2num
+    from matplotlib.figure import Figure
+    # --- 全局设置 ---
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
+    matplotlib.rcParams['axes.unicode_minus'] = False    # 用来正常显示负号
 
 DATA_FILE = "workout_data.json"
+# 自动刷新时检查数据文件的间隔（毫秒）；文件未变时每次只有几次 stat
+WATCH_INTERVAL_MS = 1000
+# 最近显示过的图表位图最多占用的内存
+CHART_CACHE_BYTES = 64 * 1024 * 1024
+# 等待原始记录时显示的提示，这种图表不缓存
+LOADING_TEXT = '正在加载原始数据…'
 
 class WorkoutAnalyzer:
-    def __init__(self, root):
+    def __init__(self, root, store=None, timer=None):
+        """
+        root 可以是 Tk 或 Toplevel。
+        store 由启动器传入时直接使用与记录窗口共享的内存数据，新增记录会立即反映到统计和图表中。
+        timer 为 StartupTimer 时记录各启动阶段的耗时，首次绘制图表后输出报告。
+        """
         self.root = root
+        self.timer = timer
+        self._load_started = None
+        self.shared_store = store
+        self._store_is_shared = False
+        self._shared_refresh_job = None
         self.root.title("锻炼数据可视化分析（次数/组数重点）")
         self.root.geometry("1000x700")
 
-        self.workout_data = []
+        self._init_state()
+
+        # 先画出窗口，数据在后台线程中加载
+        self._time_phase("widgets", self._create_widgets)
+
+        # 绑定窗口大小变化事件
+        self.root.bind("<Configure>", self._on_window_resize)
+        bind_debug_panel(self.root)
+        if self.shared_store is not None:
+            self.shared_store.add_listener(self._on_store_event)
+            self.root.bind("<Destroy>", self._on_destroy, add="+")
+        self._load_data()
+        self._watch_job = self.root.after(WATCH_INTERVAL_MS, self._poll_data_file)
+
+    def _init_state(self):
+        """与界面控件无关的状态（无界面的基准测试子类也调用）"""
+        self.store = None
+        # JSON/日志数据的预汇总缓存；有缓存时原始记录只在需要时才读取
+        self.rollups = None
+        self._records_loaded = False
         self.action_stats = {}
+        # 未筛选的累计统计；筛选条件为 None 时表格和图表显示全部记录
+        self._totals = {}
+        self.record_filter = None
+        self._action_filter_vars = {}
+        # 表格中每行当前显示的值，用于只更新有变化的行
+        self._table_rows = {}
 
-        # 用于存储图表和画布的引用，以便在刷新时正确销毁
+        # 图表和画布只创建一次，之后原地更新
         self.figure = None
+        self.ax = None
+        self.canvas = None
         self.canvas_widget = None
+        self._chart_kind = None      # 当前坐标轴上绘制的内容，变化时才重建元素
+        self._chart_artists = {}
+        # 绘制好的图表位图，切换回最近看过的图表时直接贴图，不必重新布局和绘制。
+        # 键含数据版本：整体重新加载时递增 _data_generation，新增记录时只递增涉及的动作
+        # （键 None 对应总组数图，任何新增都会改变它）
+        self._chart_cache = ChartCache(CHART_CACHE_BYTES)
+        self._data_generation = 0
+        self._action_generations = {}
+        self._shown_chart_key = None  # 画布上当前内容对应的键，None 表示不缓存
+        self._figure_stale = False    # 画布显示的是缓存的位图，图表元素是之前的图表
+        self._shared_changed_names = set()
+        # 窗口大小变化的合并计时器
+        self._resize_job = None
+        self._last_chart_size = None
+        # 后台任务：读取数据/计算统计、按需读取原始记录
+        self._load_task = None
+        self._raw_task = None
+        # 自动刷新：定时检查数据文件，SQLite 记下上次的 data_version
+        self._watch_job = None
+        self._data_version = None
+        self._data_signature = None
+        # 独立运行且原始记录未读取时，直接使用数据文件旁的个人记录索引
+        self._prs = None
 
-        self._load_data()
-        self._create_widgets()
+    def _load_data(self, notify=False):
+        """在后台线程加载数据并计算统计，完成后再更新界面"""
+        if self._load_task is not None and not self._load_task.finished:
+            self._load_task.cancel()
+        self._load_task = None
+        if self.shared_store is not None:
+            self._load_shared(notify)
+            return
+        if not data_exists(DATA_FILE):
+            self._set_loading(False, "")
+            self._finish_startup_timing()
+            messagebox.showwarning("提示", f"未找到数据文件 '{DATA_FILE}'。请先使用记录程序添加数据。")
+            return
+        data_file = DATA_FILE
+        self._set_loading(True, "正在加载数据…")
+        self._load_started = time.perf_counter()
+        task = BackgroundTask(self.root, lambda task: self._read_data(task, data_file), on_done=None)
+        # 回调在任务创建之后再绑定，包装时才能拿到任务本身
+        task.on_done = self._if_current_load(task, lambda result: self._on_data_loaded(result, notify))
+        task.on_progress = self._if_current_load(task, self._on_load_progress)
+        task.on_error = self._if_current_load(task, self._on_load_error)
+        task.on_cancelled = self._if_current_load(task, lambda: self._set_loading(False, "已取消加载"))
+        self._load_task = task.start()
 
-        # 绑定窗口大小变化事件
-        self.root.bind("<Configure>", self._on_window_resize)
+    def _if_current_load(self, task, callback):
+        """包装加载任务的回调：重新加载会取消正在进行的任务，被取代的任务不能再改动进度和状态"""
+        return lambda *args: callback(*args) if task is self._load_task else None
 
-    def _load_data(self):
-        """从JSON文件加载数据"""
-        if not os.path.exists(DATA_FILE):
-            messagebox.showwarning("提示", f"未找到数据文件 '{DATA_FILE}'。请先使用记录程序添加数据。")
+    @staticmethod
+    @traced("load")
+    def _read_data(task, data_file):
+        """工作线程：打开存储并得到按动作的累计统计（不能操作界面）"""
+        store = open_store(data_file, read_only=True)
+        if isinstance(store, SQLiteStore):
+            # SQLite 直接查询数据库
+            return store, None, store.action_stats()
+        if isinstance(store, PartitionedStore):
+            # 分区目录：累计统计由清单中的摘要合并，分区等到画趋势或筛选时按需加载
+            store.load(progress=lambda fraction: task.report(fraction))
+            return store, None, store.action_stats()
+        if is_binary_snapshot(data_file):
+            # 二进制快照直接映射文件，统计在映射的数组上向量化计算，不需要汇总缓存
+            store.load(progress=lambda fraction: task.report(fraction))
+            count("records_loaded", len(store.columns))
+            return store, None, store.action_stats()
+        # JSON/日志数据读取旁路汇总缓存（有效时毫秒级），原始记录等到画原始趋势时再加载
+        from rollup_cache import RollupIndex
+        rollups = RollupIndex.open(data_file, progress=task.report)
+        count("records_loaded", rollups.record_count)
+        return store, rollups, rollups.totals
+
+    def _load_shared(self, notify=False, changed_names=None):
+        """共享存储模式：统计直接由内存中的记录增量计算"""
+        if not self.shared_store.loaded:
+            # 启动器仍在后台加载，完成后会通知 "reload"
+            self.status_var.set("正在加载数据…")
             return
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                self.workout_data = json.load(f)
-            self._calculate_action_stats()
-        except Exception as e:
-            messagebox.showerror("错误", f"加载数据失败: {e}")
+        self._on_data_loaded((self.shared_store, None, self.shared_store.action_stats()), notify, changed_names)
 
-    def _calculate_action_stats(self):
-        """计算每个动作的统计信息（重点：单次最大次数）"""
-        if not self.workout_data:
+    def _on_store_event(self, event, payload):
+        # 新增记录只影响其动作的图表；删除、修改（可能改了动作名）和清空时全部作废
+        if self._shared_changed_names is not None:
+            if event == "add":
+                self._shared_changed_names.add(payload["name"])
+            else:
+                self._shared_changed_names = None
+        # 连续的修改合并为一次刷新
+        if self._shared_refresh_job is None:
+            self._shared_refresh_job = self.root.after_idle(self._refresh_shared)
+
+    def _refresh_shared(self):
+        self._shared_refresh_job = None
+        changed_names, self._shared_changed_names = self._shared_changed_names, set()
+        if self.shared_store is not None:
+            self._load_shared(changed_names=changed_names)
+
+    def _on_destroy(self, event):
+        if event.widget is self.root and self.shared_store is not None:
+            self.shared_store.remove_listener(self._on_store_event)
+
+    def _on_data_loaded(self, result, notify, changed_names=None):
+        """changed_names 为共享存储新增记录涉及的动作，None 表示数据整体变化"""
+        store, rollups, totals = result
+        self._invalidate_charts(changed_names)
+        # 共享存储归启动器所有，不能在这里关闭
+        if self.store is not None and self.store is not store and not self._store_is_shared:
+            self.store.close()
+        self.store, self.rollups = store, rollups
+        self._prs = None
+        self._store_is_shared = store is self.shared_store
+        self._records_loaded = rollups is None
+        self._data_version = store.data_version() if isinstance(store, SQLiteStore) else None
+        self._data_signature = data_signature(DATA_FILE)
+        if self.timer is not None and self._load_started is not None:
+            self.timer.add("load", self._load_started, time.perf_counter())
+        self._time_phase("stats", self._show_stats, totals)
+        if self._raw_task is None or self._raw_task.finished:
+            # 有筛选条件时可能已在后台读取原始记录，保持加载状态
+            self._set_loading(False, f"共 {len(self.action_stats)} 个动作")
+        if self.canvas is None:
+            # 第一次绘图要导入 matplotlib，先把表格画到屏幕上
+            self.root.update_idletasks()
+            if self.timer is not None:
+                self.timer.mark("first_paint")
+        self._time_phase("chart", self._update_chart)
+        self._finish_startup_timing()
+        if notify:
+            messagebox.showinfo("成功", "数据已刷新！")
+
+    def _show_stats(self, totals):
+        self._totals = totals
+        self._update_filter_actions()
+        if self.record_filter is not None:
+            totals = self._filtered_totals()
+            if totals is None:
+                # 原始记录读取完成后再统计
+                return
+        self._calculate_action_stats(totals)
+        self._populate_action_table()
+        self._update_action_selector()
+
+    def _time_phase(self, name, func, *args):
+        """启动计时尚未结束时记录 func 的耗时"""
+        if self.timer is None:
+            return func(*args)
+        with self.timer.phase(name):
+            return func(*args)
+
+    def _finish_startup_timing(self):
+        """首次绘制完成（或没有数据可加载）时输出启动报告，之后不再计时"""
+        if self.timer is None:
             return
+        timer, self.timer = self.timer, None
+        # 图表用 draw_idle 延后绘制，在这里处理掉，计入首次显示图表的时间
+        self.root.update_idletasks()
+        timer.mark("chart_paint")
+        timer.print_report()
 
-        action_dict = defaultdict(list)
-        for item in self.workout_data:
-            action_name = item['name']
-            action_dict[action_name].append(item)
+    def _on_load_progress(self, fraction, partial):
+        self.progress_var.set(fraction * 100)
+        if partial:
+            # 重建汇总时先显示已经统计出的部分结果
+            self._calculate_action_stats(partial)
+            self._populate_action_table()
 
+    def _on_load_error(self, error):
+        self._set_loading(False, "")
+        self._finish_startup_timing()
+        messagebox.showerror("错误", f"加载数据失败: {error}")
+
+    def _set_loading(self, loading, status):
+        self.progress_var.set(0)
+        self.status_var.set(status)
+        self.cancel_button.configure(state=tk.NORMAL if loading else tk.DISABLED)
+
+    @traced("action_stats")
+    def _calculate_action_stats(self, totals):
+        """计算每个动作的统计信息（重点：单次最大次数）"""
         self.action_stats.clear()
-        for name, entries in action_dict.items():
-            # 计算总训练组数
-            total_sets = sum(entry['sets'] for entry in entries)
-            # 计算该动作记录中的最大单组次数
-            max_reps_per_set = max(entry['reps'] for entry in entries)
-            # 获取最近一次训练的时间
-            last_date_str = max(entry['record_time'] for entry in entries)
-            last_date = datetime.strptime(last_date_str, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d")
-
-            self.action_stats[name] = {
-                'total_sets': total_sets,
-                'max_reps_per_set': max_reps_per_set,
-                'last_trained': last_date,
-                'entries': entries
-            }
+
+        # 总组数、最大单组次数、最近训练时间来自汇总缓存，或由存储层计算（SQLite 下为一条 GROUP BY）
+        self.action_stats.update(summarize_actions(totals))
 
     def _create_widgets(self):
         """创建UI界面"""
@@ -82,6 +294,17 @@ class WorkoutAnalyzer:
         control_frame.pack(fill=tk.X, pady=5)
         ttk.Button(control_frame, text="刷新数据", command=self._on_refresh).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="选择数据文件", command=self._on_select_file).pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(control_frame, text="取消加载", command=self._on_cancel_loading,
+                                        state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        # 共享数据本来就实时更新，自动刷新只对独立打开的数据文件起作用
+        self.watch_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(control_frame, text="自动刷新", variable=self.watch_var).pack(side=tk.LEFT, padx=5)
+        self.progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(control_frame, variable=self.progress_var, maximum=100, length=200).pack(side=tk.LEFT, padx=5)
+        self.status_var = tk.StringVar()
+        ttk.Label(control_frame, textvariable=self.status_var).pack(side=tk.LEFT, padx=5)
+        self._create_filter_controls(main_frame)
 
         paned_window = ttk.PanedWindow(main_frame, orient=tk.VERTICAL)
         paned_window.pack(fill=tk.BOTH, expand=True)
@@ -95,7 +318,123 @@ class WorkoutAnalyzer:
         self.chart_frame = chart_frame # 保存引用，用于后续绘制
 
         self._update_action_selector()
-        self._update_chart() # 初始绘制图表
+        # 图表在数据加载完成后才创建，此前显示占位文字
+        self.chart_placeholder = ttk.Label(chart_frame, text="图表将在数据加载后显示", anchor=tk.CENTER)
+        self.chart_placeholder.pack(fill=tk.BOTH, expand=True)
+
+    def _create_filter_controls(self, parent):
+        """筛选：日期区间、动作多选、RPE 区间；统计表格和图表只针对命中的记录"""
+        frame = ttk.Frame(parent)
+        frame.pack(fill=tk.X, pady=5)
+        self.filter_start_var = tk.StringVar()
+        self.filter_end_var = tk.StringVar()
+        ttk.Label(frame, text="日期:").pack(side=tk.LEFT, padx=(5, 2))
+        ttk.Entry(frame, textvariable=self.filter_start_var, width=11).pack(side=tk.LEFT)
+        ttk.Label(frame, text="至").pack(side=tk.LEFT, padx=2)
+        ttk.Entry(frame, textvariable=self.filter_end_var, width=11).pack(side=tk.LEFT)
+
+        ttk.Label(frame, text="动作:").pack(side=tk.LEFT, padx=(10, 2))
+        self.action_filter_button = ttk.Menubutton(frame, text="全部动作", width=12)
+        self.action_filter_menu = tk.Menu(self.action_filter_button, tearoff=False)
+        self.action_filter_button["menu"] = self.action_filter_menu
+        self.action_filter_button.pack(side=tk.LEFT)
+
+        self.rpe_min_var = tk.StringVar(value=str(RPE_MIN))
+        self.rpe_max_var = tk.StringVar(value=str(RPE_MAX))
+        ttk.Label(frame, text="RPE:").pack(side=tk.LEFT, padx=(10, 2))
+        ttk.Spinbox(frame, from_=RPE_MIN, to=RPE_MAX, textvariable=self.rpe_min_var, width=3).pack(side=tk.LEFT)
+        ttk.Label(frame, text="-").pack(side=tk.LEFT, padx=2)
+        ttk.Spinbox(frame, from_=RPE_MIN, to=RPE_MAX, textvariable=self.rpe_max_var, width=3).pack(side=tk.LEFT)
+
+        ttk.Button(frame, text="应用筛选", command=self._on_apply_filter).pack(side=tk.LEFT, padx=(10, 5))
+        ttk.Button(frame, text="清除筛选", command=self._on_clear_filter).pack(side=tk.LEFT, padx=5)
+
+    def _update_filter_actions(self):
+        """动作多选菜单跟随全部动作（而不是筛选后的动作），已勾选的保持不变"""
+        names = list(self._totals)
+        if names == list(self._action_filter_vars):
+            return
+        old = self._action_filter_vars
+        self._action_filter_vars = {name: old.get(name) or tk.BooleanVar(value=False) for name in names}
+        self.action_filter_menu.delete(0, tk.END)
+        self.action_filter_menu.add_command(label="全部动作", command=self._on_all_actions)
+        self.action_filter_menu.add_separator()
+        for name, var in self._action_filter_vars.items():
+            self.action_filter_menu.add_checkbutton(label=name, variable=var,
+                                                    command=self._update_action_filter_label)
+        self._update_action_filter_label()
+
+    def _on_all_actions(self):
+        for var in self._action_filter_vars.values():
+            var.set(False)
+        self._update_action_filter_label()
+
+    def _update_action_filter_label(self):
+        chosen = sum(var.get() for var in self._action_filter_vars.values())
+        self.action_filter_button.configure(text=f"已选 {chosen} 个" if chosen else "全部动作")
+
+    @staticmethod
+    def _parse_date(text, label):
+        text = text.strip()
+        if not text:
+            return None
+        try:
+            return time_to_epoch(text)
+        except ValueError:
+            raise ValueError(f"{label}格式应为 YYYY-MM-DD：{text}")
+
+    def _read_filter(self):
+        """读取筛选控件；没有任何限制时返回 None。输入有误时抛出 ValueError"""
+        start = self._parse_date(self.filter_start_var.get(), "起始日期")
+        end = self._parse_date(self.filter_end_var.get(), "结束日期")
+        if end is not None:
+            end += SECONDS_PER_DAY  # 结束日期当天包含在内
+        if start is not None and end is not None and start >= end:
+            raise ValueError("起始日期不能晚于结束日期！")
+        try:
+            rpe_min, rpe_max = int(self.rpe_min_var.get()), int(self.rpe_max_var.get())
+        except ValueError:
+            raise ValueError(f"RPE请输入 {RPE_MIN}-{RPE_MAX} 之间的整数！")
+        if not (RPE_MIN <= rpe_min <= rpe_max <= RPE_MAX):
+            raise ValueError(f"RPE区间应在 {RPE_MIN}-{RPE_MAX} 之间，且下限不大于上限！")
+        chosen = frozenset(name for name, var in self._action_filter_vars.items() if var.get())
+        from workout_query import RecordFilter  # 查询索引要用 NumPy，第一次筛选时才导入
+        record_filter = RecordFilter(start, end, chosen or None, rpe_min, rpe_max)
+        return None if record_filter.is_unrestricted() else record_filter
+
+    def _on_apply_filter(self):
+        try:
+            record_filter = self._read_filter()
+        except ValueError as e:
+            messagebox.showerror("筛选条件错误", str(e))
+            return
+        self.record_filter = record_filter
+        self._refresh_filtered()
+
+    def _on_clear_filter(self):
+        self.filter_start_var.set("")
+        self.filter_end_var.set("")
+        self.rpe_min_var.set(str(RPE_MIN))
+        self.rpe_max_var.set(str(RPE_MAX))
+        self._on_all_actions()
+        self.record_filter = None
+        self._refresh_filtered()
+
+    def _filtered_totals(self):
+        """按当前筛选条件统计；原始记录尚未读取时在后台读取并返回 None"""
+        if not self._ensure_records(series=False):
+            return None
+        return self.store.filtered_stats(self.record_filter)
+
+    def _refresh_filtered(self):
+        """筛选条件或数据变化后，重新统计表格并重画图表"""
+        if self.store is None:
+            return
+        self._show_stats(self._totals)
+        if self.record_filter is None or self._records_ready(series=False):
+            suffix = "（已筛选）" if self.record_filter is not None else ""
+            self.status_var.set(f"共 {len(self.action_stats)} 个动作{suffix}")
+            self._update_chart()
 
     def _create_action_table(self, parent):
         """创建动作库统计表格"""
@@ -119,79 +458,440 @@ class WorkoutAnalyzer:
 
         self._populate_action_table()
 
+    @traced("table_populate")
     def _populate_action_table(self):
-        """填充动作库表格数据"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        """填充动作库表格数据（以动作名称为行 ID，只更新发生变化的行）"""
+        for name in set(self.tree.get_children()) - set(self.action_stats):
+            self.tree.delete(name)
+            self._table_rows.pop(name, None)
         for name, stats in self.action_stats.items():
-            self.tree.insert("", tk.END, values=(
-                name, stats['total_sets'], stats['max_reps_per_set'], stats['last_trained']
-            ))
+            values = (name, stats['total_sets'], stats['max_reps_per_set'], stats['last_trained'])
+            if not self.tree.exists(name):
+                self.tree.insert("", tk.END, iid=name, values=values)
+            elif self._table_rows.get(name) != values:
+                self.tree.item(name, values=values)
+            self._table_rows[name] = values
 
-    def _update_chart(self):
-        """根据选择更新图表"""
-        # 如果已有图表，先销毁
-        if self.canvas_widget:
-            self.canvas_widget.destroy()
+    def _ensure_canvas(self):
+        """图表和画布只创建一次，之后原地更新"""
+        if self.canvas is not None:
+            return
+        self._time_phase("plot_import", _load_plotting)
+        self.chart_placeholder.destroy()
+        # 直接使用 Figure 而不是 plt.subplots，避免图表被 pyplot 的全局注册表持有
+        self.figure = Figure(figsize=(4, 3))
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.chart_frame)
+        # draw_idle 推迟到空闲时才真正绘制，包装 draw 才能计入 matplotlib 的绘制耗时
+        self.canvas.draw = traced("chart_draw")(self.canvas.draw)
+        self.canvas.mpl_connect('draw_event', self._on_chart_drawn)
+        self.canvas_widget = self.canvas.get_tk_widget()
+        self.canvas_widget.pack(fill=tk.BOTH, expand=True)
+
+    def _base_font_size(self) -> float:
+        # 根据当前frame大小动态调整字体，设置最小尺寸避免窗口太小时出错
+        width = max(self.chart_frame.winfo_width() / 100, 4)  # 转换为英寸
+        height = max(self.chart_frame.winfo_height() / 100, 3)
+        return min(width, height) * 4
 
+    @traced("chart_update")
+    def _update_chart(self):
+        """根据选择更新图表（复用已有的图表元素，只替换数据）；最近显示过的同一图表直接贴缓存的位图"""
+        self._ensure_canvas()
         chart_type = self.chart_type_var.get() if hasattr(self, 'chart_type_var') else "total_sets"
+        key = self._chart_key(chart_type)
+        region = self._chart_cache.get(key)
+        if region is not None:
+            count("chart_cache_hit")
+            self._shown_chart_key = key
+            self._figure_stale = True
+            self.canvas.restore_region(region)
+            self.canvas.blit(self.figure.bbox)
+            return
+        count("chart_cache_miss")
 
-        # 根据当前frame大小动态调整图大小和字体
-        width = self.chart_frame.winfo_width() / 100  # 转换为英寸
-        height = self.chart_frame.winfo_height() / 100
-        # 设置一个最小尺寸，避免窗口太小时出错
-        width = max(width, 4)
-        height = max(height, 3)
+        if chart_type == "total_sets":
+            self._draw_total_sets()
+        elif chart_type == "reps_trend":
+            self._draw_reps_trend()
+        elif chart_type == "e1rm_trend":
+            self._draw_e1rm_trend()
+        elif chart_type == "acwr":
+            self._draw_acwr()
+        elif chart_type == "pr_history":
+            self._draw_pr_history()
 
-        # 计算基础字体大小
-        base_font_size = min(width, height) * 4
+        self._shown_chart_key = None if self._chart_kind == ("empty", LOADING_TEXT) else key
+        self._figure_stale = False
+        self._apply_chart_style()
 
-        self.figure, self.ax = plt.subplots(figsize=(width, height))
+    def _chart_key(self, chart_type):
+        """缓存键：(数据版本, 图表类型, 动作, 显示方式, 筛选条件, 画布像素尺寸)"""
+        action = None if chart_type == "total_sets" else (
+            self.action_selector_var.get() if hasattr(self, 'action_selector_var') else "")
+        mode = self.trend_mode_var.get() if chart_type == "reps_trend" and hasattr(self, 'trend_mode_var') else None
+        version = (self._data_generation, self._action_generations.get(action, 0))
+        return version, chart_type, action, mode, self.record_filter, self.canvas.get_width_height()
 
-        if chart_type == "total_sets":
-            if not self.action_stats:
-                self.ax.text(0.5, 0.5, '无数据可显示', horizontalalignment='center',
-                             verticalalignment='center', transform=self.ax.transAxes, fontsize=base_font_size)
+    def _invalidate_charts(self, names=None):
+        """数据变化后作废缓存的图表：names 为新增记录涉及的动作，None 表示全部"""
+        if names is None:
+            self._data_generation += 1
+            self._action_generations.clear()
+            self._chart_cache.clear()
+            self._shown_chart_key = None
+            return
+        affected = set(names) | {None}
+        for action in affected:
+            self._action_generations[action] = self._action_generations.get(action, 0) + 1
+        self._chart_cache.discard(lambda key: key[2] in affected)
+        if self._shown_chart_key is not None and self._shown_chart_key[2] in affected:
+            self._shown_chart_key = None
+
+    def _on_chart_drawn(self, event):
+        """每次真正绘制之后、显示到屏幕之前调用：缓存刚画好的位图，或在图表元素过期时换回缓存的位图"""
+        key = self._shown_chart_key
+        if key is None or key[-1] != self.canvas.get_width_height():
+            return
+        if self._figure_stale:
+            # 之前排队的 draw_idle 画的是旧图表，屏幕上应保持缓存的这张
+            region = self._chart_cache.peek(key)
+            if region is not None:
+                self.canvas.restore_region(region)
+        elif key not in self._chart_cache:
+            region = self.canvas.copy_from_bbox(self.figure.bbox)
+            self._chart_cache.put(key, region, memoryview(region).nbytes)
+
+    def _reset_axes(self, kind):
+        """图表类型改变时才清空坐标轴并重新创建元素"""
+        if self._chart_kind == kind:
+            return False
+        if 'twin' in self._chart_artists:
+            self._chart_artists['twin'].remove()
+        self.ax.clear()
+        self._chart_artists = {}
+        self._chart_kind = kind
+        return True
+
+    def _show_empty_chart(self, message='无数据可显示'):
+        if self._reset_axes(("empty", message)):
+            self._chart_artists['message'] = self.ax.text(
+                0.5, 0.5, message, horizontalalignment='center',
+                verticalalignment='center', transform=self.ax.transAxes)
+
+    def _draw_total_sets(self):
+        if not self.action_stats:
+            self._show_empty_chart()
+            return
+        action_names = list(self.action_stats.keys())
+        total_sets = [self.action_stats[name]['total_sets'] for name in action_names]
+
+        # 动作列表不变时只修改柱高和标签，否则重建柱状图
+        if self._reset_axes(("total_sets", tuple(action_names))):
+            bars = self.ax.bar(action_names, total_sets, color='lightgreen')
+            labels = [self.ax.text(bar.get_x() + bar.get_width() / 2., 0, '', ha='center', va='bottom')
+                      for bar in bars]
+            self._chart_artists.update(bars=bars, labels=labels)
+            self.ax.set_title('各锻炼动作总训练组数')
+            self.ax.set_ylabel('总组数')
+            self.ax.set_xlabel('锻炼动作')
+            self.ax.tick_params(axis='x', rotation=45)
+
+        for bar, label, value in zip(self._chart_artists['bars'], self._chart_artists['labels'], total_sets):
+            bar.set_height(value)
+            label.set_y(value + 0.5)
+            label.set_text(f'{int(value)}')
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def _draw_reps_trend(self):
+        selected_action = self.action_selector_var.get() if hasattr(self, 'action_selector_var') else ""
+        if selected_action not in self.action_stats:
+            self._show_empty_chart()
+            return
+        trend_mode = self.trend_mode_var.get() if hasattr(self, 'trend_mode_var') else "auto"
+        series = None
+        # 有筛选条件时按日数据由筛选后的记录计算，不用汇总缓存
+        use_rollups = self.rollups is not None and self.record_filter is None
+        if trend_mode == "raw" or not use_rollups:
+            series = self._action_series(selected_action)
+            if series is None:
+                self._show_empty_chart(LOADING_TEXT)
+                return
+
+        if self._reset_axes(("reps_trend",)):
+            self.ax.xaxis_date()
+            twin = self.ax.twinx()
+            line, = self.ax.plot([], [], marker='o', linestyle='-', color='coral', zorder=3)
+            # 平均RPE与次数量级相近，画在主坐标轴上；组数合计画在右侧副坐标轴
+            rpe_line, = self.ax.plot([], [], linestyle='--', color='steelblue', label='平均RPE')
+            self._chart_artists.update(line=line, twin=twin, rpe_line=rpe_line, sets_bars=None)
+            self.ax.set_zorder(twin.get_zorder() + 1)  # 折线画在柱子上面
+            self.ax.patch.set_visible(False)
+            self.ax.set_ylabel('单组最大次数 / 平均RPE')
+            self.ax.set_xlabel('日期')
+            self.ax.grid(True, linestyle='--', alpha=0.6)
+            # 格式化x轴日期
+            self.figure.autofmt_xdate()
+
+        artists = self._chart_artists
+        if artists['sets_bars'] is not None:
+            artists['sets_bars'].remove()
+            artists['sets_bars'] = None
+
+        if trend_mode == "raw":
+            # 原始数据：点数过多时用 LTTB 降采样，保留曲线形状
+            times = series['record_time']
+            keep = chart_data.lttb(times, series['reps'])
+            dates = date2num(times[keep].astype("datetime64[s]"))
+            artists['line'].set_data(dates, series['reps'][keep])
+            artists['rpe_line'].set_data([], [])
+            artists['twin'].set_visible(False)
+            title_suffix = "原始数据" if len(keep) == len(times) else f"降采样 {len(keep)}/{len(times)} 点"
+        else:
+            # 按可见时间跨度自动选择日/周/月汇总，按日数据优先取自汇总缓存
+            if use_rollups:
+                daily = self.rollups.daily_series(selected_action)
             else:
-                action_names = list(self.action_stats.keys())
-                total_sets = [self.action_stats[name]['total_sets'] for name in action_names]
-                bars = self.ax.bar(action_names, total_sets, color='lightgreen')
-                self.ax.set_title('各锻炼动作总训练组数', fontsize=base_font_size * 1.2)
-                self.ax.set_ylabel('总组数', fontsize=base_font_size)
-                self.ax.set_xlabel('锻炼动作', fontsize=base_font_size)
-                self.ax.tick_params(axis='x', rotation=45, labelsize=base_font_size * 0.8)
-                self.ax.tick_params(axis='y', labelsize=base_font_size * 0.8)
-                for bar in bars:
-                    height_val = bar.get_height()
-                    self.ax.text(bar.get_x() + bar.get_width()/2., height_val + 0.5,
-                                 f'{int(height_val)}', ha='center', va='bottom', fontsize=base_font_size * 0.7)
+                daily = chart_data.daily_from_series(series)
+            bucket = chart_data.choose_bucket(int(daily['day'][-1] - daily['day'][0]))
+            buckets = chart_data.rollup(daily, bucket)
+            dates = date2num(buckets['record_time'].astype("datetime64[s]"))
+            artists['line'].set_data(dates, buckets['max_reps'])
+            artists['rpe_line'].set_data(dates, buckets['mean_rpe'])
+            twin = artists['twin']
+            twin.set_visible(True)
+            width = {"day": 0.8, "week": 5, "month": 24}[bucket]
+            artists['sets_bars'] = twin.bar(dates, buckets['total_sets'], width=width, align='edge',
+                                            color='lightgreen', alpha=0.4, label='组数合计')
+            twin.set_ylabel('组数合计')
+            twin.relim()
+            twin.autoscale_view()
+            title_suffix = chart_data.BUCKET_LABELS[bucket]
 
-        elif chart_type == "reps_trend":
-            selected_action = self.action_selector_var.get() if hasattr(self, 'action_selector_var') else ""
-            if not selected_action or selected_action not in self.action_stats or not self.action_stats[selected_action]['entries']:
-                self.ax.text(0.5, 0.5, '无数据可显示', horizontalalignment='center',
-                             verticalalignment='center', transform=self.ax.transAxes, fontsize=base_font_size)
+        self.ax.set_title(f"'{selected_action}' 的单组最大次数变化趋势（{title_suffix}）")
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def _selected_sessions(self):
+        """所选动作按训练日汇总的训练量和估算 1RM；原始数据尚在加载或无数据时返回 (None, 提示)"""
+        selected_action = self.action_selector_var.get() if hasattr(self, 'action_selector_var') else ""
+        if selected_action not in self.action_stats:
+            return None, '无数据可显示'
+        series = self._action_series(selected_action)
+        if series is None:
+            return None, LOADING_TEXT
+        return (selected_action, training_load.session_load(series)), None
+
+    def _draw_e1rm_trend(self):
+        result, message = self._selected_sessions()
+        if result is None:
+            self._show_empty_chart(message)
+            return
+        selected_action, sessions = result
+        if self._reset_axes(("e1rm_trend",)):
+            self.ax.xaxis_date()
+            lines = {name: self.ax.plot([], [], marker='.', linestyle='-', label=label)[0]
+                     for name, label in training_load.E1RM_LABELS.items()}
+            self._chart_artists.update(lines=lines, legend=self.ax.legend(loc='upper left'))
+            self.ax.set_ylabel('估算1RM (kg)')
+            self.ax.set_xlabel('日期')
+            self.ax.grid(True, linestyle='--', alpha=0.6)
+            self.figure.autofmt_xdate()
+
+        dates = date2num(sessions['day'].astype("datetime64[s]"))
+        for name, line in self._chart_artists['lines'].items():
+            line.set_data(dates, sessions[name])
+        self.ax.set_title(f"'{selected_action}' 每次训练的最佳估算1RM")
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def _draw_acwr(self):
+        result, message = self._selected_sessions()
+        if result is None:
+            self._show_empty_chart(message)
+            return
+        selected_action, sessions = result
+        if self._reset_axes(("acwr",)):
+            self.ax.xaxis_date()
+            twin = self.ax.twinx()
+            acute, = self.ax.plot([], [], color='coral', label=f'急性负荷（{training_load.ACUTE_DAYS}天日均）')
+            chronic, = self.ax.plot([], [], color='steelblue', label=f'慢性负荷（{training_load.CHRONIC_DAYS}天日均）')
+            ratio, = twin.plot([], [], color='dimgray', linestyle='--', label='急慢性负荷比')
+            twin.axhspan(*training_load.ACWR_SWEET_SPOT, color='lightgreen', alpha=0.25)
+            twin.set_ylabel('急慢性负荷比')
+            self._chart_artists.update(
+                twin=twin, lines={'acute': acute, 'chronic': chronic, 'ratio': ratio},
+                legend=self.ax.legend(handles=[acute, chronic, ratio], loc='upper left'))
+            self.ax.set_ylabel('训练量 (kg×组×次)')
+            self.ax.set_xlabel('日期')
+            self.ax.grid(True, linestyle='--', alpha=0.6)
+            self.figure.autofmt_xdate()
+
+        load = training_load.acute_chronic(sessions['day'], sessions['volume_load'])
+        dates = date2num(load['day'].astype("datetime64[s]"))
+        lines = self._chart_artists['lines']
+        for name in ('acute', 'chronic', 'ratio'):
+            lines[name].set_data(dates, load[name])
+        twin = self._chart_artists['twin']
+        self.ax.set_title(f"'{selected_action}' 训练量与急慢性负荷比")
+        for axis in (self.ax, twin):
+            axis.relim()
+            axis.autoscale_view()
+
+    def _draw_pr_history(self):
+        selected_action = self.action_selector_var.get() if hasattr(self, 'action_selector_var') else ""
+        if selected_action not in self.action_stats:
+            self._show_empty_chart()
+            return
+        prs = self._personal_records()
+        if prs is None:
+            self._show_empty_chart(LOADING_TEXT)
+            return
+        # 历史按记录顺序保存，补录的旧记录可能排在后面，画图前按时间排序
+        e1rm = sorted(prs.history(selected_action, BEST_E1RM), key=lambda event: event.time)
+        weights = sorted(prs.history(selected_action, WEIGHT_AT_REPS), key=lambda event: event.time)
+        if not e1rm:
+            self._show_empty_chart('该动作没有负重记录')
+            return
+        if self._reset_axes(("pr_history",)):
+            self.ax.xaxis_date()
+            step, = self.ax.step([], [], where='post', color='coral', label='最佳估算1RM')
+            points, = self.ax.plot([], [], marker='o', linestyle='', color='steelblue', alpha=0.6,
+                                   label='各次数最大重量')
+            self._chart_artists.update(lines={'e1rm': step, 'weight': points},
+                                       legend=self.ax.legend(loc='upper left'))
+            self.ax.set_ylabel('重量 (kg)')
+            self.ax.set_xlabel('日期')
+            self.ax.grid(True, linestyle='--', alpha=0.6)
+            self.figure.autofmt_xdate()
+
+        lines = self._chart_artists['lines']
+        for name, events in (('e1rm', e1rm), ('weight', weights)):
+            times = np.array([event.time for event in events], dtype='datetime64[s]')
+            values = np.array([event.value for event in events], dtype=float)
+            if name == 'e1rm':
+                # 阶梯线表示截至当时的最好成绩
+                values = np.maximum.accumulate(values)
+            lines[name].set_data(date2num(times), values)
+        broken = sum(event.previous is not None for event in e1rm)
+        self.ax.set_title(f"'{selected_action}' 的个人记录进展（估算1RM 刷新 {broken} 次）")
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def _personal_records(self):
+        """个人记录索引；需要先在后台读取原始记录时返回 None"""
+        if self._prs is None and self.rollups is not None and not self._records_loaded:
+            # 记录程序关闭时保存的索引与汇总缓存对应同一份数据时，不必读取原始记录
+            prs = PersonalRecords.load(DATA_FILE + PR_SUFFIX)
+            last = self.rollups.last_record
+            if prs is not None and prs.record_count == self.rollups.record_count \
+                    and prs.last_id == (last["id"] if last else None):
+                self._prs = prs
+        if self._prs is not None:
+            return self._prs
+        if isinstance(self.store, PartitionedStore) and self.store.personal_records_ready():
+            return self.store.personal_records()
+        if not self._ensure_records(all_history=True):
+            return None
+        return self.store.personal_records()
+
+    def _action_series(self, name):
+        """所选动作（满足筛选条件）的原始记录序列（时间为 int64 秒）；原始数据尚未读取时返回 None"""
+        if not self._ensure_records(name):
+            return None
+        if self.record_filter is not None:
+            return self.store.filtered_series(name, self.record_filter)
+        return self.store.action_series(name)
+
+    def _missing_partitions(self, name=None, series=True, all_history=False):
+        """分区存储回答查询还要加载的分区；其他存储返回 None"""
+        if not isinstance(self.store, PartitionedStore):
+            return None
+        return self.store.missing_partitions(name, None if all_history else self.record_filter, series)
+
+    def _records_ready(self, name=None, series=True, all_history=False):
+        missing = self._missing_partitions(name, series, all_history)
+        return self._records_loaded if missing is None else not missing
+
+    def _ensure_records(self, name=None, series=True, all_history=False):
+        """
+        原始记录已在内存中时返回 True；否则在后台读取（完成后刷新统计和图表）并返回 False。
+        分区存储只读取查询涉及的分区：name 为所选动作（None 表示全部动作），
+        series=False 表示只要统计，完全落在筛选范围内的分区直接用摘要。
+        """
+        missing = self._missing_partitions(name, series, all_history)
+        if missing is None and self._records_loaded or missing == []:
+            return True
+        if self._raw_task is None or self._raw_task.finished:
+            # 工作线程不能读取 Tk 变量，筛选条件在读取期间也可能变化，先在主线程取好
+            store = self.store
+            build_index = self.record_filter is not None
+            build_prs = self.chart_type_var.get() == "pr_history"
+            self._set_loading(True, "正在加载原始数据…" if missing is None
+                              else f"正在加载 {len(missing)} 个月的数据…")
+            self._raw_task = BackgroundTask(
+                self.root, lambda task: self._read_raw(task, store, build_index, build_prs, missing),
+                on_done=lambda result: self._on_raw_loaded(store),
+                on_progress=lambda fraction, partial: self.progress_var.set(fraction * 100),
+                on_error=self._on_load_error,
+                on_cancelled=lambda: self._set_loading(False, "已取消加载"),
+            ).start()
+        return False
+
+    @staticmethod
+    def _read_raw(task, store, build_index, build_prs=False, partitions=None):
+        """
+        工作线程：读取原始记录（partitions 不为 None 时只加载这些分区）；
+        要筛选时顺便建立查询索引，查看个人记录时顺便准备个人记录索引
+        """
+        if partitions is not None:
+            store.load_partitions(partitions, progress=lambda f: task.report(f))
+        else:
+            store.reload(progress=lambda f: task.report(f))
+        if build_index:
+            store.query_index()
+        if build_prs:
+            store.personal_records()
+
+    def _on_raw_loaded(self, store):
+        self._set_loading(False, "")
+        if store is self.store:
+            self._records_loaded = True
+            if self.record_filter is not None:
+                self._refresh_filtered()
             else:
-                entries = self.action_stats[selected_action]['entries']
-                entries.sort(key=lambda x: x['record_time'])
-                dates = [datetime.strptime(entry['record_time'], "%Y-%m-%d %H:%M:%S") for entry in entries]
-                max_reps = [entry['reps'] for entry in entries]
-
-                self.ax.plot(dates, max_reps, marker='o', linestyle='-', color='coral', markersize=base_font_size * 0.5)
-                self.ax.set_title(f"'{selected_action}' 的单组最大次数变化趋势", fontsize=base_font_size * 1.1)
-                self.ax.set_ylabel('单组最大次数', fontsize=base_font_size)
-                self.ax.set_xlabel('日期', fontsize=base_font_size)
-                self.ax.grid(True, linestyle='--', alpha=0.6)
-                self.ax.tick_params(axis='x', rotation=45, labelsize=base_font_size * 0.7)
-                self.ax.tick_params(axis='y', labelsize=base_font_size * 0.7)
-                # 格式化x轴日期
-                self.figure.autofmt_xdate()
-
-        self.figure.tight_layout()
-
-        canvas = FigureCanvasTkAgg(self.figure, master=self.chart_frame)
-        self.canvas_widget = canvas.get_tk_widget()
-        self.canvas_widget.pack(fill=tk.BOTH, expand=True)
+                self._update_chart()
+
+    def _apply_chart_style(self):
+        """按当前画布大小设置字体和标记大小，然后重新布局并绘制"""
+        base_font_size = self._base_font_size()
+        artists = self._chart_artists
+        if 'message' in artists:
+            artists['message'].set_fontsize(base_font_size)
+        for label in artists.get('labels', []):
+            label.set_fontsize(base_font_size * 0.7)
+        if 'line' in artists:
+            artists['line'].set_markersize(base_font_size * 0.5)
+        if 'twin' in artists:
+            artists['twin'].yaxis.label.set_fontsize(base_font_size)
+            artists['twin'].tick_params(axis='y', labelsize=base_font_size * 0.7)
+        if 'legend' in artists:
+            for text in artists['legend'].get_texts():
+                text.set_fontsize(base_font_size * 0.7)
+        if 'line' in artists or 'lines' in artists:
+            tick_size = base_font_size * 0.7
+            self.ax.title.set_fontsize(base_font_size * 1.1)
+        else:
+            tick_size = base_font_size * 0.8
+            self.ax.title.set_fontsize(base_font_size * 1.2)
+        self.ax.xaxis.label.set_fontsize(base_font_size)
+        self.ax.yaxis.label.set_fontsize(base_font_size)
+        self.ax.tick_params(axis='both', labelsize=tick_size)
+
+        with span("tight_layout"):
+            self.figure.tight_layout()
+        self.canvas.draw_idle()
 
     def _create_chart_controls(self, parent):
         """创建图表控制组件（内部使用）"""
@@ -205,12 +905,25 @@ class WorkoutAnalyzer:
                         value="total_sets", command=self._update_chart).pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(chart_control_frame, text="动作单次最大次数趋势", variable=self.chart_type_var,
                         value="reps_trend", command=self._update_chart).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(chart_control_frame, text="估算1RM", variable=self.chart_type_var,
+                        value="e1rm_trend", command=self._update_chart).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(chart_control_frame, text="急慢性负荷比", variable=self.chart_type_var,
+                        value="acwr", command=self._update_chart).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(chart_control_frame, text="PR 进展", variable=self.chart_type_var,
+                        value="pr_history", command=self._update_chart).pack(side=tk.LEFT, padx=5)
 
         self.action_selector_var = tk.StringVar()
         self.action_selector = ttk.Combobox(chart_control_frame, textvariable=self.action_selector_var, state="readonly")
         self.action_selector.pack(side=tk.LEFT, padx=5)
         self.action_selector.bind("<<ComboboxSelected>>", lambda e: self._update_chart())
 
+        # 趋势图：自动按日/周/月汇总，或显示（降采样后的）原始数据
+        self.trend_mode_var = tk.StringVar(value="auto")
+        ttk.Radiobutton(chart_control_frame, text="周期汇总", variable=self.trend_mode_var,
+                        value="auto", command=self._update_chart).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(chart_control_frame, text="原始数据", variable=self.trend_mode_var,
+                        value="raw", command=self._update_chart).pack(side=tk.LEFT, padx=5)
+
     def _update_action_selector(self):
         """更新趋势分析的动作选择下拉框"""
         if not hasattr(self, 'action_selector_var'):
@@ -218,34 +931,120 @@ class WorkoutAnalyzer:
 
         action_names = list(self.action_stats.keys())
         self.action_selector['values'] = action_names
-        if action_names:
+        # 刷新或筛选后尽量保持原来选中的动作
+        if action_names and self.action_selector_var.get() not in action_names:
             self.action_selector_var.set(action_names[0])
 
     # --- 事件处理函数 ---
     def _on_window_resize(self, event):
         """当窗口大小改变时调用"""
-        # 为了避免过于频繁地重绘，可以加一个判断，只有当窗口大小变化较大时才重绘
         if event.widget == self.root:
-            # 使用after延迟执行，确保在窗口大小稳定后再重绘
-            self.root.after(200, self._update_chart)
+            # 拖动窗口会连续触发事件，每次都取消尚未执行的重绘，只保留最后一次
+            if self._resize_job is not None:
+                self.root.after_cancel(self._resize_job)
+            self._resize_job = self.root.after(200, self._on_resize_settled)
+
+    def _on_resize_settled(self):
+        self._resize_job = None
+        size = (self.chart_frame.winfo_width(), self.chart_frame.winfo_height())
+        # 仅移动窗口时尺寸不变，无需重绘
+        if size == self._last_chart_size or self.canvas is None:
+            return
+        self._last_chart_size = size
+        if self._figure_stale:
+            # 画布上是缓存的位图，图表元素属于之前的图表，按新尺寸重新绘制当前图表
+            self._update_chart()
+            return
+        if self._shown_chart_key is not None:
+            self._shown_chart_key = self._shown_chart_key[:-1] + (self.canvas.get_width_height(),)
+        # 画布本身随控件自动缩放，这里只按新尺寸调整字体和布局
+        self._apply_chart_style()
+
+    def _poll_data_file(self):
+        """
+        自动刷新：文件只在末尾追加了记录时只读取新增部分，增量合并统计，
+        并只更新受影响的表格行和图表；文件被重写时才在后台整体重新加载。
+        """
+        self._watch_job = None
+        if not self.root.winfo_exists():
+            return
+        self._watch_job = self.root.after(WATCH_INTERVAL_MS, self._poll_data_file)
+        if not self.watch_var.get() or self.store is None or self._store_is_shared:
+            return
+        if any(task is not None and not task.finished for task in (self._load_task, self._raw_task)):
+            # 正在读取的数据可能已包含新记录，读完后再检查
+            return
+        if isinstance(self.store, SQLiteStore):
+            version = self.store.data_version()
+            if version != self._data_version:
+                # SQLite 的统计本来就是一条带索引的 GROUP BY，无需解析文件
+                self._data_version = version
+                self.store.discard_personal_records()
+                self._on_data_changed(self.store.action_stats(), None)
+            return
+        if isinstance(self.store, PartitionedStore):
+            # 分区目录：只重新读取文件有变化的分区（通常只有记录程序正在写的当前月份）
+            signature = data_signature(DATA_FILE)
+            if signature != self._data_signature:
+                self._data_signature = signature
+                names = self.store.refresh()
+                if names:
+                    self._on_data_changed(self.store.action_stats(), names)
+            return
+        if self.rollups is None:
+            # 二进制快照：重新映射本来就很快，有变化就整体重新加载
+            if self._data_signature != data_signature(DATA_FILE):
+                self._load_data()
+            return
+        try:
+            records = self.rollups.tail()
+        except OSError:
+            return  # 文件正被替换，下次再查
+        if records is None:
+            self._load_data()
+        elif records:
+            if self._records_loaded:
+                # 原始记录已在内存中时一并追加，原始趋势和筛选也包含新记录
+                self.store.absorb(records)
+            if self._prs is not None:
+                self._prs.fold(records)
+            self._on_data_changed(self.rollups.totals, {record["name"] for record in records})
+            self.status_var.set(f"新增 {len(records)} 条记录")
+
+    def _on_data_changed(self, totals, names):
+        """names 为新记录涉及的动作（None 表示不确定）；所选动作不受影响时不重画趋势图"""
+        self._invalidate_charts(names)
+        self._show_stats(totals)
+        chart_type = self.chart_type_var.get() if hasattr(self, 'chart_type_var') else "total_sets"
+        if names is None or chart_type == "total_sets" or self.action_selector_var.get() in names:
+            self._update_chart()
 
     def _on_refresh(self):
-        """刷新数据"""
-        self._load_data()
-        self._populate_action_table()
-        self._update_action_selector()
-        self._update_chart()
-        messagebox.showinfo("成功", "数据已刷新！")
+        """刷新数据（后台加载，完成后提示）"""
+        self._load_data(notify=True)
+
+    def _on_cancel_loading(self):
+        for task in (self._load_task, self._raw_task):
+            if task is not None and not task.finished:
+                task.cancel()
 
     def _on_select_file(self):
         """选择数据文件"""
         file_path = filedialog.askopenfilename(
             title="选择锻炼数据文件",
-            filetypes=[("JSON文件", "*.json"), ("所有文件", "*.*")]
+            filetypes=[("JSON文件", "*.json"), ("二进制快照", "*.wkb"), ("SQLite数据库", "*.db *.sqlite *.sqlite3"),
+                       ("分区清单", MANIFEST_NAME), ("所有文件", "*.*")]
         )
         if file_path:
             global DATA_FILE
+            if os.path.basename(file_path) == MANIFEST_NAME:
+                # 选中分区目录的清单即打开整个目录
+                file_path = os.path.dirname(file_path)
             DATA_FILE = file_path
+            # 打开其他文件后不再跟随共享数据
+            if self.shared_store is not None:
+                self.shared_store.remove_listener(self._on_store_event)
+                self.shared_store = None
             self._on_refresh()
 
     def _on_action_double_click(self, event):
@@ -260,9 +1059,39 @@ class WorkoutAnalyzer:
             self._update_chart()
 
 def main():
+    parser = argparse.ArgumentParser(description="锻炼数据可视化分析")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="输出冷启动各阶段耗时")
+    parser.add_argument("--startup-budget", type=float, metavar="MS",
+                        help="首次显示统计表格的时间预算（毫秒），隐含 --startup-report")
+    parser.add_argument("--exit-after-startup", action="store_true",
+                        help="输出报告后退出；超出预算时退出码为 1，便于脚本中测量")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="记录计时区间，退出时导出为 Chrome trace-event JSON")
+    args = parser.parse_args()
+    if args.trace:
+        TRACER.enabled = True
+
+    timer = None
+    if args.startup_report or args.startup_budget is not None or args.exit_after_startup:
+        timer = StartupTimer(_IMPORT_STARTED, args.startup_budget)
+        timer.add("import", _IMPORT_STARTED, _IMPORT_FINISHED)
+
     root = tk.Tk()
-    app = WorkoutAnalyzer(root)
+    app = WorkoutAnalyzer(root, timer=timer)
+    if args.exit_after_startup:
+        # 报告在首次绘制后输出，之后空闲时退出
+        def exit_when_reported():
+            if app.timer is None:
+                root.destroy()
+            else:
+                root.after(50, exit_when_reported)
+        root.after(50, exit_when_reported)
     root.mainloop()
+    if args.trace:
+        TRACER.export_chrome_trace(args.trace)
+    if timer is not None and timer.over_budget():
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
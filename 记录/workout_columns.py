@@ -0,0 +1,224 @@
+from typing import Dict, List
+
+import numpy as np
+
+from workout_schema import SECONDS_PER_DAY
+
+
+def series_from_records(entries: List[dict]) -> Dict[str, np.ndarray]:
+    """把按时间排序的记录转换为趋势图使用的数组序列"""
+    return {
+        'record_time': np.array([entry['record_time'] for entry in entries], dtype=np.int64),
+        'reps': np.array([entry['reps'] for entry in entries], dtype=np.int32),
+        'sets': np.array([entry['sets'] for entry in entries], dtype=np.int32),
+        'rpe': np.array([entry['rpe'] for entry in entries], dtype=np.int8),
+        'weight': np.array([entry['weight'] for entry in entries], dtype=np.float32),
+    }
+
+
+class StringTable:
+    """字符串字典表：相同的字符串只保存一份，列中存整数编码"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    @classmethod
+    def from_values(cls, values: List[str]) -> "StringTable":
+        table = cls()
+        table.values = list(values)
+        table._codes = {value: code for code, value in enumerate(table.values)}
+        return table
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def code_of(self, value: str) -> int:
+        """查询已有编码，不存在返回 -1"""
+        return self._codes.get(value, -1)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ColumnarRecords:
+    """
+    列式的内存记录表。
+    数值字段各占一个 NumPy 数组，记录时间为 int64 秒，动作名称和备注存为字典表编码，
+    每条记录约 40 字节，而一个 dict 需要上千字节；按动作的统计用数组运算完成。
+    """
+
+    NUMERIC_COLUMNS = {
+        "weight": np.float32,
+        "sets": np.int32,
+        "reps": np.int32,
+        "rpe": np.int8,
+        "rir": np.float32,
+        "record_time": np.int64,
+        "name_code": np.int32,
+        "note_code": np.int32,
+        "id": np.int64,
+    }
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.names = StringTable()
+        self.notes = StringTable()
+        self._columns = {field: np.zeros(capacity, dtype=dtype)
+                         for field, dtype in self.NUMERIC_COLUMNS.items()}
+
+    def __len__(self):
+        return self.size
+
+    def __getattr__(self, field):
+        # 对外暴露有效区间的视图，如 columns.sets、columns.record_time
+        columns = self.__dict__.get("_columns")
+        if columns is not None and field in columns:
+            return columns[field][:self.size]
+        raise AttributeError(field)
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        capacity = len(self._columns["sets"])
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for field, column in self._columns.items():
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[field] = grown
+
+    @classmethod
+    def from_records(cls, records: List[dict]) -> "ColumnarRecords":
+        table = cls(capacity=max(len(records), 1))
+        table.extend(records)
+        return table
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], names: List[str], notes: List[str]) -> "ColumnarRecords":
+        """直接使用现成的数组（例如内存映射的二进制快照），不复制；之后追加时才复制到新数组"""
+        table = cls(capacity=0)
+        table._columns = {field: arrays[field] for field in cls.NUMERIC_COLUMNS}
+        table.size = len(arrays["id"])
+        table.names = StringTable.from_values(names)
+        table.notes = StringTable.from_values(notes)
+        return table
+
+    def extend(self, records: List[dict]):
+        """批量追加记录（当前版本格式，字段齐全、时间为整数秒）"""
+        count = len(records)
+        if count == 0:
+            return
+        self._reserve(count)
+        start, end = self.size, self.size + count
+        cols = self._columns
+        cols["weight"][start:end] = [item['weight'] for item in records]
+        cols["sets"][start:end] = [item['sets'] for item in records]
+        cols["reps"][start:end] = [item['reps'] for item in records]
+        cols["rpe"][start:end] = [item['rpe'] for item in records]
+        cols["rir"][start:end] = [item['rir'] for item in records]
+        cols["record_time"][start:end] = [item['record_time'] for item in records]
+        cols["name_code"][start:end] = [self.names.encode(item['name']) for item in records]
+        cols["note_code"][start:end] = [self.notes.encode(item['notes']) for item in records]
+        cols["id"][start:end] = [item['id'] for item in records]
+        self.size = end
+
+    def append(self, record: dict):
+        self.extend([record])
+
+    def record(self, index: int) -> dict:
+        """还原单条记录为 dict（仅用于展示少量记录）"""
+        cols = self._columns
+        return {
+            'name': self.names.values[cols["name_code"][index]],
+            'weight': float(cols["weight"][index]),
+            'sets': int(cols["sets"][index]),
+            'reps': int(cols["reps"][index]),
+            'rpe': int(cols["rpe"][index]),
+            'rir': float(cols["rir"][index]),
+            'notes': self.notes.values[cols["note_code"][index]],
+            'record_time': int(cols["record_time"][index]),
+            'id': int(cols["id"][index]),
+        }
+
+    def to_records(self, start: int = 0) -> List[dict]:
+        """[start:] 区间还原为 dict 列表（按列整体转换，比逐条调用 record 快得多）"""
+        names, notes = self.names.values, self.notes.values
+        return [
+            {'name': names[name_code], 'weight': weight, 'sets': sets, 'reps': reps, 'rpe': rpe, 'rir': rir,
+             'notes': notes[note_code], 'record_time': record_time, 'id': record_id}
+            for name_code, weight, sets, reps, rpe, rir, note_code, record_time, record_id in zip(
+                *(getattr(self, field)[start:].tolist() for field in (
+                    "name_code", "weight", "sets", "reps", "rpe", "rir", "note_code", "record_time", "id")))
+        ]
+
+    def row_key(self, index: int) -> tuple:
+        """用于判断某一行是否被修改"""
+        return tuple(column[index].item() for column in self._columns.values())
+
+    def indices_of(self, name: str) -> np.ndarray:
+        """某个动作的全部行号，按记录时间排序"""
+        code = self.names.code_of(name)
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        rows = np.flatnonzero(self.name_code == code)
+        return rows[np.argsort(self.record_time[rows], kind="stable")]
+
+    def series(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """取出若干行的时间、次数、组数、RPE、重量列"""
+        return {field: self._columns[field][rows] for field in ('record_time', 'reps', 'sets', 'rpe', 'weight')}
+
+    def group_stats(self, start: int = 0) -> Dict[str, dict]:
+        """
+        按动作分组统计 [start:] 区间：总组数、最大单组次数、最近记录时间（int64 秒）。
+        用 bincount / maximum.at 代替 Python 循环。
+        """
+        codes = self.name_code[start:]
+        if len(codes) == 0:
+            return {}
+        n = len(self.names)
+        total_sets = np.bincount(codes, weights=self.sets[start:], minlength=n).astype(np.int64)
+        counts = np.bincount(codes, minlength=n)
+        max_reps = np.full(n, np.iinfo(np.int32).min, dtype=np.int32)
+        np.maximum.at(max_reps, codes, self.reps[start:])
+        last_time = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(last_time, codes, self.record_time[start:])
+        return {
+            self.names.values[code]: {
+                'total_sets': int(total_sets[code]),
+                'max_reps_per_set': int(max_reps[code]),
+                'last_time': int(last_time[code]),
+            }
+            for code in np.flatnonzero(counts)
+        }
+
+    def group_daily(self, start: int = 0) -> Dict[str, dict]:
+        """
+        按 (动作, 日期) 分组统计 [start:] 区间，返回每个动作按日期排序的数组：
+        day（当天 0 点的 int64 秒）、max_reps、total_sets、rpe_sum、count。
+        """
+        codes = self.name_code[start:].astype(np.int64)
+        if len(codes) == 0:
+            return {}
+        days = self.record_time[start:] // SECONDS_PER_DAY
+        order = np.lexsort((days, codes))
+        codes, days = codes[order], days[order]
+        starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])])
+        group_codes = codes[starts]
+        daily = {
+            'day': days[starts] * SECONDS_PER_DAY,
+            'max_reps': np.maximum.reduceat(self.reps[start:][order], starts).astype(np.int64),
+            'total_sets': np.add.reduceat(self.sets[start:][order].astype(np.int64), starts),
+            'rpe_sum': np.add.reduceat(self.rpe[start:][order].astype(np.int64), starts),
+            'count': np.diff(np.r_[starts, len(codes)]),
+        }
+        action_bounds = np.flatnonzero(np.r_[True, group_codes[1:] != group_codes[:-1], True])
+        return {
+            self.names.values[group_codes[lo]]: {field: values[lo:hi] for field, values in daily.items()}
+            for lo, hi in zip(action_bounds[:-1], action_bounds[1:])
+        }
@@ -0,0 +1,120 @@
+import csv
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from workout_schema import RECORD_FIELDS, format_epoch, validate_record
+
+# 导出的表头与记录程序列表的列一致；导入时也接受英文字段名
+CSV_HEADERS = ["动作名称", "重量(kg)", "组数", "次数", "RPE", "RIR", "备注", "记录时间"]
+HEADER_FIELDS = {**dict(zip(CSV_HEADERS, RECORD_FIELDS)), **{field: field for field in RECORD_FIELDS}}
+REQUIRED_FIELDS = ("name", "sets", "reps")
+# 导入时每批追加的记录数；导出时每写这么多行汇报一次进度
+IMPORT_BATCH = 5000
+EXPORT_CHUNK = 10000
+EXPORT_TMP_SUFFIX = ".tmp"
+
+
+def _detect_encoding(path: str) -> str:
+    """本程序导出的是带 BOM 的 UTF-8；其他软件导出的中文 CSV 常见 GBK"""
+    with open(path, "rb") as f:
+        head = f.read(1 << 20)
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # 只截断在多字节字符中间时仍视为 UTF-8
+        if e.start < len(head) - 3:
+            return "gbk"
+    return "utf-8-sig"
+
+
+def _field_indices(header: List[str]) -> dict:
+    columns = {}
+    for index, title in enumerate(header):
+        field = HEADER_FIELDS.get(title.strip())
+        if field is not None and field not in columns:
+            columns[field] = index
+    missing = [field for field in REQUIRED_FIELDS if field not in columns]
+    if missing:
+        names = "、".join(CSV_HEADERS[RECORD_FIELDS.index(field)] for field in missing)
+        raise ValueError(f"CSV 缺少必需的列：{names}")
+    return columns
+
+
+def read_csv_batches(path: str, batch_size: int = IMPORT_BATCH):
+    """
+    流式读取并校验 CSV，按批产出 (有效记录列表, 错误列表, 已读取比例)。
+    错误为 (行号, 原因)，坏行跳过而不中断导入；内存占用只与批大小有关。
+    """
+    size = os.path.getsize(path) or 1
+    with open(path, "r", encoding=_detect_encoding(path), newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = _field_indices(header)
+
+        def cell(row, field, default=None):
+            # 缺少的列和空单元格都取默认值
+            index = columns.get(field)
+            value = row[index] if index is not None and index < len(row) else ""
+            return value if value.strip() else default
+
+        records, errors = [], []
+        for row in reader:
+            if not any(value.strip() for value in row):
+                continue
+            try:
+                # 没有记录时间的行按旧数据处理（时间未知），而不是记为导入时刻
+                records.append(validate_record(
+                    cell(row, "name", ""), cell(row, "weight", "0"), cell(row, "sets", ""),
+                    cell(row, "reps", ""), cell(row, "rpe", "7"), cell(row, "rir"),
+                    cell(row, "notes", ""), cell(row, "record_time", "")))
+            except ValueError as e:
+                errors.append((reader.line_num, str(e)))
+            if len(records) >= batch_size:
+                yield records, errors, f.buffer.tell() / size
+                records, errors = [], []
+        yield records, errors, 1.0
+
+
+def csv_row(record) -> list:
+    """WorkoutItem 或记录 dict -> CSV 行"""
+    get = record.get if isinstance(record, dict) else lambda field: getattr(record, field)
+    return [get("name"), get("weight"), get("sets"), get("reps"), get("rpe"), get("rir"),
+            get("notes"), format_epoch(get("record_time"))]
+
+
+def write_csv(path: str, records: Iterable, total: Optional[int] = None, progress=None) -> int:
+    """
+    用 csv 模块逐行写出（正确转义逗号、引号和换行），先写临时文件，完成后再替换目标文件。
+    progress(比例) 每 EXPORT_CHUNK 行调用一次，可在其中抛出异常中止导出。
+    """
+    tmp_path = path + EXPORT_TMP_SUFFIX
+    count = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADERS)
+            chunk = []
+            for record in records:
+                chunk.append(csv_row(record))
+                if len(chunk) >= EXPORT_CHUNK:
+                    writer.writerows(chunk)
+                    count += len(chunk)
+                    chunk = []
+                    if progress is not None and total:
+                        progress(count / total)
+            writer.writerows(chunk)
+            count += len(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+def format_errors(errors: List[Tuple[int, str]], limit: int = 10) -> str:
+    lines = [f"第 {line} 行：{reason}" for line, reason in errors[:limit]]
+    if len(errors) > limit:
+        lines.append(f"……另有 {len(errors) - limit} 行")
+    return "\n".join(lines)
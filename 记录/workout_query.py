@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from workout_columns import ColumnarRecords
+from workout_schema import RPE_MAX, RPE_MIN
+
+
+@dataclass(frozen=True)
+class RecordFilter:
+    """
+    记录筛选条件。start/end 为整数秒，区间 [start, end)，None 表示不限；
+    actions 为 None 表示全部动作；RPE 为闭区间。
+    """
+    start: Optional[int] = None
+    end: Optional[int] = None
+    actions: Optional[FrozenSet[str]] = None
+    rpe_min: int = RPE_MIN
+    rpe_max: int = RPE_MAX
+
+    def is_unrestricted(self) -> bool:
+        return (self.start is None and self.end is None and self.actions is None
+                and self.rpe_min <= RPE_MIN and self.rpe_max >= RPE_MAX)
+
+    def covers_all_rpe(self) -> bool:
+        return self.rpe_min <= RPE_MIN and self.rpe_max >= RPE_MAX
+
+    def time_bounds(self) -> Tuple[int, int]:
+        lower = self.start if self.start is not None else np.iinfo(np.int64).min
+        upper = self.end if self.end is not None else np.iinfo(np.int64).max
+        return lower, upper
+
+
+class QueryIndex:
+    """
+    列式记录上的查询索引：
+    每个动作一份按时间排序的行号（配合 searchsorted 二分查找日期区间），
+    每个 (动作, RPE) 再一份按时间排序的行号，RPE 筛选时只取对应的桶。
+    构建是两次 lexsort（百万条约 0.2 秒），之后每次查询只与命中的行数有关。
+    """
+
+    def __init__(self, columns: ColumnarRecords):
+        self.columns = columns
+        codes = columns.name_code.astype(np.int64)
+        times = columns.record_time
+        rpe = np.clip(columns.rpe.astype(np.int64), RPE_MIN, RPE_MAX)
+        names = columns.names.values
+
+        # 动作 -> (按时间排序的记录时间, 行号)
+        self._by_action: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        order = np.lexsort((times, codes)).astype(np.int32)
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        for code, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if hi > lo:
+                rows = order[lo:hi]
+                self._by_action[names[code]] = (times[rows], rows)
+
+        # 动作 -> {RPE: (按时间排序的记录时间, 行号)}
+        self._by_rpe: Dict[str, Dict[int, Tuple[np.ndarray, np.ndarray]]] = {}
+        keys = codes * (RPE_MAX + 1) + rpe
+        order = np.lexsort((times, keys)).astype(np.int32)
+        sorted_keys = keys[order]
+        if len(order):
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            for lo, hi in zip(starts, np.r_[starts[1:], len(order)]):
+                code, value = divmod(int(sorted_keys[lo]), RPE_MAX + 1)
+                rows = order[lo:hi]
+                self._by_rpe.setdefault(names[code], {})[value] = (times[rows], rows)
+
+    def actions(self) -> List[str]:
+        return list(self._by_action)
+
+    def rows(self, name: str, flt: RecordFilter) -> np.ndarray:
+        """某个动作满足条件的行号，按时间排序"""
+        lower, upper = flt.time_bounds()
+        if flt.covers_all_rpe():
+            entry = self._by_action.get(name)
+            if entry is None:
+                return np.empty(0, dtype=np.int32)
+            times, rows = entry
+            return rows[np.searchsorted(times, lower, "left"):np.searchsorted(times, upper, "left")]
+        parts = []
+        for value, (times, rows) in self._by_rpe.get(name, {}).items():
+            if flt.rpe_min <= value <= flt.rpe_max:
+                parts.append(rows[np.searchsorted(times, lower, "left"):np.searchsorted(times, upper, "left")])
+        if not parts:
+            return np.empty(0, dtype=np.int32)
+        if len(parts) == 1:
+            return parts[0]
+        # 各桶内已按时间排序，合并后再排一次（只涉及命中的行）
+        rows = np.concatenate(parts)
+        return rows[np.argsort(self.columns.record_time[rows], kind="stable")]
+
+    def action_stats(self, flt: RecordFilter) -> Dict[str, dict]:
+        """满足条件的记录按动作统计，格式与 WorkoutStore.action_stats 相同"""
+        names = self._by_action if flt.actions is None else [name for name in self._by_action
+                                                              if name in flt.actions]
+        columns = self.columns
+        stats = {}
+        for name in names:
+            rows = self.rows(name, flt)
+            if len(rows) == 0:
+                continue
+            stats[name] = {
+                'total_sets': int(columns.sets[rows].sum(dtype=np.int64)),
+                'max_reps_per_set': int(columns.reps[rows].max()),
+                'last_time': int(columns.record_time[rows[-1]]),
+            }
+        return stats
+
+    def series(self, name: str, flt: RecordFilter) -> Dict[str, np.ndarray]:
+        """某个动作满足条件的记录序列（按时间排序），供趋势图使用"""
+        return self.columns.series(self.rows(name, flt))
+
+
+def filter_sql(flt: RecordFilter) -> Tuple[str, list]:
+    """筛选条件 -> SQL WHERE 子句和参数（SQLite 存储使用 (name, record_time) 索引）"""
+    clauses, params = [], []
+    if flt.actions is not None:
+        clauses.append(f"name IN ({', '.join('?' * len(flt.actions))})" if flt.actions else "0")
+        params.extend(sorted(flt.actions))
+    if flt.start is not None:
+        clauses.append("record_time >= ?")
+        params.append(flt.start)
+    if flt.end is not None:
+        clauses.append("record_time < ?")
+        params.append(flt.end)
+    if not flt.covers_all_rpe():
+        clauses.append("rpe BETWEEN ? AND ?")
+        params.extend([flt.rpe_min, flt.rpe_max])
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
@@ -0,0 +1,173 @@
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+# 数据文件格式版本：
+#   1 —— 记录数组，record_time 为 "%Y-%m-%d %H:%M:%S" 字符串，旧记录可能缺少字段
+#   2 —— {"schema_version": 2, "records": [...]}，record_time 为整数秒，所有字段齐全
+#   3 —— 每条记录带有稳定的整数 id（按追加顺序递增，删除后不影响其他记录）
+SCHEMA_VERSION = 3
+LEGACY_VERSION = 1
+RECORD_FIELDS = ["name", "weight", "sets", "reps", "rpe", "rir", "notes", "record_time", "id"]
+# 旧数据缺失字段时的默认值，只在升级时补一次
+RECORD_DEFAULTS = {"weight": 0.0, "rpe": 7, "rir": 3, "notes": ""}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# 缺少记录时间的旧数据编码为 0
+MISSING_TIME = 0
+SECONDS_PER_DAY = 86400
+RPE_MIN, RPE_MAX = 1, 10
+# 记录时间按墙上时间计秒（不做时区换算），与按日汇总的日期边界一致
+_EPOCH = datetime(1970, 1, 1)
+
+
+class UnsupportedSchemaError(ValueError):
+    """数据文件的版本高于本程序支持的版本"""
+
+
+def check_version(version: int):
+    if version > SCHEMA_VERSION:
+        raise UnsupportedSchemaError(
+            f"数据文件版本为 {version}，本程序只支持到版本 {SCHEMA_VERSION}，请升级程序")
+
+
+def time_to_epoch(text: str) -> int:
+    """ "%Y-%m-%d %H:%M:%S" 字符串 -> 整数秒；空字符串为 MISSING_TIME"""
+    if not text:
+        return MISSING_TIME
+    return (datetime.fromisoformat(text) - _EPOCH) // timedelta(seconds=1)
+
+
+def format_epoch(seconds: int, fmt: str = TIME_FORMAT) -> str:
+    if seconds == MISSING_TIME:
+        return ""
+    return (_EPOCH + timedelta(seconds=int(seconds))).strftime(fmt)
+
+
+def now_epoch() -> int:
+    return (datetime.now() - _EPOCH) // timedelta(seconds=1)
+
+
+def validate_record(name, weight, sets, reps, rpe, rir=None, notes="", record_time=None) -> dict:
+    """
+    校验并转换一条记录（界面输入和 CSV 导入共用同一套规则），出错时抛出 ValueError（提示文字可直接展示）。
+    参数可以是字符串；rir 为空时按 10 - RPE 计算，record_time 为空时取当前时间。
+    """
+    name = str(name).strip()
+    if not name:
+        raise ValueError("动作名称不能为空！")
+
+    # 重量允许0，支持小数
+    try:
+        weight = float(str(weight).strip())
+    except ValueError:
+        raise ValueError("重量请输入有效的数字（如 0、2.5、10）！")
+    if weight < 0:
+        raise ValueError("重量不能为负数！")
+
+    try:
+        sets = int(str(sets).strip())
+    except ValueError:
+        raise ValueError("组数请输入有效的正整数！")
+    if sets <= 0:
+        raise ValueError("组数必须为正整数（如 1、3、5）！")
+
+    try:
+        reps = int(str(reps).strip())
+    except ValueError:
+        raise ValueError("次数请输入有效的正整数！")
+    if reps <= 0:
+        raise ValueError("次数必须为正整数（如 5、10、15）！")
+
+    try:
+        rpe = int(str(rpe).strip())
+    except ValueError:
+        raise ValueError("RPE请输入 1-10 之间的整数！")
+    if not (1 <= rpe <= 10):
+        raise ValueError("RPE值必须在 1-10 之间！")
+
+    if rir is None or str(rir).strip() == "":
+        rir = float(10 - rpe)
+    else:
+        try:
+            rir = float(str(rir).strip())
+        except ValueError:
+            raise ValueError("RIR请输入有效的数字！")
+
+    if record_time is None:
+        record_time = now_epoch()
+    elif isinstance(record_time, str):
+        try:
+            record_time = time_to_epoch(record_time.strip())
+        except ValueError:
+            raise ValueError(f"记录时间格式应为 YYYY-MM-DD HH:MM:SS：{record_time}")
+
+    # id 由存储层在追加时分配
+    return {"name": name, "weight": weight, "sets": sets, "reps": reps, "rpe": rpe, "rir": rir,
+            "notes": str(notes or "").strip(), "record_time": record_time, "id": None}
+
+
+def upgrade_record(raw: dict) -> dict:
+    """
+    旧版本的记录 -> 当前版本：补齐缺失字段、时间字符串转为整数秒，字段按 RECORD_FIELDS 排列。
+    没有 id 的记录 id 为 None，由 assign_ids 统一编号。重复升级是安全的。
+    """
+    for field in ("name", "sets", "reps"):
+        if field not in raw:
+            raise ValueError(f"记录缺少必需字段 '{field}'：{raw}")
+    record_time = raw.get("record_time", "")
+    if isinstance(record_time, str):
+        record_time = time_to_epoch(record_time)
+    record = {field: raw.get(field, RECORD_DEFAULTS.get(field)) for field in RECORD_FIELDS}
+    record["record_time"] = record_time
+    return record
+
+
+def upgrade_records(records: List[dict]) -> List[dict]:
+    return [upgrade_record(item) for item in records]
+
+
+def assign_ids(records: List[dict], next_id: int) -> int:
+    """按顺序为 id 为 None 的记录编号，返回下一个可用 id"""
+    for record in records:
+        if record["id"] is None:
+            record["id"] = next_id
+            next_id += 1
+        elif record["id"] >= next_id:
+            next_id = record["id"] + 1
+    return next_id
+
+
+def document_version(document) -> int:
+    """整份 JSON 数据的版本：旧格式是裸数组"""
+    if isinstance(document, list):
+        return LEGACY_VERSION
+    return document.get("schema_version", LEGACY_VERSION)
+
+
+def records_from_document(document) -> List[dict]:
+    """从已解析的 JSON 数据中取出当前版本的记录"""
+    version = document_version(document)
+    check_version(version)
+    if version < SCHEMA_VERSION:
+        records = upgrade_records(document if isinstance(document, list) else document.get("records", []))
+        assign_ids(records, 1)
+        return records
+    return document["records"]
+
+
+def snapshot_document(records: List[dict]) -> dict:
+    # schema_version 放在最前面，读取时只看文件开头就能判断版本
+    return {"schema_version": SCHEMA_VERSION, "records": records}
+
+
+def header_version(head: str) -> Optional[int]:
+    """根据文件开头的文本判断版本；无法判断时返回 None"""
+    head = head.lstrip("\ufeff \t\r\n")
+    if head.startswith("["):
+        return LEGACY_VERSION
+    if head.startswith("{"):
+        match = re.match(r'\{\s*"schema_version"\s*:\s*(\d+)', head)
+        if match:
+            return int(match.group(1))
+    return None
@@ -0,0 +1,75 @@
+from typing import Dict, List
+
+
+class ActionStatsAggregator:
+    """
+    增量的按动作统计。
+    保存每个动作的累计值以及已经消费到的位置，刷新时只折叠新增的记录；
+    发现已消费的记录被删除或修改时才整体重算。
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, dict] = {}
+        self.consumed = 0
+        # 已消费区间首尾两条记录的副本，用于判断旧数据是否变化
+        self._first_record = None
+        self._last_record = None
+
+    def reset(self):
+        self.stats = {}
+        self.consumed = 0
+        self._first_record = None
+        self._last_record = None
+
+    def _is_prefix_unchanged(self, records: List[dict]) -> bool:
+        if self.consumed == 0:
+            return True
+        if len(records) < self.consumed:
+            return False
+        return records[0] == self._first_record and records[self.consumed - 1] == self._last_record
+
+    def update(self, records: List[dict]) -> Dict[str, dict]:
+        """折叠 records 中尚未消费的部分，返回最新统计"""
+        if not self._is_prefix_unchanged(records):
+            self.reset()
+        for item in records[self.consumed:]:
+            self.add(item)
+        self.consumed = len(records)
+        if records:
+            self._first_record = dict(records[0])
+            self._last_record = dict(records[-1])
+        return self.stats
+
+    def update_columns(self, columns) -> Dict[str, dict]:
+        """列式记录（ColumnarRecords）版本：新增区间先向量化分组统计，再按动作合并"""
+        if self.consumed and (len(columns) < self.consumed
+                              or columns.row_key(0) != self._first_record
+                              or columns.row_key(self.consumed - 1) != self._last_record):
+            self.reset()
+        for name, part in columns.group_stats(self.consumed).items():
+            self.merge(name, part['total_sets'], part['max_reps_per_set'], part['last_time'])
+        self.consumed = len(columns)
+        if self.consumed:
+            self._first_record = columns.row_key(0)
+            self._last_record = columns.row_key(self.consumed - 1)
+        return self.stats
+
+    def add(self, item: dict):
+        """折叠单条记录"""
+        self.merge(item['name'], item['sets'], item['reps'], item['record_time'])
+
+    def merge(self, name: str, total_sets: int, max_reps: int, last_time: int):
+        """last_time 为整数秒（见 workout_schema）"""
+        entry = self.stats.get(name)
+        if entry is None:
+            self.stats[name] = {
+                'total_sets': total_sets,
+                'max_reps_per_set': max_reps,
+                'last_time': last_time,
+            }
+            return
+        entry['total_sets'] += total_sets
+        if max_reps > entry['max_reps_per_set']:
+            entry['max_reps_per_set'] = max_reps
+        if last_time > entry['last_time']:
+            entry['last_time'] = last_time
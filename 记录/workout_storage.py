@@ -0,0 +1,1163 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from dataclasses import replace
+from typing import Dict, List, Optional
+from urllib.request import pathname2url
+
+from instrumentation import count, span, traced
+from workout_schema import (LEGACY_VERSION, RECORD_FIELDS, SCHEMA_VERSION, assign_ids, check_version,
+                            header_version, records_from_document, snapshot_document, upgrade_records)
+from workout_stats import ActionStatsAggregator
+
+# 日志文件 = 数据文件名 + 后缀，例如 workout_data.json.journal
+JOURNAL_SUFFIX = ".journal"
+SNAPSHOT_TMP_SUFFIX = ".tmp"
+# 日志条目超过该数量时自动触发后台压缩
+COMPACT_THRESHOLD = 500
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+# 分块解析快照时每块的记录数，用于汇报加载进度
+LOAD_CHUNK = 20000
+# 迁移时新文件先写到 数据文件名 + 后缀，校验通过后再替换；原文件备份为 数据文件名 + .v<旧版本>.bak
+MIGRATE_TMP_SUFFIX = ".migrate"
+BACKUP_SUFFIX = ".v{version}.bak"
+# 数据文件以该扩展名结尾时快照使用二进制格式（见 binary_snapshot），日志仍是 JSON 行
+BINARY_SUFFIX = ".wkb"
+BINARY_MAGIC = b"WKTBIN\r\n"
+
+
+def _stat_signature(path: str) -> Optional[list]:
+    """用文件大小和修改时间标识一个快照版本"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _fsync_dir(path: str):
+    """rename 之后同步所在目录，保证重命名本身落盘（Windows 上忽略）"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_synced(path: str, write):
+    """写文件并 fsync，write 为接收文件对象的回调"""
+    with open(path, "w", encoding="utf-8") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def is_binary_snapshot(path: str) -> bool:
+    """按文件开头的魔数判断快照是否为二进制格式（不看扩展名）"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except OSError:
+        return False
+
+
+def _write_snapshot_file(path: str, records: List[dict], binary: bool):
+    """写出 JSON 或二进制快照并 fsync"""
+    if not binary:
+        _write_synced(path, lambda f: write_snapshot(f, records))
+        return
+    from binary_snapshot import write_records
+    with open(path, "wb") as f:
+        write_records(f, records)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def atomic_write_json(path: str, data, indent: Optional[int] = 2):
+    """先写临时文件并 fsync，再原子替换目标文件，写入中途崩溃不会损坏原文件"""
+    tmp_path = path + SNAPSHOT_TMP_SUFFIX
+    _write_synced(tmp_path, lambda f: json.dump(data, f, ensure_ascii=False, indent=indent))
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+
+def write_snapshot_atomic(path: str, records: List[dict]):
+    """快照写入临时文件并 fsync 后原子替换，写入中途崩溃时原文件保持完整"""
+    tmp_path = path + SNAPSHOT_TMP_SUFFIX
+    _write_snapshot_file(tmp_path, records, path.lower().endswith(BINARY_SUFFIX))
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+
+class SnapshotWriter:
+    """
+    后台快照写入线程。
+    submit() 只替换待写数据并唤醒线程，调用方从不等待磁盘；
+    写入进行中多次提交的数据只保留最新一份，写完后再写一次。
+    每次写入都经过 write_snapshot_atomic。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writes = 0
+        self.error: Optional[Exception] = None
+        self._pending = None
+        self._writing = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot):
+        """snapshot 是在写入线程中调用、返回记录列表的函数（转换成字典的开销也不在调用方线程）"""
+        with self._cond:
+            self._pending = snapshot
+            self._cond.notify_all()
+
+    def take_error(self) -> Optional[Exception]:
+        """取出上一次写入失败的异常（没有则为 None）"""
+        with self._cond:
+            error, self.error = self.error, None
+            return error
+
+    def flush(self):
+        """等待已提交的数据全部写出"""
+        with self._cond:
+            while (self._pending is not None or self._writing) and self._thread.is_alive():
+                self._cond.wait()
+
+    def close(self):
+        """写出剩余数据后结束线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                snapshot, self._pending = self._pending, None
+                self._writing = True
+            error = None
+            try:
+                with span("autosave", path=self.path):
+                    write_snapshot_atomic(self.path, snapshot())
+                count("autosave_writes")
+            except Exception as e:
+                error = e
+            with self._cond:
+                self._writing = False
+                self.writes += 1
+                if error is not None:
+                    self.error = error
+                self._cond.notify_all()
+
+
+_SEPARATORS = re.compile(r"[\s,]*")
+_RECORDS_START = re.compile(r'"records"\s*:\s*\[')
+
+
+def _detect_version(head: str, path: str) -> int:
+    version = header_version(head)
+    if version is None:
+        raise ValueError(f"无法识别的数据文件格式：{path}")
+    check_version(version)
+    return version
+
+
+def snapshot_version(path: str) -> Optional[int]:
+    """只读取文件开头判断快照版本；文件不存在返回 None"""
+    if not os.path.exists(path):
+        return None
+    if is_binary_snapshot(path):
+        from binary_snapshot import HEADER_SIZE, read_header
+        with open(path, "rb") as f:
+            return read_header(f.read(HEADER_SIZE))["schema_version"]
+    with open(path, "r", encoding="utf-8") as f:
+        return _detect_version(f.read(256), path)
+
+
+def write_snapshot(f, records: List[dict], indent: Optional[int] = 2):
+    """以当前版本格式写出快照"""
+    json.dump(snapshot_document(records), f, ensure_ascii=False, indent=indent)
+
+
+def iter_snapshot_chunks(path: str, chunk_size: int = LOAD_CHUNK):
+    """
+    逐条解析快照中的记录数组，按块产出 (当前版本的记录列表, 已解析比例)。
+    旧版本的块在这里升级，没有 id 的记录按文件中的顺序从 1 开始编号。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    version = _detect_version(text[:256], path)
+    decoder = json.JSONDecoder()
+    length = len(text)
+    if version == LEGACY_VERSION:
+        pos = text.index("[") + 1
+    else:
+        pos = _RECORDS_START.search(text).end()
+    legacy = version < SCHEMA_VERSION
+    next_id = 1
+
+    def finish(chunk):
+        nonlocal next_id
+        if not legacy:
+            return chunk
+        chunk = upgrade_records(chunk)
+        next_id = assign_ids(chunk, next_id)
+        return chunk
+
+    chunk = []
+    while True:
+        pos = _SEPARATORS.match(text, pos).end()
+        if pos >= length or text[pos] == "]":
+            break
+        item, pos = decoder.raw_decode(text, pos)
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield finish(chunk), pos / length
+            chunk = []
+    if chunk:
+        yield finish(chunk), 1.0
+
+
+def _read_snapshot(path: str, progress=None) -> List[dict]:
+    """读取快照；传入 progress(比例) 回调时分块解析并汇报进度"""
+    if not os.path.exists(path):
+        return []
+    with span("parse", path=os.path.basename(path)):
+        if is_binary_snapshot(path):
+            # 二进制快照按列整体转换，没有逐条解析
+            from binary_snapshot import open_binary
+            records = open_binary(path, use_mmap=False).to_records()
+        elif progress is None:
+            with open(path, "r", encoding="utf-8") as f:
+                records = records_from_document(json.load(f))
+        else:
+            records = []
+            for chunk, fraction in iter_snapshot_chunks(path):
+                records.extend(chunk)
+                progress(fraction)
+    count("records_parsed", len(records))
+    return records
+
+
+def _journal_version(header: Optional[dict]) -> int:
+    # 旧版本的日志首行没有版本号（或没有首行），其中的记录需要升级
+    if header is None:
+        return LEGACY_VERSION
+    version = header.get("schema_version", LEGACY_VERSION)
+    check_version(version)
+    return version
+
+
+def _upgrade_ops(ops: List[dict]) -> List[dict]:
+    for entry in ops:
+        if entry.get("op") == "add":
+            entry["record"] = upgrade_records([entry["record"]])[0]
+    return ops
+
+
+def _read_journal(journal_path: str):
+    """读取日志，返回 (快照签名, 操作列表, 日志版本)；末尾写了一半的行直接丢弃"""
+    if not os.path.exists(journal_path):
+        return None, [], SCHEMA_VERSION
+    base, ops, header = None, [], None
+    with open(journal_path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            if i == len(lines) - 1:
+                break  # 追加时崩溃留下的残行
+            raise
+        if entry.get("op") == "base":
+            base = entry.get("snapshot")
+            header = entry
+        else:
+            ops.append(entry)
+    version = _journal_version(header)
+    if version < SCHEMA_VERSION:
+        _upgrade_ops(ops)
+    return base, ops, version
+
+
+def _write_journal(journal_path: str, base, ops: List[dict]):
+    """原子地重写日志：首行记录其所基于的快照签名和格式版本"""
+    tmp_path = journal_path + SNAPSHOT_TMP_SUFFIX
+    header = {"op": "base", "snapshot": base, "schema_version": SCHEMA_VERSION}
+
+    def write(f):
+        for entry in [header] + ops:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    _write_synced(tmp_path, write)
+    os.replace(tmp_path, journal_path)
+    _fsync_dir(journal_path)
+
+
+def read_journal_tail(journal_path: str, offset: int):
+    """从字节偏移 offset 起读取日志新增的完整行，返回 (操作列表, 新偏移)"""
+    with open(journal_path, "rb") as f:
+        first_line = f.readline()
+        f.seek(offset)
+        data = f.read()
+    try:
+        header = json.loads(first_line)
+    except ValueError:
+        header = None
+    if header is not None and header.get("op") != "base":
+        header = None
+    # 只消费到最后一个换行符，写了一半的行留到下次再读
+    end = data.rfind(b"\n") + 1
+    ops = [json.loads(line) for line in data[:end].decode("utf-8").splitlines() if line.strip()]
+    ops = [entry for entry in ops if entry.get("op") != "base"]
+    if _journal_version(header) < SCHEMA_VERSION:
+        _upgrade_ops(ops)
+    return ops, offset + end
+
+
+@traced("journal_replay")
+def _apply_ops(records: List[dict], ops: List[dict]) -> List[dict]:
+    """
+    按顺序回放日志：add 追加记录，del 按 id 删除（旧版本日志按位置删除），
+    edit 按 id 原位替换，clear 清空。按 id 的操作在以 id 为键的有序字典上进行。
+    """
+    by_id: Optional[Dict[int, dict]] = None
+    for entry in ops:
+        op = entry.get("op")
+        if op == "del" and "index" in entry:
+            if by_id is not None:
+                records, by_id = list(by_id.values()), None
+            del records[entry["index"]]
+            continue
+        if by_id is None and op in ("del", "edit"):
+            by_id = {record["id"]: record for record in records}
+        if op == "add":
+            if by_id is not None:
+                by_id[entry["record"]["id"]] = entry["record"]
+            else:
+                records.append(entry["record"])
+        elif op == "del":
+            for record_id in entry["ids"]:
+                by_id.pop(record_id, None)
+        elif op == "edit":
+            by_id[entry["record"]["id"]] = entry["record"]
+        elif op == "clear":
+            records, by_id = [], None
+    return list(by_id.values()) if by_id is not None else records
+
+
+def _resolve_snapshot(path: str, base) -> Optional[str]:
+    """
+    确定日志对应的快照文件。
+    压缩时先替换日志、再替换快照，若在两步之间崩溃，日志指向的是尚未改名的临时快照。
+    返回 None 表示日志已过期（内容已并入快照）。
+    """
+    if base == _stat_signature(path):
+        return path
+    tmp_path = path + SNAPSHOT_TMP_SUFFIX
+    if base is not None and base == _stat_signature(tmp_path):
+        return tmp_path
+    return None
+
+
+def load_records(path: str, progress=None) -> List[dict]:
+    """只读地加载数据：快照 + 日志回放（分析程序使用）；按月分区的目录依次读出全部分区"""
+    if os.path.isdir(path):
+        from partitioned_store import load_partitioned
+        return load_partitioned(path, progress)
+    base, ops, journal_version = _read_journal(path + JOURNAL_SUFFIX)
+    snapshot_path = _resolve_snapshot(path, base)
+    if snapshot_path is None:
+        return _read_snapshot(path, progress)
+    records = _apply_ops(_read_snapshot(snapshot_path, progress), ops)
+    if journal_version < SCHEMA_VERSION:
+        # 旧版本日志中追加的记录没有 id，接在快照之后编号
+        assign_ids(records, 1)
+    return records
+
+
+def load_columns(path: str, progress=None):
+    """
+    只读地加载为列式记录（分析程序使用）。
+    二进制快照直接映射文件，日志中只有新增记录时接在映射的列后面，
+    其他情况与 JSON 一样回放日志后再转换。
+    """
+    from workout_columns import ColumnarRecords
+    if not is_binary_snapshot(path):
+        return ColumnarRecords.from_records(load_records(path, progress))
+    from binary_snapshot import open_binary
+    base, ops, journal_version = _read_journal(path + JOURNAL_SUFFIX)
+    snapshot_path = _resolve_snapshot(path, base)
+    with span("parse", path=os.path.basename(path)):
+        columns = open_binary(snapshot_path or path)
+    if snapshot_path is None or not ops:
+        return columns
+    if journal_version == SCHEMA_VERSION and all(entry.get("op") == "add" for entry in ops):
+        columns.extend([entry["record"] for entry in ops])
+        return columns
+    records = _apply_ops(columns.to_records(), ops)
+    if journal_version < SCHEMA_VERSION:
+        assign_ids(records, 1)
+    return ColumnarRecords.from_records(records)
+
+
+def data_signature(path: str) -> list:
+    """快照和日志的大小与修改时间，用于廉价地判断数据是否变化"""
+    if os.path.isdir(path):
+        from partitioned_store import partition_signature
+        return partition_signature(path)
+    return [_stat_signature(path), _stat_signature(path + JOURNAL_SUFFIX)]
+
+
+def data_exists(path: str) -> bool:
+    return os.path.exists(path) or os.path.exists(path + JOURNAL_SUFFIX)
+
+
+class WorkoutStore:
+    """
+    存储层接口。记录程序通过 load/append/delete_many/update/clear 读写数据，
+    分析程序通过 action_stats/action_entries 查询，具体实现可以把聚合下推到存储中。
+
+    内存中的记录以 id 为键保存在有序字典 by_id 中，按 id 删除和修改都只涉及受影响的记录；
+    records 是按顺序排列的列表视图，删除后第一次访问时才重建（只是 C 层的引用复制）。
+    """
+
+    # 只读加载时记录以列式存储（workout_columns.ColumnarRecords），不再保留 dict 列表
+    columns = None
+    _aggregator: Optional[ActionStatsAggregator] = None
+    # 有记录被删除/修改时，增量统计需要整体重算
+    _stats_stale = False
+    loaded = False
+    _listeners: Optional[list] = None
+    by_id: Dict[int, dict]
+    _records: Optional[List[dict]] = None
+    next_id = 1
+    # 筛选查询用的索引（workout_query.QueryIndex），数据变化后重建
+    _query = None
+    # 个人记录索引（personal_records.PersonalRecords），首次使用时加载；只有删改涉及历史时才重建
+    _prs = None
+    path = ""
+    read_only = False
+
+    @property
+    def records(self) -> List[dict]:
+        if self._records is None:
+            self._records = list(self.by_id.values())
+        return self._records
+
+    def _set_records(self, records: List[dict]):
+        self.by_id = {record["id"]: record for record in records}
+        self._records = records
+        # id 按追加顺序递增，最后一条记录的 id 最大
+        self.next_id = records[-1]["id"] + 1 if records else 1
+        self._stats_stale = True
+        self._query = None
+        self._prs = None
+
+    def _index_added(self, records: List[dict]):
+        """为没有 id 的新记录分配 id 并加入索引"""
+        for record in records:
+            if record.get("id") is None:
+                record["id"] = self.next_id
+            self.next_id = max(self.next_id, record["id"] + 1)
+            self.by_id[record["id"]] = record
+        if self._records is not None:
+            self._records.extend(records)
+        self._query = None
+        if self._prs is not None:
+            for record in records:
+                self._prs.add(record)
+
+    def _index_deleted(self, ids: List[int]):
+        for record_id in ids:
+            del self.by_id[record_id]
+        self._records = None
+        self._stats_stale = True
+        self._query = None
+        if self._prs is not None and not self._prs.removed(ids, *self._storage_tail()):
+            self._invalidate_personal_records()
+
+    def _index_updated(self, record: dict):
+        old = self.by_id[record["id"]]
+        if self._prs is not None:
+            if not self._prs.edited(old, dict(old, **record)):
+                self._invalidate_personal_records()
+        elif not self.read_only:
+            # 索引还没打开，磁盘上的索引文件同样会过期
+            from personal_records import edit_affects_records
+            if edit_affects_records(old, dict(old, **record)):
+                self._invalidate_personal_records()
+        # 原位修改同一个 dict，顺序和列表视图都保持有效
+        self.by_id[record["id"]].update(record)
+        self._stats_stale = True
+        self._query = None
+
+    def _index_cleared(self):
+        self.by_id.clear()
+        self._records = []
+        self._stats_stale = True
+        self._query = None
+        self._prs = None
+
+    def load(self, progress=None) -> List[dict]:
+        """读取全部记录；progress(比例) 回调用于汇报进度"""
+        raise NotImplementedError
+
+    # --- 变更通知：同一进程内的多个窗口共享一个存储时使用 ---
+    def add_listener(self, callback):
+        """注册 callback(event, payload)，event 为 "reload"/"add"/"delete"/"edit"/"clear" """
+        if self._listeners is None:
+            self._listeners = []
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if self._listeners and callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def notify(self, event: str, payload=None):
+        for callback in list(self._listeners or []):
+            callback(event, payload)
+
+    def reload(self, progress=None):
+        """重新读取磁盘上的数据（供分析程序刷新使用）"""
+        self.load(progress)
+
+    def append(self, record: dict):
+        raise NotImplementedError
+
+    def append_many(self, records: List[dict]):
+        """批量追加（如 CSV 导入），实现可以把整批合并为一次写入"""
+        for record in records:
+            self.append(record)
+
+    def delete_many(self, ids: List[int]):
+        """按 id 批量删除"""
+        raise NotImplementedError
+
+    def update(self, record: dict):
+        """按 record["id"] 原位修改一条记录"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def compact(self, wait: bool = False):
+        """把未合并的修改整理到主存储中，默认无需处理"""
+
+    def close(self):
+        pass
+
+    def absorb(self, records: List[dict]):
+        """只读存储：把数据文件中新追加的记录并入内存（不写文件），分析程序自动刷新时使用"""
+        if self.columns is None:
+            self._index_added(records)
+            return
+        self.columns.extend(records)
+        self._query = None
+        if self._prs is not None:
+            self._prs.fold(records)
+
+    # --- 个人记录 ---
+    def personal_records(self):
+        """个人记录索引：读取数据文件旁的 .prs 文件并合并之后新增的记录，对不上时由全部记录重建"""
+        if self._prs is None:
+            from personal_records import PersonalRecords
+            self._prs = PersonalRecords.open(self._personal_records_path(), self._record_ids(), self._records_from)
+        return self._prs
+
+    def _personal_records_path(self) -> str:
+        from personal_records import PR_SUFFIX
+        return self.path + PR_SUFFIX
+
+    def _invalidate_personal_records(self):
+        """删改后索引需要重建：磁盘上的索引文件也要删除，否则重新打开时会被当作有效的沿用"""
+        self._prs = None
+        if not self.read_only:
+            from personal_records import PersonalRecords
+            PersonalRecords.discard(self._personal_records_path())
+
+    def discard_personal_records(self):
+        """数据被其他进程修改（如 SQLite 的 data_version 变化）时丢弃索引，下次使用时重新对照"""
+        self._prs = None
+
+    def _save_personal_records(self):
+        if self._prs is not None and not self.read_only:
+            self._prs.save(self._personal_records_path())
+
+    def _storage_tail(self):
+        """(记录总数, 按存储顺序最后一条记录的 id)，个人记录索引据此判断是否与数据对得上"""
+        if self.columns is not None:
+            return len(self.columns), int(self.columns.id[-1]) if len(self.columns) else None
+        return len(self.by_id), next(reversed(self.by_id), None)
+
+    def _record_ids(self):
+        """按存储顺序的全部记录 id（列式存储直接返回数组）"""
+        if self.columns is not None:
+            return self.columns.id
+        return list(self.by_id)
+
+    def _records_from(self, start: int) -> List[dict]:
+        """按存储顺序从第 start 条起的记录"""
+        if self.columns is not None:
+            return self.columns.to_records(start)
+        return self.records[start:]
+
+    def action_stats(self) -> Dict[str, dict]:
+        """按动作统计：总组数、最大单组次数、最近记录时间（只折叠上次之后新增的记录）"""
+        if self._aggregator is None:
+            self._aggregator = ActionStatsAggregator()
+        if self._stats_stale:
+            self._aggregator.reset()
+            self._stats_stale = False
+        if self.columns is not None:
+            return self._aggregator.update_columns(self.columns)
+        return self._aggregator.update(self.records)
+
+    def action_entries(self, name: str) -> List[dict]:
+        """某个动作的全部记录，按时间排序"""
+        if self.columns is not None:
+            return [self.columns.record(i) for i in self.columns.indices_of(name)]
+        entries = [item for item in self.records if item['name'] == name]
+        entries.sort(key=lambda x: x['record_time'])
+        return entries
+
+    def action_series(self, name: str):
+        """某个动作按时间排序的数组序列（record_time 为 int64 秒），供趋势图使用"""
+        if self.columns is not None:
+            return self.columns.series(self.columns.indices_of(name))
+        from workout_columns import series_from_records
+        return series_from_records(self.action_entries(name))
+
+    # --- 筛选查询：按日期区间、动作和 RPE 只统计命中的记录 ---
+    def query_index(self):
+        """首次查询时在列式记录上建立索引（共享存储先把记录转为列式）"""
+        if self._query is None:
+            from workout_columns import ColumnarRecords
+            from workout_query import QueryIndex
+            columns = self.columns if self.columns is not None else ColumnarRecords.from_records(self.records)
+            self._query = QueryIndex(columns)
+        return self._query
+
+    def filtered_stats(self, flt) -> Dict[str, dict]:
+        """满足筛选条件的记录按动作统计，格式与 action_stats 相同"""
+        return self.query_index().action_stats(flt)
+
+    def filtered_series(self, name: str, flt):
+        """某个动作满足筛选条件的数组序列，格式与 action_series 相同"""
+        return self.query_index().series(name, flt)
+
+
+class JournalStore(WorkoutStore):
+    """
+    追加式日志存储。
+    每次新增/删除/修改只向日志追加一行（删除和修改按 id 记录）并 fsync，代价与历史记录总量无关；
+    日志过长时在后台线程中把全部记录压缩为新快照，并通过原子重命名替换。
+    """
+
+    def __init__(self, path: str, compact_threshold: int = COMPACT_THRESHOLD, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.compact_threshold = compact_threshold
+        self._set_records([])
+        self._journal_entries = 0
+        self._lock = threading.RLock()
+        self._compact_thread: Optional[threading.Thread] = None
+        # 压缩进行中追加的操作，压缩完成后写入新日志
+        self._pending_ops: Optional[List[dict]] = None
+
+    def load(self, progress=None) -> List[dict]:
+        if self.read_only:
+            self.columns = load_columns(self.path, progress)
+            self._set_records([])
+            self.loaded = True
+            return self.records
+        with self._lock:
+            base, ops, journal_version = _read_journal(self.journal_path)
+            snapshot_path = _resolve_snapshot(self.path, base)
+            if snapshot_path is not None and snapshot_path != self.path:
+                # 上次压缩在两次重命名之间中断，补完最后一步
+                os.replace(snapshot_path, self.path)
+                _fsync_dir(self.path)
+                snapshot_path = self.path
+            legacy = (snapshot_version(self.path) or SCHEMA_VERSION) < SCHEMA_VERSION
+            if snapshot_path is None:
+                records = _read_snapshot(self.path, progress)
+                self._reset_journal([])
+            else:
+                records = _apply_ops(_read_snapshot(snapshot_path, progress), ops)
+                self._journal_entries = len(ops)
+                legacy = legacy or journal_version < SCHEMA_VERSION
+                if not os.path.exists(self.journal_path):
+                    self._reset_journal([])
+            if legacy:
+                assign_ids(records, 1)
+            self._set_records(records)
+            self.loaded = True
+            if legacy:
+                # 旧格式数据在内存中已经升级，立即在后台写出新格式快照，之后不再逐条升级
+                self.compact()
+            return self.records
+
+    def append(self, record: dict):
+        self.append_many([record])
+
+    def append_many(self, records: List[dict]):
+        """整批只追加写入、fsync 一次"""
+        with self._lock:
+            self._index_added(records)
+            self._write_ops([{"op": "add", "record": record} for record in records])
+        for record in records:
+            self.notify("add", record)
+
+    def delete_many(self, ids: List[int]):
+        """整批写成一行墓碑"""
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            self._index_deleted(ids)
+            self._write_ops([{"op": "del", "ids": ids}])
+        self.notify("delete", ids)
+
+    def update(self, record: dict):
+        with self._lock:
+            self._index_updated(record)
+            self._write_ops([{"op": "edit", "record": self.by_id[record["id"]]}])
+        self.notify("edit", record)
+
+    def clear(self):
+        with self._lock:
+            self._index_cleared()
+            self._write_ops([{"op": "clear"}])
+        self.notify("clear")
+
+    def _write_ops(self, entries: List[dict]):
+        if not entries:
+            return
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_entries += len(entries)
+        if self._pending_ops is not None:
+            self._pending_ops.extend(entries)
+        elif self._journal_entries >= self.compact_threshold:
+            self.compact()
+
+    def _reset_journal(self, ops: List[dict], base=None):
+        _write_journal(self.journal_path, base if base is not None else _stat_signature(self.path), ops)
+        self._journal_entries = len(ops)
+
+    def compact(self, wait: bool = False):
+        """启动后台压缩；wait=True 时等待压缩完成"""
+        with self._lock:
+            if self._compact_thread is None or not self._compact_thread.is_alive():
+                # 复制每条记录：压缩期间原位修改的记录只写进新日志，不影响正在写出的快照
+                records = [dict(record) for record in self.records]
+                self._pending_ops = []
+                self._compact_thread = threading.Thread(
+                    target=self._run_compaction, args=(records,), daemon=True)
+                self._compact_thread.start()
+            thread = self._compact_thread
+        if wait:
+            thread.join()
+
+    def _run_compaction(self, records: List[dict]):
+        tmp_path = self.path + SNAPSHOT_TMP_SUFFIX
+        try:
+            # 耗时的快照写入不持有锁，界面线程可以继续追加
+            _write_snapshot_file(tmp_path, records, self.path.lower().endswith(BINARY_SUFFIX))
+            with self._lock:
+                self._reset_journal(self._pending_ops, base=_stat_signature(tmp_path))
+                os.replace(tmp_path, self.path)
+                _fsync_dir(self.path)
+        finally:
+            with self._lock:
+                self._pending_ops = None
+
+    def close(self):
+        """等待进行中的压缩结束，并保存个人记录索引"""
+        thread = self._compact_thread
+        if thread is not None:
+            thread.join()
+        self._save_personal_records()
+
+
+class SQLiteStore(WorkoutStore):
+    """
+    SQLite 存储：WAL 模式，(name, record_time) 上建索引，
+    按动作的统计用一条 GROUP BY 完成，趋势图只查询所选动作的记录。
+    记录的 id 就是表的主键，按 id 删除和修改直接走主键。
+    """
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self._set_records([])
+        if read_only:
+            # 只读打开（分析程序、批量报告）不能写数据库文件，也就不能设置 WAL 或升级表结构
+            self.conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro",
+                                        uri=True, check_same_thread=False)
+            if self._schema_outdated():
+                # 旧版本（或还没有建表）的库复制到内存中再升级，文件保持原样
+                memory = sqlite3.connect(":memory:", check_same_thread=False)
+                self.conn.backup(memory)
+                self.conn.close()
+                self.conn = memory
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.row_factory = sqlite3.Row
+        self._create_schema()
+
+    TABLE_SQL = """
+        CREATE TABLE workout (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            weight REAL NOT NULL DEFAULT 0,
+            sets INTEGER NOT NULL,
+            reps INTEGER NOT NULL,
+            rpe INTEGER NOT NULL DEFAULT 7,
+            rir REAL NOT NULL DEFAULT 3,
+            notes TEXT NOT NULL DEFAULT '',
+            record_time INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX idx_workout_name_time ON workout (name, record_time);
+    """
+
+    def _schema_outdated(self) -> bool:
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'workout'").fetchone()
+        return not exists or version < SCHEMA_VERSION
+
+    def _create_schema(self):
+        """格式版本保存在 PRAGMA user_version 中；旧版本的表在一个事务内升级"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'workout'").fetchone()
+        if exists and version < SCHEMA_VERSION:
+            self._migrate_schema()
+            return
+        check_version(version)
+        if not exists:
+            self._run_script(self.TABLE_SQL)
+
+    def _migrate_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > LEGACY_VERSION:
+            # 版本 2 的表已经以主键作为稳定的 id，只需更新版本号
+            self._run_script("")
+            return
+        # 版本 1 的 record_time 为文本；strftime('%s') 按 UTC 解析，正好得到不做时区换算的墙上时间秒数
+        fields = ["name", "weight", "sets", "reps", "rpe", "rir", "notes"]
+        self._run_script(f"""
+            ALTER TABLE workout RENAME TO workout_v1;
+            DROP INDEX IF EXISTS idx_workout_name_time;
+            {self.TABLE_SQL}
+            INSERT INTO workout (id, {', '.join(fields)}, record_time)
+                SELECT id, {', '.join(fields)},
+                       COALESCE(CAST(strftime('%s', NULLIF(record_time, '')) AS INTEGER), 0)
+                FROM workout_v1;
+            DROP TABLE workout_v1;
+        """)
+
+    def _run_script(self, script: str):
+        """在一个事务中执行建表/升级语句，并写入当前版本号"""
+        try:
+            self.conn.executescript(f"BEGIN; {script} PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;")
+        except sqlite3.Error:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            raise
+
+    def load(self, progress=None) -> List[dict]:
+        rows = self.conn.execute(
+            f"SELECT {', '.join(RECORD_FIELDS)} FROM workout ORDER BY id").fetchall()
+        self._set_records([dict(row) for row in rows])
+        self.loaded = True
+        return self.records
+
+    def reload(self, progress=None):
+        """查询直接走数据库，无需把全部记录读入内存"""
+
+    def _record_ids(self):
+        if self.loaded:
+            return super()._record_ids()
+        return [row[0] for row in self.conn.execute("SELECT id FROM workout ORDER BY id")]
+
+    def _records_from(self, start: int) -> List[dict]:
+        if self.loaded:
+            return super()._records_from(start)
+        rows = self.conn.execute(
+            f"SELECT {', '.join(RECORD_FIELDS)} FROM workout ORDER BY id LIMIT -1 OFFSET ?", (start,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def append(self, record: dict):
+        self.append_many([record])
+
+    def append_many(self, records: List[dict]):
+        with self.conn:
+            for record in records:
+                # id 为 None 时由 SQLite 分配主键
+                cursor = self.conn.execute(
+                    f"INSERT INTO workout ({', '.join(RECORD_FIELDS)}) "
+                    f"VALUES ({', '.join('?' * len(RECORD_FIELDS))})",
+                    [record.get(field) for field in RECORD_FIELDS])
+                record["id"] = cursor.lastrowid
+        self._index_added(records)
+        for record in records:
+            self.notify("add", record)
+
+    def delete_many(self, ids: List[int]):
+        ids = list(ids)
+        if not ids:
+            return
+        with self.conn:
+            self.conn.executemany("DELETE FROM workout WHERE id = ?", [(record_id,) for record_id in ids])
+        self._index_deleted(ids)
+        self.notify("delete", ids)
+
+    def update(self, record: dict):
+        fields = RECORD_FIELDS[:-1]
+        with self.conn:
+            self.conn.execute(
+                f"UPDATE workout SET {', '.join(field + ' = ?' for field in fields)} WHERE id = ?",
+                [record[field] for field in fields] + [record["id"]])
+        self._index_updated(record)
+        self.notify("edit", record)
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM workout")
+        self._index_cleared()
+        self.notify("clear")
+
+    def close(self):
+        self._save_personal_records()
+        self.conn.close()
+
+    def data_version(self) -> int:
+        """其他连接每提交一次就会变化（PRAGMA data_version），用于检测数据库是否被修改"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def action_stats(self) -> Dict[str, dict]:
+        rows = self.conn.execute("""
+            SELECT name, SUM(sets) AS total_sets, MAX(reps) AS max_reps, MAX(record_time) AS last_time
+            FROM workout GROUP BY name""").fetchall()
+        return {row['name']: {
+            'total_sets': row['total_sets'],
+            'max_reps_per_set': row['max_reps'],
+            'last_time': row['last_time'],
+        } for row in rows}
+
+    def action_entries(self, name: str) -> List[dict]:
+        rows = self.conn.execute(
+            f"SELECT {', '.join(RECORD_FIELDS)} FROM workout WHERE name = ? ORDER BY record_time",
+            (name,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def filtered_stats(self, flt) -> Dict[str, dict]:
+        from workout_query import filter_sql
+        where, params = filter_sql(flt)
+        rows = self.conn.execute(f"""
+            SELECT name, SUM(sets) AS total_sets, MAX(reps) AS max_reps, MAX(record_time) AS last_time
+            FROM workout{where} GROUP BY name""", params).fetchall()
+        return {row['name']: {
+            'total_sets': row['total_sets'],
+            'max_reps_per_set': row['max_reps'],
+            'last_time': row['last_time'],
+        } for row in rows}
+
+    def filtered_series(self, name: str, flt):
+        from workout_columns import series_from_records
+        from workout_query import filter_sql
+        where, params = filter_sql(replace(flt, actions=frozenset([name])))
+        rows = self.conn.execute(
+            f"SELECT {', '.join(RECORD_FIELDS)} FROM workout{where} ORDER BY record_time", params).fetchall()
+        return series_from_records([dict(row) for row in rows])
+
+
+def open_store(path: str, read_only: bool = False) -> WorkoutStore:
+    """根据文件扩展名选择存储实现；目录为按月分区的数据"""
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        return SQLiteStore(path, read_only=read_only)
+    if os.path.isdir(path):
+        from partitioned_store import PartitionedStore
+        return PartitionedStore(path, read_only=read_only)
+    return JournalStore(path, read_only=read_only)
+
+
+def import_json(json_path: str, db_path: str) -> int:
+    """把现有 JSON（含日志）数据一次性导入 SQLite，返回导入条数"""
+    records = load_records(json_path)
+    store = SQLiteStore(db_path)
+    try:
+        store.append_many(records)
+    finally:
+        store.close()
+    return len(records)
+
+
+def convert_snapshot(source: str, target: str) -> int:
+    """
+    在 JSON 与二进制快照之间转换，目标格式按扩展名（.wkb 为二进制）决定；
+    源数据的日志一并合并进去，返回记录条数。JSON 仍是导出和交换数据用的格式。
+    """
+    if not data_exists(source):
+        raise FileNotFoundError(f"未找到数据文件：{source}")
+    records = load_records(source)
+    write_snapshot_atomic(target, records)
+    return len(records)
+
+
+def migrate_json(path: str, backup: bool = True) -> Optional[int]:
+    """
+    把旧版本的 JSON 数据（含日志）升级为当前版本，返回记录条数；已是当前版本时返回 None。
+    新文件逐条写入临时文件、fsync 并重新读取校验后才原子替换原文件，
+    期间任何错误（含原文件被其他程序修改）都会放弃迁移，原文件保持不变。
+    """
+    version = snapshot_version(path)
+    if version is None:
+        raise FileNotFoundError(f"未找到数据文件：{path}")
+    journal_path = path + JOURNAL_SUFFIX
+    base, ops, journal_version = _read_journal(journal_path)
+    snapshot_path = _resolve_snapshot(path, base)
+    if snapshot_path is not None and snapshot_path != path:
+        raise ValueError("数据文件有未完成的压缩，请先用记录程序打开一次再迁移")
+    if snapshot_path is None:
+        ops = []  # 日志已并入快照
+    if version == SCHEMA_VERSION and journal_version == SCHEMA_VERSION:
+        return None
+
+    signature = _stat_signature(path)
+    journal_signature = _stat_signature(journal_path)
+    tmp_path = path + MIGRATE_TMP_SUFFIX
+    count = 0
+
+    def write(f):
+        nonlocal count
+        # 没有待回放的日志时逐块转换，不把整个历史放进内存
+        chunks = iter_snapshot_chunks(path) if not ops else [(load_records(path), 1.0)]
+        f.write(f'{{"schema_version": {SCHEMA_VERSION}, "records": [')
+        for chunk, _ in chunks:
+            for record in chunk:
+                f.write(",\n  " if count else "\n  ")
+                f.write(json.dumps(record, ensure_ascii=False))
+                count += 1
+        f.write("\n]}\n")
+
+    try:
+        _write_synced(tmp_path, write)
+        written = sum(len(chunk) for chunk, _ in iter_snapshot_chunks(tmp_path))
+        if snapshot_version(tmp_path) != SCHEMA_VERSION or written != count:
+            raise ValueError(f"迁移结果校验失败：写入 {count} 条，读回 {written} 条")
+        if _stat_signature(path) != signature or _stat_signature(journal_path) != journal_signature:
+            raise ValueError("迁移期间数据文件被修改，请关闭记录程序后重试")
+        if backup:
+            for source in (path, journal_path):
+                if os.path.exists(source):
+                    shutil.copy2(source, source + BACKUP_SUFFIX.format(version=min(version, journal_version)))
+        os.replace(tmp_path, path)
+        _fsync_dir(path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if journal_signature is not None:
+        # 日志中的操作已经写进新快照，换成指向新快照的空日志
+        _write_journal(journal_path, _stat_signature(path), [])
+    return count
+
+
+def migrate_file(path: str, backup: bool = True) -> Optional[int]:
+    """按扩展名升级 JSON 或 SQLite 数据；SQLite 在打开时于事务内升级"""
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"未找到数据文件：{path}")
+        conn = sqlite3.connect(path)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+        if version >= SCHEMA_VERSION:
+            check_version(version)
+            return None
+        if backup:
+            shutil.copy2(path, path + BACKUP_SUFFIX.format(version=version))
+        store = SQLiteStore(path)
+        try:
+            return store.conn.execute("SELECT COUNT(*) FROM workout").fetchone()[0]
+        finally:
+            store.close()
+    return migrate_json(path, backup=backup)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="锻炼数据存储工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="把 JSON 数据导入 SQLite 数据库")
+    import_parser.add_argument("json_file")
+    import_parser.add_argument("db_file")
+    convert_parser = subparsers.add_parser(
+        "convert", help=f"在 JSON 与二进制快照（{BINARY_SUFFIX}）之间转换，格式按目标文件扩展名决定")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("target")
+    partition_parser = subparsers.add_parser("partition", help="把数据文件按月拆分到分区目录（含清单）")
+    partition_parser.add_argument("data_file")
+    partition_parser.add_argument("directory")
+    migrate_parser = subparsers.add_parser("migrate", help=f"把旧格式数据升级为版本 {SCHEMA_VERSION}")
+    migrate_parser.add_argument("data_file", nargs="+")
+    migrate_parser.add_argument("--no-backup", action="store_true", help="不保留 .v<旧版本>.bak 备份")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        count = import_json(args.json_file, args.db_file)
+        print(f"已导入 {count} 条记录到 {args.db_file}")
+    elif args.command == "convert":
+        count = convert_snapshot(args.source, args.target)
+        print(f"已把 {count} 条记录写入 {args.target}")
+    elif args.command == "partition":
+        from partitioned_store import split_into_partitions
+        count = split_into_partitions(args.data_file, args.directory)
+        print(f"已把 {count} 条记录按月拆分到 {args.directory}")
+    elif args.command == "migrate":
+        failed = False
+        for path in args.data_file:
+            try:
+                count = migrate_file(path, backup=not args.no_backup)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                print(f"{path}: 迁移失败，原文件未改动：{e}")
+                failed = True
+                continue
+            if count is None:
+                print(f"{path}: 已是版本 {SCHEMA_VERSION}，无需迁移")
+            else:
+                print(f"{path}: 已升级 {count} 条记录到版本 {SCHEMA_VERSION}")
+        if failed:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
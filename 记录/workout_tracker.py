@@ -1,10 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import json
 import os
+import time
 from dataclasses import dataclass, asdict
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
+from workout_csv import format_errors, read_csv_batches, write_csv
+from workout_schema import RECORD_FIELDS, format_epoch, validate_record
+from workout_storage import (JournalStore, SnapshotWriter, SQLiteStore, WorkoutStore, load_records,
+                             write_snapshot_atomic)
+from tree_views import make_list_view
+from partitioned_store import PartitionedStore, load_partitioned
+from personal_records import PR_SUFFIX, PersonalRecords, describe, edit_affects_records
+from background import BackgroundTask
+from debug_panel import bind_debug_panel
+from instrumentation import count, traced
 
 # 配置常量
 APP_CONFIG = {
@@ -12,11 +22,24 @@ APP_CONFIG = {
     "window_size": "850x500",
     "font": ("Microsoft YaHei", 10),
     "data_file": "workout_data.json",
+    "sqlite_file": "workout_data.db",
+    "partition_dir": "workout_data",
+    # "journal": 每条记录即时追加到日志文件；"sqlite": 写入 SQLite 数据库；
+    # "partitioned": 按月分区的目录（每月一个日志文件），启动时只加载当前月份；
+    # "json": 整体写入快照（见 autosave）
+    "storage_mode": "journal",
+    # "json" 模式下修改后自动在后台保存：停顿 autosave_delay_ms 后写一次，
+    # 持续修改时最多推迟 autosave_max_delay_ms；关闭后只在点击保存时写入
+    "autosave": True,
+    "autosave_delay_ms": 1000,
+    "autosave_max_delay_ms": 5000,
     "columns": ["动作名称", "重量(kg)", "组数", "次数", "RPE", "RIR", "备注", "记录时间"],
-    "column_widths": [120, 80, 60, 60, 60, 60, 180, 150]
+    "column_widths": [120, 80, 60, 60, 60, 60, 180, 150],
+    # 虚拟列表只创建视口内的行，适合上万条记录
+    "virtual_list": True
 }
 
-@dataclass
+@dataclass(slots=True)
 class WorkoutItem:
     """锻炼动作数据类（支持0重量）"""
     name: str
@@ -26,26 +49,72 @@ class WorkoutItem:
     rpe: int       # 1-10
     rir: float
     notes: str = ""
-    record_time: str = ""
+    record_time: int = 0  # 整数秒，见 workout_schema
+    id: Optional[int] = None  # 稳定的记录 id，由存储层分配，同时作为列表行的 iid
 
     def to_dict(self):
         return asdict(self)
 
     @classmethod
     def from_dict(cls, data: dict):
-        # 兼容旧数据，为缺失的字段提供默认值
-        data.setdefault('weight', 0.0)
-        data.setdefault('rpe', 7)
-        data.setdefault('rir', 3)
-        data.setdefault('record_time', "")
+        # 存储层读出的都是当前版本的完整记录（旧数据在读取/迁移时已补齐默认值）
         return cls(**data)
 
+def create_store() -> Optional[WorkoutStore]:
+    """按配置创建存储；"json" 模式不使用存储层，返回 None"""
+    if APP_CONFIG["storage_mode"] == "journal":
+        return JournalStore(APP_CONFIG["data_file"])
+    if APP_CONFIG["storage_mode"] == "sqlite":
+        return SQLiteStore(APP_CONFIG["sqlite_file"])
+    if APP_CONFIG["storage_mode"] == "partitioned":
+        return PartitionedStore(APP_CONFIG["partition_dir"])
+    return None
+
 class WorkoutTracker:
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Misc, store: Optional[WorkoutStore] = None):
+        """root 可以是 Tk 或 Toplevel；store 由启动器传入时与同进程的分析窗口共享同一份数据"""
         self.root = root
-        self.workout_items: List[WorkoutItem] = []
+        # 以 id 为键的有序字典：按 id 删除/修改为 O(1)；按位置访问的列表在删除后才重建
+        self.items_by_id: Dict[int, WorkoutItem] = {}
+        self._item_list: Optional[List[WorkoutItem]] = []
+        self._next_id = 1  # 仅 "json" 模式使用，其他模式由存储层分配 id
+        self._editing_id: Optional[int] = None
+        self.shared_store = store is not None
+        self.store: Optional[WorkoutStore] = store if store is not None else create_store()
+        self._loading = False  # 后台加载/导入期间禁止修改记录
+        self._import_task: Optional[BackgroundTask] = None
+        self._import_count = 0
+        self._import_errors: List[tuple] = []
+        # 自动保存（仅 "json" 模式；日志/数据库模式每次修改已即时落盘）
+        self.autosave: Optional[SnapshotWriter] = None
+        if self.store is None and APP_CONFIG["autosave"]:
+            self.autosave = SnapshotWriter(APP_CONFIG["data_file"])
+        self._autosave_job = None
+        self._dirty_since: Optional[float] = None
+        # "json" 模式自己维护个人记录索引，其他模式由存储层维护
+        self._prs: Optional[PersonalRecords] = None
         self._initialize_app()
 
+    @property
+    def workout_items(self) -> List[WorkoutItem]:
+        if self._item_list is None:
+            self._item_list = list(self.items_by_id.values())
+        return self._item_list
+
+    def _set_items(self, items: List[WorkoutItem]):
+        self.items_by_id = {item.id: item for item in items}
+        self._item_list = items
+        self._next_id = items[-1].id + 1 if items else 1
+
+    def _add_items(self, items: List[WorkoutItem]):
+        for item in items:
+            if item.id is None:
+                item.id = self._next_id
+            self._next_id = max(self._next_id, item.id + 1)
+            self.items_by_id[item.id] = item
+        if self._item_list is not None:
+            self._item_list.extend(items)
+
     def _initialize_app(self):
         self._setup_window()
         self._create_widgets()
@@ -56,6 +125,8 @@ class WorkoutTracker:
         self.root.title(APP_CONFIG["title"])
         self.root.geometry(APP_CONFIG["window_size"])
         self.root.resizable(True, True)
+        self.root.bind("<Escape>", lambda e: self._cancel_edit())
+        bind_debug_panel(self.root)
 
     def _create_widgets(self):
         self.main_frame = ttk.Frame(self.root, padding="10")
@@ -123,8 +194,9 @@ class WorkoutTracker:
         ttk.Label(frame, text="RIR:", font=APP_CONFIG["font"]).grid(row=1, column=4, padx=5, pady=5, sticky="w")
         ttk.Label(frame, textvariable=self.rir_display_var, font=APP_CONFIG["font"]).grid(row=1, column=5, padx=5, pady=5)
 
-        # 添加按钮
-        ttk.Button(frame, text="添加", command=self.add_exercise).grid(row=0, column=8, rowspan=2, padx=10, pady=5)
+        # 添加按钮（编辑时变为"保存修改"）
+        self.add_button = ttk.Button(frame, text="添加", command=self.add_exercise)
+        self.add_button.grid(row=0, column=8, rowspan=2, padx=10, pady=5)
         
         # 初始化RIR显示
         on_rpe_change()
@@ -139,80 +211,54 @@ class WorkoutTracker:
             tree.heading(col, text=col)
             tree.column(col, width=width, anchor="center")
 
-        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(frame, orient="vertical")
         tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
+        self.list_view = make_list_view(
+            APP_CONFIG["virtual_list"], tree, scrollbar,
+            row_count=lambda: len(self.workout_items), row_values=self._row_values,
+            row_id=lambda index: self.workout_items[index].id)
         return frame, tree
 
     def _create_button_frame(self) -> ttk.Frame:
         frame = ttk.Frame(self.main_frame)
         frame.columnconfigure(0, weight=1)
+        ttk.Button(frame, text="编辑选中项", command=self.edit_selected).pack(side="left", padx=5)
         ttk.Button(frame, text="删除选中项", command=self.delete_selected).pack(side="left", padx=5)
         ttk.Button(frame, text="清空列表", command=self.clear_all).pack(side="left", padx=5)
+        self.progress_var = tk.DoubleVar(value=0)
+        self.progress_bar = ttk.Progressbar(frame, variable=self.progress_var, maximum=100, length=150)
+        self.status_var = tk.StringVar()
+        ttk.Label(frame, textvariable=self.status_var, font=APP_CONFIG["font"]).pack(side="left", padx=5)
         ttk.Button(frame, text="保存到本地", command=self.save_data).pack(side="right", padx=5)
         ttk.Button(frame, text="导出为CSV", command=self.export_to_csv).pack(side="right", padx=5)
+        ttk.Button(frame, text="从CSV导入", command=self.import_from_csv).pack(side="right", padx=5)
         return frame
 
     def _validate_input(self) -> tuple[bool, Optional[WorkoutItem]]:
         try:
-            name = self.name_var.get().strip()
-            weight_str = self.weight_var.get().strip()
-            sets_str = self.sets_var.get().strip()
-            reps_str = self.reps_var.get().strip()
-            rpe = int(self.rpe_var.get())
-            rir = float(self.rir_display_var.get())
-            notes = self.notes_var.get().strip()
-
-            # 验证动作名称
-            if not name:
-                raise ValueError("动作名称不能为空！")
-            
-            # 验证重量（允许0，支持小数）
-            try:
-                weight = float(weight_str)
-                if weight < 0:
-                    raise ValueError("重量不能为负数！")
-            except ValueError:
-                raise ValueError("重量请输入有效的数字（如 0、2.5、10）！")
-            
-            # 验证组数（正整数）
-            try:
-                sets = int(sets_str)
-                if sets <= 0:
-                    raise ValueError("组数必须为正整数（如 1、3、5）！")
-            except ValueError:
-                raise ValueError("组数请输入有效的正整数！")
-            
-            # 验证次数（正整数）
-            try:
-                reps = int(reps_str)
-                if reps <= 0:
-                    raise ValueError("次数必须为正整数（如 5、10、15）！")
-            except ValueError:
-                raise ValueError("次数请输入有效的正整数！")
-            
-            # 验证RPE
-            if not (1 <= rpe <= 10):
-                raise ValueError("RPE值必须在 1-10 之间！")
-
-            return True, WorkoutItem(
-                name=name, weight=weight, sets=sets, reps=reps,
-                rpe=rpe, rir=rir, notes=notes,
-                record_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            )
+            # 校验规则与 CSV 导入共用（workout_schema.validate_record）
+            record = validate_record(
+                self.name_var.get(), self.weight_var.get(), self.sets_var.get(), self.reps_var.get(),
+                self.rpe_var.get(), self.rir_display_var.get(), self.notes_var.get())
+            return True, WorkoutItem.from_dict(record)
         except ValueError as e:
             messagebox.showerror("输入错误", str(e))
             return False, None
 
+    def _row_values(self, index: int) -> tuple:
+        return self._item_values(self.workout_items[index])
+
+    @staticmethod
+    def _item_values(workout: WorkoutItem) -> tuple:
+        return (
+            workout.name, workout.weight, workout.sets, workout.reps,
+            workout.rpe, workout.rir, workout.notes, format_epoch(workout.record_time)
+        )
+
+    @traced("table_populate")
     def _refresh_list(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for workout in self.workout_items:
-            self.tree.insert("", "end", values=(
-                workout.name, workout.weight, workout.sets, workout.reps,
-                workout.rpe, workout.rir, workout.notes, workout.record_time
-            ))
+        self.list_view.reset()
 
     def _clear_input(self):
         self.name_var.set("")
@@ -222,45 +268,238 @@ class WorkoutTracker:
         # self.sets_var.set("3")
         # self.reps_var.set("10")
 
+    def _check_loading(self) -> bool:
+        if self._loading:
+            messagebox.showinfo("提示", "记录正在加载中，请稍候！")
+        return self._loading
+
     def add_exercise(self):
+        if self._check_loading():
+            return
+        if self._editing_id is not None:
+            self._save_edit()
+            return
         valid, item = self._validate_input()
         if valid and item:
-            self.workout_items.append(item)
-            self._refresh_list()
+            if self.store:
+                record = item.to_dict()
+                # 存储层追加时分配 id，写入失败时不加入列表
+                if not self._write_to_store(self.store.append, record):
+                    return
+                item.id = record["id"]
+            self._add_items([item])
+            self._mark_dirty()
+            self.list_view.rows_appended(1)
+            self._announce_prs(item)
             self._clear_input()
             self.input_frame.focus_set()
 
+    def _selected_ids(self) -> List[int]:
+        return [int(row_id) for row_id in self.list_view.selected_ids()]
+
+    def edit_selected(self):
+        """把选中的记录填入输入区，点击"保存修改"后原位更新"""
+        if self._check_loading():
+            return
+        ids = self._selected_ids()
+        if len(ids) != 1:
+            messagebox.showinfo("提示", "请选择一条要编辑的记录！")
+            return
+        item = self.items_by_id[ids[0]]
+        self.name_var.set(item.name)
+        self.weight_var.set(f"{item.weight:g}")
+        self.sets_var.set(str(item.sets))
+        self.reps_var.set(str(item.reps))
+        self.rpe_var.set(str(item.rpe))
+        # 设置 RPE 会按 10 - RPE 重算 RIR，这里再填回原值
+        self.rir_display_var.set(f"{item.rir:g}")
+        self.notes_var.set(item.notes)
+        self._editing_id = item.id
+        self.input_frame.configure(text="编辑锻炼动作（Esc 取消）")
+        self.add_button.configure(text="保存修改")
+
+    def _save_edit(self):
+        valid, edited = self._validate_input()
+        if not (valid and edited):
+            return
+        item = self.items_by_id[self._editing_id]
+        # 记录时间保持不变
+        edited.id, edited.record_time = item.id, item.record_time
+        if self.store and not self._write_to_store(self.store.update, edited.to_dict()):
+            return
+        if self.store is None:
+            old, new = item.to_dict(), edited.to_dict()
+            # 索引还没打开时，磁盘上的索引文件同样会过期
+            stale = not self._prs.edited(old, new) if self._prs is not None else edit_affects_records(old, new)
+            if stale:
+                self._discard_personal_records()
+        # 原位修改同一个对象，按位置访问的列表无需重建
+        for field in RECORD_FIELDS:
+            setattr(item, field, getattr(edited, field))
+        self._mark_dirty()
+        self.list_view.row_updated(item.id, self._item_values(item))
+        self._cancel_edit()
+
+    def _cancel_edit(self):
+        if self._editing_id is None:
+            return
+        self._editing_id = None
+        self.input_frame.configure(text="添加锻炼动作")
+        self.add_button.configure(text="添加")
+        self._clear_input()
+
     def delete_selected(self):
-        selected_items = self.tree.selection()
-        if not selected_items:
+        if self._check_loading():
+            return
+        ids = self._selected_ids()
+        if not ids:
             messagebox.showinfo("提示", "请先选择要删除的记录！")
             return
         if messagebox.askyesno("确认删除", "确定要删除选中的记录吗？"):
-            for item_id in selected_items:
-                del self.workout_items[self.tree.index(item_id)]
-            self._refresh_list()
+            # 按 id 删除，整批只写一次存储
+            if self.store and not self._write_to_store(self.store.delete_many, ids):
+                return
+            for record_id in ids:
+                del self.items_by_id[record_id]
+            self._item_list = None
+            if self.store is None and self._prs is not None and not self._prs.removed(
+                    ids, len(self.items_by_id), next(reversed(self.items_by_id), None)):
+                self._discard_personal_records()
+            self._mark_dirty()
+            if self._editing_id in ids:
+                self._cancel_edit()
+            self.list_view.rows_deleted(ids)
 
     def clear_all(self):
+        if self._check_loading():
+            return
         if not self.workout_items:
             messagebox.showinfo("提示", "列表已经是空的！")
             return
-        if messagebox.askyesno("确认清空", "确定要删除所有锻炼记录吗？此操作不可恢复！"):
-            self.workout_items.clear()
+        # 分区存储只加载了本月的记录，清空的也只是这些
+        scope = "本月的" if isinstance(self.store, PartitionedStore) else "所有"
+        if messagebox.askyesno("确认清空", f"确定要删除{scope}锻炼记录吗？此操作不可恢复！"):
+            # 先清空存储，失败时列表和索引保持原样
+            if self.store and not self._write_to_store(self.store.clear):
+                return
+            self._cancel_edit()
+            self._set_items([])
+            if self.store is None:
+                self._discard_personal_records()
+            self._mark_dirty()
             self._refresh_list()
 
+    def _personal_records(self) -> PersonalRecords:
+        """个人记录索引：存储模式下由存储层随增删改维护，"json" 模式在这里维护"""
+        if self.store:
+            return self.store.personal_records()
+        if self._prs is None:
+            records = [item.to_dict() for item in self.workout_items]
+            self._prs = PersonalRecords.open(APP_CONFIG["data_file"] + PR_SUFFIX,
+                                             [record["id"] for record in records], lambda start: records[start:])
+        return self._prs
+
+    def _discard_personal_records(self):
+        """"json" 模式的索引需要重建：连同索引文件一起删除，见 PersonalRecords.discard"""
+        self._prs = None
+        PersonalRecords.discard(APP_CONFIG["data_file"] + PR_SUFFIX)
+
+    def _announce_prs(self, item: WorkoutItem):
+        """新增记录后立即提示刷新的个人记录（各项第一次有成绩时不算）"""
+        if self.store:
+            # 存储层追加时已合并，last_events 就是这条记录的结果
+            events = self.store.personal_records().last_events
+        elif self._prs is not None:
+            events = self._prs.add(item.to_dict())
+        else:
+            events = self._personal_records().last_events
+        broken = [event for event in events if event.previous is not None]
+        self.status_var.set("新纪录！" + "；".join(describe(event) for event in broken) if broken else "")
+
+    def _write_to_store(self, operation, *args) -> bool:
+        try:
+            operation(*args)
+        except Exception as e:
+            messagebox.showerror("保存失败", f"无法写入存储：{str(e)}")
+            return False
+        return True
+
+    def _mark_dirty(self):
+        """记录有修改：推迟到修改停顿后再自动保存，连续的修改合并为一次写入"""
+        if self.autosave is None:
+            return
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        elif now - self._dirty_since >= APP_CONFIG["autosave_max_delay_ms"] / 1000:
+            # 已经推迟得够久，保留已安排的保存
+            return
+        if self._autosave_job is not None:
+            self.root.after_cancel(self._autosave_job)
+        self._autosave_job = self.root.after(APP_CONFIG["autosave_delay_ms"], self._run_autosave)
+
+    def _run_autosave(self):
+        self._autosave_job = None
+        error = self.autosave.take_error()
+        if error is not None:
+            self.status_var.set(f"自动保存失败：{error}")
+        self._submit_snapshot()
+
+    def _submit_snapshot(self):
+        """把当前记录交给后台线程写出；这里只复制列表，转换和写盘都在后台进行"""
+        self._dirty_since = None
+        items = list(self.items_by_id.values())
+        self.autosave.submit(lambda: [item.to_dict() for item in items])
+
+    def _record_total(self) -> int:
+        """全部记录条数；分区存储只加载了本月，其他月份的条数来自分区摘要"""
+        if isinstance(self.store, PartitionedStore):
+            return self.store.total_count()
+        return len(self.workout_items)
+
     def save_data(self):
-        if not self.workout_items:
+        if self._check_loading():
+            return
+        if not self._record_total():
             messagebox.showinfo("提示", "没有可保存的锻炼记录！")
             return
         try:
-            with open(APP_CONFIG["data_file"], "w", encoding="utf-8") as f:
-                json.dump([item.to_dict() for item in self.workout_items], f, ensure_ascii=False, indent=2)
-            messagebox.showinfo("成功", f"锻炼记录已保存到：{os.path.abspath(APP_CONFIG['data_file'])}")
+            path = self._save_snapshot()
+            if isinstance(self.store, PartitionedStore):
+                messagebox.showinfo("成功", f"全部 {self._record_total()} 条锻炼记录（各月份分区）"
+                                            f"已保存到：{os.path.abspath(path)}")
+            else:
+                messagebox.showinfo("成功", f"锻炼记录已保存到：{os.path.abspath(path)}")
         except Exception as e:
             messagebox.showerror("保存失败", f"无法保存数据：{str(e)}")
 
+    @traced("save")
+    def _save_snapshot(self, wait: bool = False) -> str:
+        """写出快照并返回数据文件路径（不弹窗，基准测试也直接调用）"""
+        if self.store:
+            # 日志/数据库模式下每条记录已即时落盘，这里只把日志压缩进快照
+            self.store.compact(wait=wait)
+            return self.store.path
+        if self.autosave is not None:
+            # 与自动保存共用写入线程，避免两处同时写同一个临时文件
+            if self._autosave_job is not None:
+                self.root.after_cancel(self._autosave_job)
+                self._autosave_job = None
+            self._submit_snapshot()
+            self.autosave.flush()
+            error = self.autosave.take_error()
+            if error is not None:
+                raise error
+        else:
+            write_snapshot_atomic(APP_CONFIG["data_file"], [item.to_dict() for item in self.workout_items])
+        if self.store is None and self._prs is not None:
+            self._prs.save(APP_CONFIG["data_file"] + PR_SUFFIX)
+        return APP_CONFIG["data_file"]
+
     def export_to_csv(self):
-        if not self.workout_items:
+        if self._check_loading():
+            return
+        if not self._record_total():
             messagebox.showinfo("提示", "没有可导出的锻炼记录！")
             return
         file_path = filedialog.asksaveasfilename(
@@ -270,32 +509,187 @@ class WorkoutTracker:
         )
         if not file_path:
             return
-        try:
-            with open(file_path, "w", encoding="utf-8-sig", newline="") as f:
-                f.write(",".join(APP_CONFIG["columns"]) + "\n")
-                for workout in self.workout_items:
-                    row = [
-                        f'"{workout.name}"' if "," in workout.name else workout.name,
-                        str(workout.weight), str(workout.sets), str(workout.reps),
-                        str(workout.rpe), str(workout.rir),
-                        f'"{workout.notes}"' if "," in workout.notes else workout.notes,
-                        workout.record_time
-                    ]
-                    f.write(",".join(row) + "\n")
-            messagebox.showinfo("导出成功", f"CSV文件已保存到：{os.path.abspath(file_path)}")
-        except Exception as e:
-            messagebox.showerror("导出失败", f"无法导出CSV文件：{str(e)}")
+        # 在后台线程中逐块写出；列表只复制引用，之后新增的记录不影响本次导出
+        items = list(self.workout_items)
+        if isinstance(self.store, PartitionedStore):
+            # 分区存储只加载了本月，导出全部月份时在后台读出各分区（读取占前一半进度）
+            directory = self.store.path
+
+            def export(task):
+                records = load_partitioned(directory, progress=lambda f: task.report(f / 2))
+                return write_csv(file_path, records, len(records), progress=lambda f: task.report(0.5 + f / 2))
+        else:
+            def export(task):
+                return write_csv(file_path, items, len(items), progress=task.report)
+        self._show_progress("正在导出…")
+        BackgroundTask(
+            self.root, export,
+            on_done=lambda count: self._on_export_done(file_path, count),
+            on_progress=lambda fraction, partial: self.progress_var.set(fraction * 100),
+            on_error=self._on_export_error,
+        ).start()
+
+    def _on_export_done(self, file_path: str, count: int):
+        self._hide_progress()
+        messagebox.showinfo("导出成功", f"已导出 {count} 条记录，CSV文件已保存到：{os.path.abspath(file_path)}")
+
+    def _on_export_error(self, error: Exception):
+        self._hide_progress()
+        messagebox.showerror("导出失败", f"无法导出CSV文件：{str(error)}")
+
+    def import_from_csv(self):
+        """流式导入 CSV：后台逐批读取校验，主线程按批追加；坏行汇总报告，不逐条弹窗"""
+        if self._check_loading():
+            return
+        file_path = filedialog.askopenfilename(
+            title="从CSV导入", filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")])
+        if not file_path:
+            return
+        self._loading = True  # 导入期间禁止其他修改
+        self._import_count = 0
+        self._import_errors = []
+        self._show_progress("正在导入…")
+        self._import_task = BackgroundTask(
+            self.root, lambda task: self._read_csv(task, file_path),
+            on_done=lambda result: self._on_import_finished(file_path),
+            on_progress=self._on_import_batch,
+            on_error=self._on_import_error,
+            on_cancelled=lambda: self._on_import_finished(file_path),
+        ).start()
+
+    @staticmethod
+    def _read_csv(task, file_path: str):
+        """工作线程：只负责解析和校验，每批通过进度回调交给主线程"""
+        for records, errors, fraction in read_csv_batches(file_path):
+            task.report(fraction, (records, errors))
+
+    @traced("import_batch")
+    def _on_import_batch(self, fraction: float, batch):
+        records, errors = batch
+        self.progress_var.set(fraction * 100)
+        self._import_errors.extend(errors)
+        if not records:
+            return
+        if self.store:
+            try:
+                self.store.append_many(records)
+            except Exception as e:
+                # 写入失败时停止导入，已写入的批次保留
+                self._import_task.cancel()
+                messagebox.showerror("保存失败", f"无法写入存储：{str(e)}")
+                return
+        items = [WorkoutItem.from_dict(record) for record in records]
+        self._add_items(items)
+        if self.store is None and self._prs is not None:
+            self._prs.fold(item.to_dict() for item in items)
+        self._mark_dirty()
+        self.list_view.rows_appended(len(records))
+        self._import_count += len(records)
+        count("records_imported", len(records))
+        self.status_var.set(f"已导入 {self._import_count} 条…")
+
+    def _on_import_finished(self, file_path: str):
+        self._finish_loading()
+        message = f"已导入 {self._import_count} 条记录。"
+        if self._import_errors:
+            report_path = file_path + ".errors.txt"
+            try:
+                with open(report_path, "w", encoding="utf-8") as f:
+                    f.write(format_errors(self._import_errors, limit=len(self._import_errors)) + "\n")
+                report = f"\n完整列表已保存到：{report_path}"
+            except OSError:
+                report = ""
+            message += f"\n跳过 {len(self._import_errors)} 行无效数据：\n{format_errors(self._import_errors)}{report}"
+            messagebox.showwarning("导入完成", message)
+        else:
+            messagebox.showinfo("导入完成", message)
+
+    def _on_import_error(self, error: Exception):
+        self._finish_loading()
+        messagebox.showerror("导入失败", f"无法导入CSV文件：{str(error)}（已导入 {self._import_count} 条）")
 
     def _load_data(self):
-        try:
-            if os.path.exists(APP_CONFIG["data_file"]):
-                with open(APP_CONFIG["data_file"], "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                self.workout_items = [WorkoutItem.from_dict(item) for item in data]
-                self._refresh_list()
-        except Exception as e:
-            messagebox.showwarning("加载警告", f"无法加载保存的记录：{str(e)}")
-            self.workout_items = []
+        """在后台线程读取记录，窗口先显示出来"""
+        self._loading = True
+        self.status_var.set("正在加载记录…")
+        if self.shared_store and not self.store.loaded:
+            # 共享存储由启动器在后台加载，加载完成后会通知 "reload"
+            self.store.add_listener(self._on_store_event)
+            self.root.bind("<Destroy>", self._on_destroy, add="+")
+            return
+        self._show_progress("正在加载记录…")
+        BackgroundTask(
+            self.root, self._read_items,
+            on_done=self._on_items_loaded,
+            on_progress=lambda fraction, partial: self.progress_var.set(fraction * 100),
+            on_error=self._on_load_error,
+        ).start()
+
+    @traced("load")
+    def _read_items(self, task) -> List[WorkoutItem]:
+        """工作线程：读取并转换记录（不能操作界面）"""
+        if self.shared_store:
+            # 共享存储已经加载过，只需转换
+            data = self.store.records
+        elif self.store:
+            data = self.store.load(progress=lambda fraction: task.report(fraction))
+        else:
+            data = load_records(APP_CONFIG["data_file"], progress=lambda fraction: task.report(fraction))
+        count("records_loaded", len(data))
+        items = [WorkoutItem.from_dict(item) for item in data]
+        # 个人记录索引也在后台准备好，新增第一条记录时不用等待重建
+        if self.store:
+            self.store.personal_records()
+        else:
+            self._prs = PersonalRecords.open(APP_CONFIG["data_file"] + PR_SUFFIX,
+                                             [item["id"] for item in data], lambda start: data[start:])
+        return items
+
+    def _on_store_event(self, event: str, payload):
+        if event == "reload":
+            self.store.remove_listener(self._on_store_event)
+            self._load_data()
+
+    def _on_destroy(self, event):
+        if event.widget is self.root and self.store:
+            self.store.remove_listener(self._on_store_event)
+
+    def close(self):
+        """退出前写出尚未自动保存的修改，并等待存储的后台写入结束"""
+        if self.autosave is not None:
+            if self._dirty_since is not None:
+                self._submit_snapshot()
+            self.autosave.close()
+        if self.store is None and self._prs is not None:
+            self._prs.save(APP_CONFIG["data_file"] + PR_SUFFIX)
+        if self.store:
+            self.store.close()
+
+    def _show_progress(self, status: str):
+        self.status_var.set(status)
+        self.progress_var.set(0)
+        self.progress_bar.pack(side="left", padx=5)
+
+    def _hide_progress(self):
+        self.status_var.set("")
+        self.progress_bar.pack_forget()
+
+    def _finish_loading(self):
+        self._loading = False
+        self._hide_progress()
+
+    def _on_items_loaded(self, items: List[WorkoutItem]):
+        self._finish_loading()
+        self._set_items(items)
+        self._refresh_list()
+        if isinstance(self.store, PartitionedStore):
+            self.status_var.set(f"显示本月 {len(items)} 条记录（共 {self.store.total_count()} 条，"
+                                f"更早的记录请在数据分析中查看）")
+
+    def _on_load_error(self, error: Exception):
+        self._finish_loading()
+        messagebox.showwarning("加载警告", f"无法加载保存的记录：{str(error)}")
+        self._set_items([])
 
 def main():
     root = tk.Tk()
@@ -303,6 +697,7 @@ def main():
     style.theme_use("clam")
     app = WorkoutTracker(root)
     root.mainloop()
+    app.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file